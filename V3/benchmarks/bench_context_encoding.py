@@ -0,0 +1,110 @@
+"""
+Prompt context encoding benchmark (raw repr vs compact c1).
+
+Size is measured tokenizer-independently: characters, UTF-8 bytes,
+whitespace words and regex pre-tokens (letter runs, digit groups of at
+most three, single punctuation). The pre-token split mirrors how
+Llama-3/GPT-4 style BPE vocabularies chunk numbers, so it tracks real
+token counts for this kind of text without shipping a tokenizer.
+
+With --ollama, prefill latency is also measured against the configured
+model (prompt_eval_duration as reported by Ollama, num_predict=1).
+
+Usage (from V3/):
+    python benchmarks/bench_context_encoding.py [--config config/config.yaml] [--ollama]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import load_config
+from core.context_codec import CompactContextEncoder, ENCODING_VERSION
+from simulation.generator import SeededGenerator
+from mcp_host.server import SpirulinaMCP_V3
+from clients.llm_agent import LlmAgent
+
+PRETOKEN_RE = re.compile(r"[^\W\d_]+|\d{1,3}|_|[^\w\s]")
+
+
+def size_stats(texts):
+    return {
+        "chars": sum(len(t) for t in texts),
+        "bytes": sum(len(t.encode("utf-8")) for t in texts),
+        "words": sum(len(t.split()) for t in texts),
+        "pretokens": sum(len(PRETOKEN_RE.findall(t)) for t in texts),
+    }
+
+
+def build_prompts(cfg):
+    """Render raw and compact user prompts for every step of every active scenario."""
+    gen = SeededGenerator(cfg)
+    encoder = CompactContextEncoder()
+    raw, compact = [], []
+    for sc_id in cfg.scenarios.active_scenarios:
+        host = SpirulinaMCP_V3(cfg)
+        encoder.reset()
+        for snap in gen.generate_scenario(sc_id):
+            host.update_state(snap)
+            payload = host.get_context_payload()
+            trust = payload.trust_context
+            args = (payload, trust["score"], trust["mode"], trust["flags"], payload.sensor_context)
+            raw.append(LlmAgent._user_prompt(*args, None))
+            compact.append(LlmAgent._user_prompt(*args, encoder.encode(payload)))
+    return raw, compact
+
+
+def measure_prefill(cfg, prompts):
+    from clients.resilience import ResilientChatClient
+    client = ResilientChatClient(cfg.deployment.client)
+    model = os.environ.get("OLLAMA_MODEL", cfg.deployment.model_name)
+    durations, counts = [], []
+    for i, prompt in enumerate(prompts):
+        resp = client.chat(model=model, messages=[{"role": "user", "content": prompt}],
+                           options={"temperature": 0.0, "num_predict": 1})
+        if i == 0:
+            continue  # warm-up (model load)
+        if resp.get("prompt_eval_duration"):
+            durations.append(resp["prompt_eval_duration"] / 1e6)
+            counts.append(resp.get("prompt_eval_count") or 0)
+    client.close()
+    return {
+        "prefill_ms_mean": round(statistics.mean(durations), 3) if durations else None,
+        "prefill_ms_p50": round(statistics.median(durations), 3) if durations else None,
+        "prompt_tokens_mean": round(statistics.mean(counts), 2) if counts else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Context encoding size/prefill benchmark")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--ollama", action="store_true", help="Also measure prefill latency via Ollama")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    raw, compact = build_prompts(cfg)
+    raw_s, compact_s = size_stats(raw), size_stats(compact)
+
+    print(f"=== Context Encoding Benchmark (raw vs {ENCODING_VERSION}, {len(raw)} prompts) ===")
+    print(f"{'metric':<12}{'raw':>10}{'compact':>10}{'reduction':>11}")
+    for k in raw_s:
+        red = 1.0 - compact_s[k] / raw_s[k]
+        print(f"{k:<12}{raw_s[k]:>10}{compact_s[k]:>10}{red:>10.1%}")
+    example = min(25, len(raw) - 1)
+    print(f"\nExample raw:\n{raw[example]}\nExample compact:\n{compact[example]}")
+
+    if args.ollama:
+        raw_p, compact_p = measure_prefill(cfg, raw), measure_prefill(cfg, compact)
+        print("\n=== Prefill Latency (Ollama) ===")
+        for k in raw_p:
+            print(f"{k:<20} raw={raw_p[k]} compact={compact_p[k]}")
+        if raw_p["prefill_ms_mean"] and compact_p["prefill_ms_mean"]:
+            red = 1.0 - compact_p["prefill_ms_mean"] / raw_p["prefill_ms_mean"]
+            print(f"Prefill latency reduction: {red:.1%}")
+
+
+if __name__ == "__main__":
+    main()
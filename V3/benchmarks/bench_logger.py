@@ -0,0 +1,65 @@
+"""
+ExperimentLogger throughput benchmark (sync vs buffered).
+
+Writes the same synthetic rows through both logging modes into a
+temporary directory and reports rows/second of the producer (the
+simulation loop) and the end-to-end time including the final drain.
+
+Usage (from V3/):
+    python benchmarks/bench_logger.py [--config config/config.yaml] [--rows 200000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config import load_config
+from core.logging import ExperimentLogger
+
+TELEMETRY = {"route": "default", "breaker_state": "CLOSED", "latency_ms": 812.5,
+             "prompt_tokens": 412, "completion_tokens": 38, "cache_hit": True}
+
+
+def run(cfg, mode, rows):
+    cfg = cfg.model_copy(deep=True)
+    cfg.logging.mode = mode
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg.project.output_dir = tmp
+        t0 = time.perf_counter()
+        with ExperimentLogger(cfg) as logger:
+            for i in range(rows):
+                logger.log_result(
+                    scenario_id=f"S{i % 8 + 1}", day=i % 7, trust_score=0.8, mode="FULL_AUTONOMY",
+                    flags="drift_suspected" if i % 5 == 0 else "", proposed_action="ACT_UNRESTRICTED",
+                    executed_action="ACT_UNRESTRICTED", status="SUCCESS", override=False,
+                    model_digest="sha256:0123456789ab", telemetry=TELEMETRY
+                )
+            produced = time.perf_counter() - t0
+        total = time.perf_counter() - t0
+        size = os.path.getsize(os.path.join(tmp, "experiment_log.csv"))
+    return {"producer_rows_s": rows / produced, "end_to_end_rows_s": rows / total, "bytes": size}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ExperimentLogger throughput benchmark")
+    parser.add_argument("--config", default="config/config.yaml")
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    results = {mode: run(cfg, mode, args.rows) for mode in ("sync", "buffered")}
+
+    print(f"=== ExperimentLogger Benchmark ({args.rows} rows, flush_rows={cfg.logging.flush_rows}, "
+          f"flush_interval_s={cfg.logging.flush_interval_s}) ===")
+    print(f"{'mode':<10}{'producer rows/s':>18}{'end-to-end rows/s':>20}{'bytes':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['producer_rows_s']:>18,.0f}{r['end_to_end_rows_s']:>20,.0f}{r['bytes']:>12}")
+    speedup = results["buffered"]["end_to_end_rows_s"] / results["sync"]["end_to_end_rows_s"]
+    print(f"Buffered end-to-end speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+from typing import Dict, Any, List, Optional
+
+# Response fields kept on tape (everything the agent and the cost
+# accounting read; the rest of the Ollama payload is dropped).
+RESPONSE_FIELDS = [
+    "model",
+    "prompt_eval_count",
+    "eval_count",
+    "prompt_eval_duration",
+    "eval_duration",
+    "load_duration",
+    "total_duration",
+]
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+class LlmCassette:
+    """
+    Record/replay store for LLM responses.
+
+    The tape is an append-only JSONL file, one compact record per call:
+        {"k": <prompt hash>, "r": <response subset>, "ms": <wall latency>, "d": <model digest>}
+    Keys hash the model, messages and sampling options, so only
+    byte-identical requests replay. On duplicate keys the last record wins.
+    """
+    def __init__(self, path: str, mode: str):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {CASSETTE_MODES})")
+        self.path = path
+        self.mode = mode
+        self.index: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.recorded = 0
+        self._file = None
+
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Cassette not found at {path}")
+            self._load()
+        elif mode == "record":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    rec = json.loads(line)
+                    self.index[rec["k"]] = rec
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]], options: Dict[str, Any]) -> str:
+        canonical = json.dumps(
+            {"model": model, "messages": messages, "options": options},
+            sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Dict[str, Any]:
+        rec = self.index.get(key)
+        if rec is None:
+            raise CassetteMissError(
+                f"No recorded LLM response for prompt hash {key[:16]}... in {self.path}. "
+                f"Re-record with LLM_CASSETTE_MODE=record."
+            )
+        self.hits += 1
+        return rec
+
+    def append(self, key: str, response: Any, latency_ms: float, model_digest: str = "") -> None:
+        rec = {
+            "k": key,
+            "r": {
+                "message": {"role": "assistant", "content": response["message"]["content"]},
+                **{f: response.get(f) for f in RESPONSE_FIELDS if response.get(f) is not None},
+            },
+            "ms": round(latency_ms, 3),
+            "d": model_digest,
+        }
+        self._file.write(json.dumps(rec, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.index[key] = rec
+        self.recorded += 1
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
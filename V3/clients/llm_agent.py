@@ -1,7 +1,8 @@
 import os
 import sys
 import re
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, List
 
 # Ensure V3 root is in path for imports if needed
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -14,6 +15,10 @@ except ImportError:
 
 from core.types import HostPayloadV1, ToolCallV1, ActionType
 from core.config import AppConfig
+from core.context_codec import CompactContextEncoder, LEGEND as CONTEXT_LEGEND
+from clients.resilience import ResilientChatClient, CircuitOpenError
+from clients.cassette import LlmCassette, CassetteMissError
+from clients.router import ModelRouter, ROUTE_RULE
 
 class LlmAgent:
     def __init__(self, config: AppConfig, seed: int):
@@ -28,6 +33,32 @@ class LlmAgent:
             
         # Prompt Profile support
         self.prompt_profile = os.environ.get("LLM_PROMPT_PROFILE", "aligned").lower()
+
+        # Record/Replay cassette (Env > Config)
+        cassette_cfg = config.deployment.cassette
+        cassette_mode = os.environ.get("LLM_CASSETTE_MODE", cassette_cfg.mode).lower()
+        cassette_path = os.environ.get("LLM_CASSETTE_PATH", cassette_cfg.path)
+        self.cassette: Optional[LlmCassette] = None
+        if self.backend == "ollama" and cassette_mode != "off":
+            self.cassette = LlmCassette(cassette_path, cassette_mode)
+            print(f"LLM cassette: mode={cassette_mode}, path={cassette_path}, entries={len(self.cassette.index)}")
+        self.replaying = self.cassette is not None and self.cassette.mode == "replay"
+
+        # Persistent pooled client (timeouts, retries, hedging, circuit breaker)
+        # Replay serves every response from tape, so no backend is needed.
+        self.client: Optional[ResilientChatClient] = None
+        if self.backend == "ollama" and HAS_OLLAMA and not self.replaying:
+            self.client = ResilientChatClient(config.deployment.client, seed=seed)
+
+        # Prompt context encoding: "raw" (Python repr) or "compact" (core/context_codec.py)
+        self.context_encoding = os.environ.get("LLM_CONTEXT_ENCODING", config.deployment.context_encoding).lower()
+        self.encoder = CompactContextEncoder()
+
+        # Nominal/flagged model routing (large model = self.model)
+        self.router = ModelRouter(config.deployment.routing, self.model)
+
+        # Per-decision telemetry, read by the runner after each decide()
+        self.last_call: Dict[str, Any] = {}
             
         print(f"LlmAgent initialized with backend={self.backend}, model={self.model}, prompt_profile={self.prompt_profile}")
 
@@ -35,8 +66,10 @@ class LlmAgent:
         """
         Decide on an action using the configured LLM backend.
         """
+        self.last_call = {"breaker_state": self.breaker_state}
+
         # 1. Check Backend
-        if self.backend != "ollama" or not HAS_OLLAMA:
+        if self.backend != "ollama" or (self.client is None and not self.replaying):
             # Fallback for when this class is instantiated but backend isn't ready
             return ToolCallV1(
                 tool_name="execute_action", 
@@ -52,6 +85,9 @@ class LlmAgent:
         score = trust.get('score', trust.get('trust_score', trust.get('trust', 0.0)))
         mode = trust.get('mode', trust.get('trust_mode', trust.get('autonomy_mode', 'UNKNOWN')))
         flags = trust.get('flags', [])
+
+        # Encode every step (even when no LLM is called) so day-over-day deltas stay aligned
+        state_line = self.encoder.encode(payload) if self.context_encoding == "compact" else None
         
         # --- Adversary Stress-Test Backend ---
         if self.backend == "adversary":
@@ -80,6 +116,15 @@ class LlmAgent:
             )
         # -------------------------------------
 
+        # --- Model Routing ---
+        route = self.router.route(score, mode, flags)
+        self.last_call["route"] = route.name
+        self.last_call["routed_model"] = route.model or ""
+        if route.name == ROUTE_RULE:
+            # Nominal state handled without an LLM round-trip
+            self.last_call.update({"latency_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0})
+            return ToolCallV1(tool_name="execute_action", arguments=self.router.rule_decision(mode))
+
         profile = self.prompt_profile
         
         if profile == "stress":
@@ -140,24 +185,16 @@ Line 2: <One sentence rationale>
 """
             
         system_prompt = base_prompt + "\n" + decision_rules
+        if state_line is not None:
+            system_prompt += "\n" + CONTEXT_LEGEND + "\n"
         
-        user_prompt = f"""CURRENT STATE:
-Day: {payload.day}
-Trust Score: {score:.2f}
-Trust Mode: {mode}
-Active Flags: {flags}
-Sensor Readings: {sensors}
-
-Decide the best action.
-"""
-
-
+        user_prompt = self._user_prompt(payload, score, mode, flags, sensors, state_line)
 
         # 3. Call LLM
         try:
             # print(f"  > Querying {self.model}...", end="", flush=True)
-            response = ollama.chat(
-                model=self.model,
+            response = self._chat(
+                model=route.model,
                 messages=[
                     {'role': 'system', 'content': system_prompt},
                     {'role': 'user', 'content': user_prompt},
@@ -213,7 +250,23 @@ Decide the best action.
                 }
             )
 
+        except CassetteMissError:
+            # Replay must never silently diverge from the recorded run
+            raise
+
+        except CircuitOpenError as e:
+            # Backend known-unhealthy: go straight to the safe fallback
+            self.last_call["breaker_state"] = self.breaker_state
+            return ToolCallV1(
+                tool_name="execute_action",
+                arguments={
+                    "action": "HOLD",
+                    "rationale": f"LLM Unavailable: {str(e)}"
+                }
+            )
+
         except Exception as e:
+            self.last_call["breaker_state"] = self.breaker_state
             print(f"\nExample Failure: {e}")
             return ToolCallV1(
                 tool_name="execute_action",
@@ -222,3 +275,85 @@ Decide the best action.
                     "rationale": f"LLM Error: {str(e)}"
                 }
             )
+
+    @staticmethod
+    def _user_prompt(payload: HostPayloadV1, score: float, mode: str, flags: List[str],
+                     sensors: Dict[str, Any], state_line: Optional[str]) -> str:
+        if state_line is not None:
+            return f"CURRENT STATE: {state_line}\nDecide the best action.\n"
+
+        return f"""CURRENT STATE:
+Day: {payload.day}
+Trust Score: {score:.2f}
+Trust Mode: {mode}
+Active Flags: {flags}
+Sensor Readings: {sensors}
+
+Decide the best action.
+"""
+
+    def _chat(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any]) -> Any:
+        """
+        Single LLM round-trip, routed through the cassette when enabled.
+        Populates self.last_call with the cost accounting of the response.
+        """
+        key = LlmCassette.key(model, messages, options) if self.cassette else None
+
+        if self.replaying:
+            rec = self.cassette.lookup(key)
+            self.last_call.update(self._response_telemetry(rec["r"], rec["ms"] / 1000.0, rec.get("d", "")))
+            return rec["r"]
+
+        t0 = time.perf_counter()
+        response = self.client.chat(model=model, messages=messages, options=options)
+        wall_s = time.perf_counter() - t0
+        digest = self.client.model_digest(model)
+        self.last_call.update(self._response_telemetry(response, wall_s, digest))
+
+        if self.cassette is not None:
+            self.cassette.append(key, response, wall_s * 1000.0, digest)
+        return response
+
+    def _response_telemetry(self, response: Any, wall_s: float, model_digest: str) -> Dict[str, Any]:
+        """
+        Extract per-decision cost accounting from an Ollama chat response.
+        Ollama reports durations in nanoseconds; we log milliseconds.
+        """
+        def ns_to_ms(key: str) -> Optional[float]:
+            v = response.get(key)
+            return round(v / 1e6, 3) if v is not None else None
+
+        prompt_tokens = response.get("prompt_eval_count")
+        return {
+            "breaker_state": self.breaker_state,
+            "model_digest": model_digest,
+            "latency_ms": round(wall_s * 1000.0, 3),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": response.get("eval_count"),
+            "prompt_eval_ms": ns_to_ms("prompt_eval_duration"),
+            "eval_ms": ns_to_ms("eval_duration"),
+            "load_ms": ns_to_ms("load_duration"),
+            # Ollama reports prompt_eval_count 0 when the whole prompt was
+            # served from its KV cache; unknown (None) when the field is absent.
+            "cache_hit": None if prompt_tokens is None else prompt_tokens == 0,
+        }
+
+    @property
+    def breaker_state(self) -> str:
+        return self.client.breaker.state.value if self.client else ""
+
+    def client_stats(self) -> Dict[str, Any]:
+        stats = self.client.stats() if self.client else {}
+        if self.router.cfg.enabled:
+            stats["route_counts"] = dict(self.router.counts)
+        if self.cassette:
+            stats["cassette_mode"] = self.cassette.mode
+            stats["cassette_hits"] = self.cassette.hits
+            stats["cassette_recorded"] = self.cassette.recorded
+        return stats
+
+    def close(self) -> None:
+        if self.client:
+            self.client.close()
+        if self.cassette:
+            self.cassette.close()
@@ -0,0 +1,21 @@
+from core.types import ToolCallV1, ActionType
+
+# --- Mock Agent Adapter (For Regression) ---
+# In a full deployment, this would be an Ollama Client
+class MockAgent:
+    def __init__(self, seed: int):
+        self.seed = seed
+    
+    def decide(self, payload) -> ToolCallV1:
+        # Simple Logic: Always Optimize unless Trust < 0.4
+        trust = payload.trust_context
+        score = trust["score"]
+        
+        action = ActionType.ACT_UNRESTRICTED
+        if score < 0.4:
+            action = ActionType.REQUEST_VERIFICATION
+            
+        return ToolCallV1(
+            tool_name="execute_action",
+            arguments={"action": action.value, "rationale": "Mock Agent Logic"}
+        )
@@ -0,0 +1,194 @@
+import time
+import random
+import threading
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Dict, Any, List
+
+try:
+    import ollama
+    HAS_OLLAMA = True
+except ImportError:
+    HAS_OLLAMA = False
+
+from core.config import LlmClientConfig
+
+
+class BreakerState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a request is short-circuited by an open breaker."""
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+    CLOSED -> OPEN after `failure_threshold` consecutive failures.
+    OPEN -> HALF_OPEN once `reset_s` has elapsed (a single probe is let through;
+    other requests are short-circuited while it is outstanding).
+    HALF_OPEN -> CLOSED on probe success, back to OPEN on probe failure.
+    """
+    def __init__(self, failure_threshold: int, reset_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.short_circuits = 0
+        self.trips = 0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == BreakerState.OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = BreakerState.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == BreakerState.HALF_OPEN and not self.probe_in_flight:
+                # This caller is the probe; the result resolves it
+                self.probe_in_flight = True
+                return True
+            if self.state != BreakerState.CLOSED:
+                self.short_circuits += 1
+                return False
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            self.state = BreakerState.CLOSED
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == BreakerState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != BreakerState.OPEN:
+                    self.trips += 1
+                self.state = BreakerState.OPEN
+                self.opened_at = time.monotonic()
+                self.probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "short_circuits": self.short_circuits,
+        }
+
+
+class ResilientChatClient:
+    """
+    Persistent Ollama client with per-request timeouts, jittered retries,
+    optional hedged duplicate requests and a circuit breaker.
+
+    A single `ollama.Client` is kept for the lifetime of the agent so the
+    underlying HTTP connection pool is reused across decisions.
+    """
+    def __init__(self, config: LlmClientConfig, seed: int = 0):
+        if not HAS_OLLAMA:
+            raise RuntimeError("'ollama' python package not found. Install with `pip install ollama`.")
+        self.cfg = config
+        self.client = ollama.Client(host=config.host, timeout=config.timeout_s)
+        self.breaker = CircuitBreaker(config.breaker_failure_threshold, config.breaker_reset_s)
+        self.rng = random.Random(seed)
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._digests: Dict[str, str] = {}
+        # Two workers: the primary request and at most one hedge in flight.
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge") \
+            if config.hedge_after_s is not None else None
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform(0, min(cap, base * 2^attempt))
+        cap = min(self.cfg.backoff_max_s, self.cfg.backoff_base_s * (2 ** attempt))
+        return self.rng.uniform(0.0, cap)
+
+    def _send(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any]):
+        return self.client.chat(model=model, messages=messages, options=options)
+
+    def _send_hedged(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any]):
+        primary = self._pool.submit(self._send, model, messages, options)
+        done, _ = wait([primary], timeout=self.cfg.hedge_after_s)
+        if done:
+            return primary.result()
+
+        # Primary is slow: fire a duplicate and take whichever succeeds first.
+        hedge = self._pool.submit(self._send, model, messages, options)
+        self.hedges_sent += 1
+        pending = {primary, hedge}
+        deadline = time.monotonic() + self.cfg.timeout_s
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if fut is hedge:
+                        self.hedges_won += 1
+                    return fut.result()
+                last_error = fut.exception()
+        if last_error is not None:
+            raise last_error
+        raise TimeoutError(f"LLM request exceeded {self.cfg.timeout_s}s (hedged)")
+
+    def chat(self, model: str, messages: List[Dict[str, str]], options: Dict[str, Any]):
+        """
+        Send a chat request. Raises CircuitOpenError without touching the
+        backend while the breaker is open, otherwise the last backend error
+        once all retries are exhausted.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Circuit breaker open: LLM backend marked unhealthy")
+
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.cfg.max_retries + 1):
+            try:
+                if self._pool is not None:
+                    response = self._send_hedged(model, messages, options)
+                else:
+                    response = self._send(model, messages, options)
+                self.breaker.record_success()
+                return response
+            except Exception as e:
+                last_error = e
+                self.breaker.record_failure()
+                # Stop hammering a backend the breaker has just given up on.
+                if self.breaker.state == BreakerState.OPEN or attempt == self.cfg.max_retries:
+                    break
+                time.sleep(self._backoff(attempt))
+        raise last_error
+
+    def model_digest(self, model: str) -> str:
+        """Resolve (and cache) the digest of a locally installed model."""
+        if model not in self._digests:
+            digest = ""
+            try:
+                for m in self.client.list().get("models", []):
+                    name = m.get("model") or m.get("name")
+                    if name == model or name == f"{model}:latest":
+                        digest = m.get("digest") or ""
+                        break
+            except Exception:
+                # Digest is audit metadata only; never fail a decision over it.
+                return ""
+            self._digests[model] = digest
+        return self._digests[model]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.breaker.stats()
+        stats["hedges_sent"] = self.hedges_sent
+        stats["hedges_won"] = self.hedges_won
+        return stats
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
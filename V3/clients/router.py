@@ -0,0 +1,76 @@
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel
+
+from core.config import RoutingConfig
+from core.types import ActionType, AutonomyMode
+
+# Route names as written to the experiment log
+ROUTE_DEFAULT = "default"      # routing disabled: configured model for everything
+ROUTE_NOMINAL = "nominal"      # small/fast model for nominal states
+ROUTE_RULE = "rule"            # deterministic rule, no LLM call
+ROUTE_ESCALATED = "escalated"  # large model for flagged / low-trust states
+
+# Rule-route action per autonomy mode: the most active action StrictPolicy
+# allows there, so the gate never overrides a deterministic decision
+RULE_ACTIONS = {
+    AutonomyMode.FULL_AUTONOMY.value: ActionType.ACT_UNRESTRICTED.value,
+    AutonomyMode.SAFE_ONLY.value: ActionType.ACT_SAFE.value,
+    AutonomyMode.SUGGEST_ONLY.value: ActionType.HOLD.value,
+    AutonomyMode.BLOCK.value: ActionType.REQUEST_VERIFICATION.value,
+}
+
+
+class Route(BaseModel):
+    name: str
+    model: Optional[str]  # None for the deterministic rule route
+    reason: str
+
+
+class ModelRouter:
+    """
+    Chooses which model (if any) handles a decision.
+
+    A state is *nominal* when the trust score is at or above
+    `nominal_min_score`, the autonomy mode is one of `nominal_modes` and no
+    escalation flag is set. Nominal states go to the small model (or the
+    deterministic rule); everything else escalates to the large model.
+    """
+    def __init__(self, config: RoutingConfig, large_model: str):
+        self.cfg = config
+        self.large_model = large_model
+        self.counts: Dict[str, int] = {}
+
+    def is_nominal(self, score: float, mode: str, flags: List[str]) -> bool:
+        if score < self.cfg.nominal_min_score:
+            return False
+        if mode not in self.cfg.nominal_modes:
+            return False
+        # Empty escalate_flags means "any raised flag escalates"
+        escalating = [f for f in flags if not self.cfg.escalate_flags or f in self.cfg.escalate_flags]
+        return not escalating
+
+    def route(self, score: float, mode: str, flags: List[str]) -> Route:
+        if not self.cfg.enabled:
+            r = Route(name=ROUTE_DEFAULT, model=self.large_model, reason="routing disabled")
+        elif self.is_nominal(score, mode, flags):
+            if self.cfg.nominal_route == ROUTE_RULE:
+                r = Route(name=ROUTE_RULE, model=None, reason="nominal state")
+            else:
+                r = Route(name=ROUTE_NOMINAL, model=self.cfg.small_model, reason="nominal state")
+        else:
+            r = Route(name=ROUTE_ESCALATED, model=self.large_model,
+                      reason=f"score={score:.2f}, mode={mode}, flags={flags}")
+        self.counts[r.name] = self.counts.get(r.name, 0) + 1
+        return r
+
+    @staticmethod
+    def rule_decision(mode: str) -> Dict[str, Any]:
+        """
+        Deterministic decision for nominal states. Mirrors decision rule 4
+        of the aligned prompt (no flags and high trust -> optimize), capped
+        at what `mode` allows when nominal_modes goes below FULL_AUTONOMY.
+        """
+        return {
+            "action": RULE_ACTIONS.get(mode, ActionType.HOLD.value),
+            "rationale": f"Nominal state (no flags, high trust, {mode}): deterministic routing rule."
+        }
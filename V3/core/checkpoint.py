@@ -0,0 +1,75 @@
+"""
+Run checkpoints for resumable experiments.
+
+main.py saves one at the start of every scenario and every
+checkpoint.every_steps steps inside it; `python main.py --resume` continues
+from the last one instead of starting over. A checkpoint holds everything
+that is not re-derivable from the config:
+
+    scenario_index / step   loop progress (steps done in the current scenario)
+    rng_state               the generator's shared RandomState at the start of
+                            that scenario; the scenario is regenerated from it
+                            and its first `step` days are skipped
+    actions                 executed actions of those days (closed loop only:
+                            replayed into the process model while skipping)
+    host                    SpirulinaMCP_V3.get_state() (trust engine state,
+                            last snapshot / assessment)
+    metrics                 the live StreamingMetrics
+    log                     ExperimentLogger.position(); the resumed logger
+                            appends there and drops rows logged after it
+
+Agent state is not saved: the mock agent has none, and LLM decisions are
+not reproducible anyway (record a cassette for exact replays).
+
+The file is a pickle written atomically (temporary file + rename), so a
+crash while saving leaves the previous checkpoint intact.
+"""
+
+import os
+import pickle
+from typing import Any, Dict, Optional
+from .config import AppConfig, config_hash
+
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path(config: AppConfig) -> str:
+    return os.path.join(config.project.output_dir, config.checkpoint.path)
+
+
+def checkpoint_interval(config: AppConfig) -> int:
+    """Steps between checkpoints (each one flushes the log, so buffered / Parquet logs save per block)."""
+    if config.checkpoint.every_steps:
+        return config.checkpoint.every_steps
+    if config.logging.mode == "sync" and config.logging.format == "csv":
+        return 1
+    return max(1, config.logging.flush_rows)
+
+
+def save_checkpoint(path: str, config: AppConfig, state: Dict[str, Any]) -> None:
+    state = dict(state, version=CHECKPOINT_VERSION, config_hash=config_hash(config))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str, config: AppConfig) -> Optional[Dict[str, Any]]:
+    """The saved state, None if there is none. Raises ValueError if it belongs to another config."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {state.get('version')}, expected {CHECKPOINT_VERSION}")
+    if state["config_hash"] != config_hash(config):
+        raise ValueError(f"Checkpoint {path} was written with a different config "
+                         f"({state['config_hash']} != {config_hash(config)}); start a new run instead")
+    return state
+
+
+def clear_checkpoint(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,252 @@
+"""
+Columnar (Parquet) experiment log.
+
+Layout (hive-partitioned, one directory per run and scenario):
+    <output_dir>/experiment_log.parquet/run=<run_id>/scenario_id=<id>/part-00000.parquet
+
+Unlike the CSV log, columns are typed: trust_score is float32, mode / actions
+/ status are dictionary-encoded (pandas categoricals), and the trust flags
+are a uint8 bitmask (core/flags.py). `step` is the row's position in the
+run, so readers can restore log order across partitions.
+
+read_log() reads either format and only loads the requested columns, so
+metrics and plots can share one loader regardless of the backend;
+iter_log() does the same in bounded-size blocks.
+"""
+
+import os
+import shutil
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+from .flags import mask_to_flags, parse_flags
+
+PARQUET_LOG_DIR = "experiment_log.parquet"
+
+# (column, arrow type name) in row order; scenario_id lives in the partition path
+_STRING, _CATEGORY = "string", "category"
+LOG_FIELDS = [
+    ("step", "int64"),
+    ("scenario_id", _STRING),
+    ("day", "int32"),
+    ("backend", _CATEGORY),
+    ("model", _CATEGORY),
+    ("trust_score", "float32"),
+    ("mode", _CATEGORY),
+    ("flags_mask", "uint8"),
+    ("proposed_action", _CATEGORY),
+    ("executed_action", _CATEGORY),
+    ("model_digest", _CATEGORY),
+    ("status", _CATEGORY),
+    ("override", "bool"),
+    # Telemetry (core/logging.py TELEMETRY_COLUMNS)
+    ("route", _CATEGORY),
+    ("routed_model", _CATEGORY),
+    ("breaker_state", _CATEGORY),
+    ("latency_ms", "float64"),
+    ("prompt_tokens", "int32"),
+    ("completion_tokens", "int32"),
+    ("prompt_eval_ms", "float64"),
+    ("eval_ms", "float64"),
+    ("load_ms", "float64"),
+    ("cache_hit", "bool"),
+    # Process state (closed-loop runs)
+    ("biomass", "float64"),
+    ("produced", "float64"),
+]
+LOG_COLUMNS = [name for name, _ in LOG_FIELDS]
+
+
+def _arrow_type(name: str):
+    if name == _CATEGORY:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.type_for_alias(name)
+
+
+def log_schema():
+    """Arrow schema of one partition file (scenario_id is the partition key)."""
+    return pa.schema([(name, _arrow_type(t)) for name, t in LOG_FIELDS if name != "scenario_id"])
+
+
+def _none_if_blank(v: Any) -> Any:
+    return None if v is None or v == "" else v
+
+
+class ColumnarLogWriter:
+    """
+    Writes blocks of typed log rows (ordered as LOG_COLUMNS) as Parquet part
+    files, one per scenario present in the block. Not thread-safe: the
+    ExperimentLogger calls it from a single thread at a time.
+    """
+    def __init__(self, root: str, run_id: str, parts: Optional[int] = None):
+        if not HAS_PYARROW:
+            raise ImportError("logging.format 'parquet' requires pyarrow (pip install pyarrow)")
+        self.run_dir = os.path.join(root, f"run={run_id}")
+        self.schema = log_schema()
+        self._parts = 0
+        if parts is not None:
+            # Resume: keep the first `parts` part files, drop any written after them
+            self._parts = parts
+            for dirpath, _, files in os.walk(self.run_dir):
+                for name in files:
+                    if name.startswith("part-") and int(name[5:10]) >= parts:
+                        os.remove(os.path.join(dirpath, name))
+            os.makedirs(self.run_dir, exist_ok=True)
+            return
+        # A run id is written once: re-running it replaces it, like the CSV log
+        if os.path.isdir(self.run_dir):
+            shutil.rmtree(self.run_dir)
+        os.makedirs(self.run_dir)
+
+    @property
+    def parts(self) -> int:
+        """Part files written so far (the append position of the run)."""
+        return self._parts
+
+    def write(self, rows: List[list]) -> None:
+        by_scenario: Dict[str, List[list]] = {}
+        sc = LOG_COLUMNS.index("scenario_id")
+        for row in rows:
+            by_scenario.setdefault(row[sc], []).append(row)
+        for scenario_id, group in by_scenario.items():
+            arrays = []
+            for j, field in enumerate(LOG_FIELDS):
+                name = field[0]
+                if name == "scenario_id":
+                    continue
+                values = [_none_if_blank(r[j]) for r in group]
+                arrays.append(pa.array(values, type=self.schema.field(name).type))
+            part_dir = os.path.join(self.run_dir, f"scenario_id={scenario_id}")
+            os.makedirs(part_dir, exist_ok=True)
+            pq.write_table(pa.Table.from_arrays(arrays, schema=self.schema),
+                           os.path.join(part_dir, f"part-{self._parts:05d}.parquet"))
+            self._parts += 1
+
+
+def append_run_parts(src_run_dir: str, dst_run_dir: str, step_offset: int, part_offset: int) -> int:
+    """
+    Copy the part files of one run directory into another, shifting `step`
+    by step_offset and numbering the copies from part_offset (in source part
+    order). Returns the number of part files written.
+    """
+    if not HAS_PYARROW:
+        raise ImportError("Merging Parquet logs requires pyarrow")
+    files = []
+    for dirpath, _, names in os.walk(src_run_dir):
+        files += [(name, os.path.join(dirpath, name)) for name in names if name.startswith("part-")]
+    files.sort()
+    for k, (_, path) in enumerate(files):
+        table = pq.read_table(path, schema=log_schema())
+        steps = pa.array(table.column("step").to_numpy() + step_offset, type=pa.int64())
+        table = table.set_column(table.schema.get_field_index("step"), "step", steps)
+        part_dir = os.path.join(dst_run_dir, os.path.basename(os.path.dirname(path)))
+        os.makedirs(part_dir, exist_ok=True)
+        pq.write_table(table, os.path.join(part_dir, f"part-{part_offset + k:05d}.parquet"))
+    return len(files)
+
+
+def log_output_dir(path: str) -> str:
+    """Directory holding a log: the CSV's folder, or the folder containing the Parquet dataset."""
+    path = os.path.abspath(path)
+    if not os.path.isdir(path):
+        return os.path.dirname(path)
+    while os.path.basename(path).startswith(("run=", "scenario_id=")):
+        path = os.path.dirname(path)
+    return os.path.dirname(path)
+
+
+def read_log(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    Load an experiment log (CSV file or Parquet run/dataset directory).
+
+    Only `columns` are read (None = all); requested columns the log does not
+    have are skipped, so callers check `in df.columns` as with a full read.
+    `flags` (pipe-joined names) and `flags_mask` are derived from each other
+    when only one is stored.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Log not found at {path}")
+    wanted = None if columns is None else list(columns)
+    if os.path.isdir(path):
+        dataset = _parquet_dataset(path)
+        load, order = _parquet_columns(dataset, wanted)
+        df = dataset.to_table(columns=load).to_pandas()
+        if order:
+            df = df.sort_values(order, kind="stable").reset_index(drop=True)
+        return _finish_parquet(df, wanted)
+    return _finish_csv(pd.read_csv(path, usecols=_csv_usecols(wanted)), wanted)
+
+
+def iter_log(path: str, columns: Optional[Sequence[str]] = None,
+             chunk_rows: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    read_log() in blocks of at most chunk_rows rows, in log order, so logs
+    larger than memory can be reduced block by block.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Log not found at {path}")
+    wanted = None if columns is None else list(columns)
+    if os.path.isdir(path):
+        dataset = _parquet_dataset(path)
+        load, _ = _parquet_columns(dataset, wanted)
+        # Part files are numbered in write order within a run
+        fragments = sorted(dataset.get_fragments(),
+                           key=lambda f: (os.path.dirname(os.path.dirname(f.path)), os.path.basename(f.path)))
+        for fragment in fragments:
+            for batch in fragment.to_batches(columns=load, schema=dataset.schema, batch_size=chunk_rows):
+                yield _finish_parquet(batch.to_pandas(), wanted)
+        return
+    for chunk in pd.read_csv(path, usecols=_csv_usecols(wanted), chunksize=chunk_rows):
+        yield _finish_csv(chunk, wanted)
+
+
+def _csv_usecols(wanted: Optional[List[str]]):
+    if wanted is None:
+        return None
+    need = set(wanted) | ({"flags"} if "flags_mask" in wanted else set())
+    return lambda c: c in need
+
+
+def _finish_csv(df: pd.DataFrame, wanted: Optional[List[str]]) -> pd.DataFrame:
+    if wanted is not None and "flags_mask" in wanted and "flags" in df.columns:
+        df["flags_mask"] = df["flags"].map(parse_flags).astype("uint8")
+        if "flags" not in wanted:
+            df = df.drop(columns="flags")
+    return df
+
+
+def _parquet_dataset(path: str):
+    if not HAS_PYARROW:
+        raise ImportError(f"{path} is a Parquet log; reading it requires pyarrow")
+    return ds.dataset(path, format="parquet", partitioning="hive")
+
+
+def _parquet_columns(dataset, wanted: Optional[List[str]]):
+    """Columns to load for `wanted`, and the ordering keys among them."""
+    available = dataset.schema.names
+    if wanted is None:
+        load = list(available)
+    else:
+        load = [c for c in wanted if c in available]
+        if "flags" in wanted and "flags_mask" not in load:
+            load.append("flags_mask")
+    # Always load the ordering keys; dropped again if not requested
+    order = [c for c in ("run", "step") if c in available]
+    load += [c for c in order if c not in load]
+    return load, order
+
+
+def _finish_parquet(df: pd.DataFrame, wanted: Optional[List[str]]) -> pd.DataFrame:
+    if wanted is None or "flags" in wanted:
+        df["flags"] = df["flags_mask"].map(lambda m: "|".join(mask_to_flags(m)))
+    if wanted is not None:
+        df = df[[c for c in wanted if c in df.columns]]
+    return df
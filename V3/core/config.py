@@ -1,4 +1,7 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import os
+import hashlib
+import json
 import yaml
 from pydantic import BaseModel, Field
 
@@ -7,10 +10,50 @@ class ProjectConfig(BaseModel):
     version: str
     output_dir: str
 
+class LoggingConfig(BaseModel):
+    mode: str = "sync"  # sync (flush every row) | buffered (background writer thread)
+    flush_interval_s: float = 1.0  # buffered: max time a row waits before being written
+    flush_rows: int = 1000  # buffered: write as soon as this many rows are queued
+    queue_max: int = 100000  # buffered: producers block when the queue is full
+    format: str = "csv"  # csv (experiment_log.csv) | parquet (typed, partitioned by run and scenario; needs pyarrow)
+    run_id: Optional[str] = None  # parquet: run partition name; None -> start time (YYYYmmddTHHMMSS)
+    store: Optional[str] = None  # SQLite experiment store (evaluation/store.py); each finished run is recorded there
+
+class CheckpointConfig(BaseModel):
+    enabled: bool = True
+    path: str = "checkpoint.pkl"  # relative to project.output_dir
+    every_steps: Optional[int] = None  # None -> every step with sync CSV logging, else every logging.flush_rows steps
+
+class LlmClientConfig(BaseModel):
+    host: Optional[str] = None  # None -> OLLAMA_HOST env / ollama default
+    timeout_s: float = 60.0
+    max_retries: int = 2
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 8.0
+    hedge_after_s: Optional[float] = None  # None disables hedged requests
+    breaker_failure_threshold: int = 5
+    breaker_reset_s: float = 30.0
+
+class CassetteConfig(BaseModel):
+    mode: str = "off"  # off | record | replay
+    path: str = "logs/cassettes/llm_cassette.jsonl"
+
+class RoutingConfig(BaseModel):
+    enabled: bool = False
+    nominal_route: str = "nominal"  # "nominal" -> small_model, "rule" -> deterministic rule
+    small_model: str = "llama3.2:3b"
+    nominal_min_score: float = 0.8
+    nominal_modes: List[str] = Field(default_factory=lambda: ["FULL_AUTONOMY"])
+    escalate_flags: List[str] = Field(default_factory=list)  # empty -> any flag escalates
+
 class DeploymentConfig(BaseModel):
     mode: str
     llm_backend: str
     model_name: str
+    client: LlmClientConfig = Field(default_factory=LlmClientConfig)
+    cassette: CassetteConfig = Field(default_factory=CassetteConfig)
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+    context_encoding: str = "raw"  # raw | compact (see core/context_codec.py)
 
 class ThresholdsConfig(BaseModel):
     z_score: float
@@ -42,18 +85,158 @@ class SeedConfig(BaseModel):
     agent_noise: int
     evaluation_shuffle: int
 
+class BioreactorConfig(BaseModel):
+    """Parameters of the closed-loop process model (simulation/bioreactor.py)."""
+    substeps_per_day: int = 24
+    mu_max: float = 0.35  # 1/day at optimal temperature, pH and nutrients
+    t_min: float = 20.0
+    t_opt: float = 35.0
+    t_max: float = 42.0
+    ph_min: float = 8.0
+    ph_opt: float = 10.0
+    ph_max: float = 11.5
+    k_ec: float = 0.3  # Monod half-saturation on EC (nutrient proxy)
+    decay: float = 0.02  # 1/day
+    x0: float = 0.5  # g/L
+    x_max: float = 2.0  # g/L
+    ph_per_biomass: float = 0.45  # pH rise per g/L grown (carbon uptake)
+    ec_per_biomass: float = 0.3  # EC drop per g/L grown
+    t_ambient: float = 32.0
+    t_tau_days: float = 1.0
+    ph0: float = 10.0
+    ec0: float = 1.5
+    ph_setpoint: float = 10.0
+    ec_setpoint: float = 1.5
+    heat_boost_c: float = 1.0  # ACT_UNRESTRICTED raises the temperature target by this much
+    process_noise: Dict[str, float] = Field(default_factory=lambda: {"ph": 0.01, "temp": 0.2, "ec": 0.01})
+
+class PeriodicComponent(BaseModel):
+    amplitude: float
+    period_days: float
+    phase: float = 0.0  # radians
+
+class AR1Config(BaseModel):
+    phi: float  # day-to-day persistence, |phi| < 1
+    std: float  # innovation std
+
+class SensorChannelConfig(BaseModel):
+    base: float
+    trend: float = 0.0  # per day
+    periodic: List[PeriodicComponent] = Field(default_factory=list)
+    noise_std: float = 0.0
+    ar1: Optional[AR1Config] = None
+
+class SensorModelsConfig(BaseModel):
+    """Parametric baseline (simulation/sensor_models.py); defaults match the i.i.d. baseline."""
+    channels: Dict[str, SensorChannelConfig] = Field(default_factory=lambda: {
+        "ph": SensorChannelConfig(base=10.0, noise_std=0.05),
+        "temp": SensorChannelConfig(base=32.0, noise_std=0.5),
+        "ec": SensorChannelConfig(base=1.5, noise_std=0.1),
+        "growth": SensorChannelConfig(base=1.0, noise_std=0.1),
+    })
+    correlation: Optional[List[List[float]]] = None  # noise correlation over ph, temp, ec, growth
+
 class ScenariosConfig(BaseModel):
     duration_days: int
     active_scenarios: List[str]
+    fault_spec: str = "config/faults.yaml"
+    # Stream long horizons in blocks of this many days (None = generate eagerly)
+    stream_block_days: Optional[int] = None
+    workers: Optional[int] = None  # None -> serial loop (one shared host); N -> isolated scenarios on N processes (mcp_host/runner.py)
+    process_model: str = "open_loop"  # open_loop | bioreactor (actions feed back into sensors)
+    # Replay a recorded trace (simulation/traces.py) instead of active_scenarios
+    trace_path: Optional[str] = None
+    trace_days: Optional[List[int]] = None  # [start_day, end_day) window; None = whole trace
+    bioreactor: BioreactorConfig = Field(default_factory=BioreactorConfig)
+    baseline_model: str = "iid"  # iid | sensor_models
+    sensor_models: SensorModelsConfig = Field(default_factory=SensorModelsConfig)
+
+class MonteCarloConfig(BaseModel):
+    replicates: int = 1000  # per scenario
+    workers: Optional[int] = None  # None -> os.cpu_count()
+    batch_size: int = 50  # replicates per worker task
+    confidence: float = 0.95
+
+class FuzzConfig(BaseModel):
+    cases: int = 100000
+    batch_size: int = 4096  # cases evaluated together by the batch engine
+    days: int = 30
+    max_faults: int = 4  # per case
+    fault_types: List[str] = Field(default_factory=lambda: ["spike", "drift", "dropout", "timestamp_skew", "inconsistency"])
+    unrestricted_bias: float = 0.6  # share of ACT_UNRESTRICTED proposals (adversarial agent)
+    cross_check_every: int = 1000  # replay every n-th case through the scalar host (0 = off)
+    max_reported: int = 20  # shrunk failing cases kept in the report
+
+class SweepConfig(BaseModel):
+    runs: int = 500  # per scenario, shared by all grid points
+    days: Optional[int] = None  # None -> scenarios.duration_days
+    workers: Optional[int] = None  # None -> 1 (in-process)
+    detector: str = "degraded_mode"  # scored for latency / false positives (evaluation/detection.py DETECTORS)
+    cache: str = "logs/sweeps/sweep_cache.jsonl"  # point results keyed by config hash
+    grid: Dict[str, List[float]] = Field(default_factory=lambda: {
+        "thresholds.z_score": [2.5, 3.0, 3.5],
+        "thresholds.cusum_h": [3.0, 4.0, 5.0, 6.0],
+        "thresholds.cusum_k": [0.25, 0.5, 0.75],
+    })
+
+class CalibrationConfig(BaseModel):
+    method: str = "cem"  # random | cem (cross-entropy: later generations sample around the best candidates)
+    trials: int = 200  # candidates scored, besides the current config
+    population: int = 25  # cem: candidates per generation
+    elite_frac: float = 0.2  # cem: share of all candidates so far the next generation is fitted to
+    workers: Optional[int] = None  # None -> os.cpu_count()
+    runs: int = 200  # generated runs per scenario
+    days: Optional[int] = None  # None -> scenarios.duration_days
+    seed: Optional[int] = None  # None -> seeds.global_seed
+    label_scenarios: List[str] = Field(default_factory=lambda: ["S1", "S2", "S3", "S4", "S5", "S6", "S7", "S8"])  # experiments ScenarioGenerator ground truths
+    space: Dict[str, List[float]] = Field(default_factory=lambda: {  # dotted trust_engine key -> [low, high]
+        "thresholds.z_score": [2.0, 5.0],
+        "thresholds.cusum_h": [2.0, 8.0],
+        "thresholds.cusum_k": [0.1, 1.0],
+        "penalties.range_violation": [0.2, 1.0],
+        "penalties.stale_data": [0.2, 1.0],
+        "penalties.inconsistent_signals": [0.1, 0.8],
+        "penalties.drift_suspected": [0.05, 0.6],
+    })
+    weights: Dict[str, float] = Field(default_factory=lambda: {  # loss = sum(weight * metric)
+        "ttd_mean": 1.0,
+        "miss_rate": 5.0,
+        "false_positive_rate": 50.0,
+        "flag_error_rate": 5.0,
+        "mode_error_rate": 5.0,
+    })
+    output: str = "config/config.calibrated.yaml"
 
 class AppConfig(BaseModel):
     project: ProjectConfig
+    logging: LoggingConfig = Field(default_factory=LoggingConfig)
+    checkpoint: CheckpointConfig = Field(default_factory=CheckpointConfig)
     deployment: DeploymentConfig
     trust_engine: TrustEngineConfig
     seeds: SeedConfig
     scenarios: ScenariosConfig
+    montecarlo: MonteCarloConfig = Field(default_factory=MonteCarloConfig)
+    fuzz: FuzzConfig = Field(default_factory=FuzzConfig)
+    sweep: SweepConfig = Field(default_factory=SweepConfig)
+    calibration: CalibrationConfig = Field(default_factory=CalibrationConfig)
 
 def load_config(path: str = "config/config.yaml") -> AppConfig:
     with open(path, "r") as f:
         raw = yaml.safe_load(f)
     return AppConfig(**raw)
+
+def config_hash(config: AppConfig) -> str:
+    """
+    Short stable digest of everything that can change results. project,
+    logging and checkpoint only say where and how output is written and are
+    left out.
+    """
+    raw = config.model_dump(mode="json", exclude={"project", "logging", "checkpoint"})
+    return hashlib.sha256(json.dumps(raw, sort_keys=True).encode()).hexdigest()[:16]
+
+def resolve_path(path: str) -> str:
+    """Relative config paths (fault spec, traces) resolve against the CWD first, then the V3 root."""
+    if os.path.isabs(path) or os.path.exists(path):
+        return path
+    v3_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(v3_root, path)
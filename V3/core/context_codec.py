@@ -0,0 +1,87 @@
+from typing import Dict, Any, List, Optional
+from .types import HostPayloadV1
+
+# Compact prompt encoding of HostPayloadV1.
+# Bump ENCODING_VERSION whenever the rendered text changes (it is part of the
+# prompt, so it changes cassette keys and KV-cache reuse).
+ENCODING_VERSION = "c1"
+PAYLOAD_SCHEMA = "v1"
+
+# Short sensor keys and display precision (rounded to sensor resolution)
+SENSOR_KEYS = {"ph": "pH", "temp": "T", "ec": "EC", "growth": "G"}
+SENSOR_DECIMALS = {"ph": 2, "temp": 1, "ec": 2, "growth": 2}
+DEFAULT_DECIMALS = 2
+
+# One-off legend for the system prompt (constant, so it stays in the KV cache)
+LEGEND = (
+    f"STATE LINE FORMAT ({ENCODING_VERSION}): d=day, trust=score, mode=autonomy mode, "
+    "flags=raised flags only ('-' if none). Sensors: pH, T=temperature (C), "
+    "EC=conductivity, G=growth; (+x/-x)=change since previous day; NA=missing."
+)
+
+
+class CompactContextEncoder:
+    """
+    Renders a HostPayloadV1 as a single stable, token-efficient state line:
+
+        c1 d=4 trust=0.80 mode=FULL_AUTONOMY flags=drift_suspected pH=10.14(+0.04) T=31.7(-0.5) EC=1.49(+0.02) G=0.97(0)
+
+    Values are rounded to sensor resolution, only raised flags are listed and
+    deltas are given against the previous day's payload (consecutive days only;
+    the encoder resets itself when a new scenario restarts the day counter).
+    """
+    def __init__(self):
+        self.prev: Optional[HostPayloadV1] = None
+
+    def reset(self) -> None:
+        self.prev = None
+
+    @staticmethod
+    def _fmt(value: float, decimals: int) -> str:
+        text = f"{value:.{decimals}f}"
+        # Strip redundant trailing zeros ("1.50" -> "1.5", "2.00" -> "2")
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+        return "0" if text in ("-0", "") else text
+
+    def _sensor_items(self, payload: HostPayloadV1) -> List[str]:
+        prev_sensors = self.prev.sensor_context if (
+            self.prev is not None and payload.day == self.prev.day + 1
+        ) else {}
+        # Fixed key order keeps the encoding stable regardless of dict order
+        ordered = [k for k in SENSOR_KEYS if k in payload.sensor_context] + \
+                  sorted(k for k in payload.sensor_context if k not in SENSOR_KEYS)
+        items = []
+        for sid in ordered:
+            value = payload.sensor_context[sid]
+            key = SENSOR_KEYS.get(sid, sid)
+            if not isinstance(value, (int, float)):
+                items.append(f"{key}=NA")
+                continue
+            dec = SENSOR_DECIMALS.get(sid, DEFAULT_DECIMALS)
+            item = f"{key}={self._fmt(value, dec)}"
+            prev_value = prev_sensors.get(sid)
+            if isinstance(prev_value, (int, float)):
+                delta = round(value, dec) - round(prev_value, dec)
+                sign = "+" if delta > 0 else ""
+                item += f"({sign}{self._fmt(delta, dec)})"
+            items.append(item)
+        return items
+
+    def encode(self, payload: HostPayloadV1) -> str:
+        if payload.schema_version != PAYLOAD_SCHEMA:
+            raise ValueError(
+                f"Context encoding {ENCODING_VERSION} expects HostPayload {PAYLOAD_SCHEMA}, "
+                f"got {payload.schema_version}"
+            )
+        trust = payload.trust_context
+        flags = [f for f in trust.get("flags", []) if f]
+        parts = [
+            ENCODING_VERSION,
+            f"d={payload.day}",
+            f"trust={trust.get('score', 0.0):.2f}",
+            f"mode={trust.get('mode', 'UNKNOWN')}",
+            f"flags={','.join(flags) if flags else '-'}",
+        ] + self._sensor_items(payload)
+        self.prev = payload
+        return " ".join(parts)
@@ -0,0 +1,36 @@
+import numpy as np
+from typing import Dict, Iterable, List, Union
+
+# Trust flags in engine order; bit i of a flag mask is FLAG_NAMES[i]
+FLAG_NAMES = (
+    "range_violation",
+    "drift_suspected",
+    "stale_data",
+    "timestamp_anomaly",
+    "inconsistent_signals",
+)
+FLAG_BITS = {name: 1 << i for i, name in enumerate(FLAG_NAMES)}
+FLAG_DTYPE = np.uint8
+
+
+def flags_to_mask(flags: Union[Dict[str, bool], Iterable[str]]) -> int:
+    """Raised flags (TrustAssessment.flags dict or list of names) -> bitmask."""
+    names = [k for k, v in flags.items() if v] if isinstance(flags, dict) else flags
+    mask = 0
+    for name in names:
+        if name not in FLAG_BITS:
+            raise ValueError(f"Unknown trust flag: {name}")
+        mask |= FLAG_BITS[name]
+    return mask
+
+
+def mask_to_flags(mask: int) -> List[str]:
+    """Bitmask -> raised flag names, in engine order."""
+    return [name for name, bit in FLAG_BITS.items() if int(mask) & bit]
+
+
+def parse_flags(flags_str: str) -> int:
+    """Bitmask of a pipe-joined flags string as written to the experiment log."""
+    if not isinstance(flags_str, str) or not flags_str:
+        return 0
+    return flags_to_mask(flags_str.split("|"))
@@ -1,19 +1,77 @@
 import os
 import csv
-from typing import Optional
-from .config import AppConfig
+import time
+import queue
+import atexit
+import threading
+from typing import Optional, Dict, Any, List
+from .config import AppConfig, LoggingConfig
+from .flags import flags_to_mask
+from .columnar import ColumnarLogWriter, PARQUET_LOG_DIR
+
+# Per-decision LLM accounting columns, filled from the agent's telemetry
+# (blank for agents that do not report it, e.g. the mock agent).
+TELEMETRY_COLUMNS = [
+    "route",
+    "routed_model",
+    "breaker_state",
+    "latency_ms",
+    "prompt_tokens",
+    "completion_tokens",
+    "prompt_eval_ms",
+    "eval_ms",
+    "load_ms",
+    "cache_hit",
+]
+
+# True process state after the day's action (closed-loop bioreactor runs only)
+PROCESS_COLUMNS = ["biomass", "produced"]
+
+# Sentinel telling the background writer to drain and stop
+_STOP = object()
 
 class ExperimentLogger:
     """
     Handles audit-proof logging for V3 experiments.
     Enforces schema with backend, model, and explicit action tracking.
+
+    logging.mode "sync" writes and flushes every row (one syscall per step).
+    "buffered" queues rows for a background writer thread that writes them in
+    blocks, at the latest after flush_interval_s or flush_rows. Queued rows
+    are drained when the context exits (also on exceptions) and, as a last
+    resort, at interpreter exit (unhandled errors, sys.exit).
+
+    logging.format "parquet" writes typed rows to a partitioned Parquet
+    dataset instead (see core/columnar.py); log_path is then the run's
+    directory. Parquet rows are always written in flush_rows blocks - the
+    mode only selects whether the caller or the writer thread writes them.
+
+    position() flushes and returns where the log ends; passing it back as
+    `resume` appends to that log instead of replacing it, dropping anything
+    written after the position (see core/checkpoint.py).
     """
-    def __init__(self, config: AppConfig):
+    def __init__(self, config: AppConfig, resume: Optional[Dict[str, Any]] = None):
         self.config = config
         self.output_dir = config.project.output_dir
-        self.log_path = os.path.join(self.output_dir, "experiment_log.csv")
         self.file = None
         self.writer = None
+        self.log_cfg = getattr(config, "logging", None) or LoggingConfig()
+        self.buffered = self.log_cfg.mode == "buffered"
+        self.columnar = self.log_cfg.format == "parquet"
+        self.resume = resume
+        if resume is not None and resume["format"] != self.log_cfg.format:
+            raise ValueError(f"Cannot resume a {resume['format']} log with logging.format {self.log_cfg.format}")
+        self.run_id = resume["run_id"] if resume else (self.log_cfg.run_id or time.strftime("%Y%m%dT%H%M%S"))
+        if self.columnar:
+            self.log_path = os.path.join(self.output_dir, PARQUET_LOG_DIR, f"run={self.run_id}")
+        else:
+            self.log_path = os.path.join(self.output_dir, "experiment_log.csv")
+        self._step = resume["rows"] if resume else 0
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pending: List[list] = []
+        self._error: Optional[BaseException] = None
         
         # Resolve Backend/Model from Config or Env (Audit Sourcing)
         # Priority: Env > Config > Default
@@ -22,8 +80,20 @@ class ExperimentLogger:
 
     def __enter__(self):
         os.makedirs(self.output_dir, exist_ok=True)
-        # Overwrite mode for new experiment run
-        self.file = open(self.log_path, "w", newline="")
+        if self.columnar:
+            self.writer = ColumnarLogWriter(os.path.dirname(self.log_path), self.run_id,
+                                            parts=self.resume["parts"] if self.resume else None)
+            self._start_writer()
+            return self
+
+        if self.resume:
+            # Append after the last checkpointed row
+            self.file = open(self.log_path, "r+", newline="")
+            self.file.truncate(self.resume["bytes"])
+            self.file.seek(0, os.SEEK_END)
+        else:
+            # Overwrite mode for new experiment run
+            self.file = open(self.log_path, "w", newline="")
         self.writer = csv.writer(self.file)
         
         # Schema Definition
@@ -40,14 +110,115 @@ class ExperimentLogger:
             "model_digest",
             "status", 
             "override", 
-            "action" # Deprecated, alias for executed_action
-        ]
-        self.writer.writerow(self.headers)
+            "action", # Deprecated, alias for executed_action
+        ] + TELEMETRY_COLUMNS + PROCESS_COLUMNS
+        if not self.resume:
+            self.writer.writerow(self.headers)
+            self.file.flush()
+        self._start_writer()
         return self
 
+    def _start_writer(self):
+        if self.buffered:
+            # The queue holds whole blocks of flush_rows rows
+            self._queue = queue.Queue(maxsize=max(1, self.log_cfg.queue_max // max(1, self.log_cfg.flush_rows)))
+            self._thread = threading.Thread(target=self._writer_loop, name="ExperimentLogger", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def flush(self):
+        """Write every row logged so far (waits for the writer thread in buffered mode)."""
+        if self._queue is not None:
+            with self._lock:
+                block, self._pending = self._pending, []
+                if block:
+                    self._queue.put(block)
+            self._queue.join()
+        elif self.columnar and self._pending:
+            self._write_block(self._pending)
+            self._pending = []
+        if self._error is not None:
+            raise RuntimeError(f"Log writer failed: {self._error}") from self._error
+
+    def position(self) -> Dict[str, Any]:
+        """Flush and return the end of the log (rows, plus CSV bytes or Parquet part files)."""
+        self.flush()
+        pos = {"format": self.log_cfg.format, "run_id": self.run_id, "rows": self._step}
+        if self.columnar:
+            pos["parts"] = self.writer.parts
+        else:
+            pos["bytes"] = self.file.tell()
+        return pos
+
+    def close(self):
+        """Drain pending rows, stop the writer thread and close the file (idempotent)."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+            self._queue = None
+            atexit.unregister(self.close)
+        elif self.columnar and self._pending:
+            self._write_block(self._pending)
+            self._pending = []
+        if self.columnar:
+            self.writer = None
         if self.file:
             self.file.close()
+            self.file = None
+            self.writer = None
+        if self._error is not None:
+            err, self._error = self._error, None
+            raise RuntimeError(f"Log writer failed: {err}") from err
+
+    def _writer_loop(self):
+        """
+        Background writer. Full blocks arrive through the queue; rows still
+        pending when flush_interval_s passes without a block are taken
+        directly, but only while the queue is empty (checked under the lock):
+        a block enqueued after the timeout holds older rows than the new
+        pending ones and is written first. One writerows + flush per block.
+        Every queue item is marked done once written, so flush() can wait on
+        the queue.
+        """
+        stop = False
+        owed = False
+        try:
+            while not stop:
+                try:
+                    block = self._queue.get(timeout=self.log_cfg.flush_interval_s)
+                    owed = True
+                except queue.Empty:
+                    block = None
+                if block is _STOP:
+                    stop, block = True, None
+                if block is None:
+                    with self._lock:
+                        if stop or self._queue.empty():
+                            block, self._pending = self._pending, []
+                if block:
+                    self._write_block(block)
+                if owed:
+                    owed = False
+                    self._queue.task_done()
+        except BaseException as e:
+            self._error = e
+            if owed:
+                self._queue.task_done()
+            # Keep consuming so producers never block on a full queue
+            while not stop:
+                stop = self._queue.get() is _STOP
+                self._queue.task_done()
+
+    def _write_block(self, block: List[list]):
+        if self.columnar:
+            self.writer.write(block)
+        else:
+            self.writer.writerows(block)
+            self.file.flush()
 
     def log_result(self, 
                    scenario_id: str, 
@@ -59,25 +230,60 @@ class ExperimentLogger:
                    executed_action: str, 
                    status: str, 
                    override: bool,
-                   model_digest: str = ""):
+                   model_digest: str = "",
+                   telemetry: Optional[Dict[str, Any]] = None,
+                   process: Optional[Dict[str, Any]] = None):
         """
         Log a single simulation step result.
         """
-        row = [
-            scenario_id,
-            day,
-            self.backend,
-            self.model,
-            f"{trust_score:.4f}", # Format score for consistency
-            mode,
-            flags,
-            proposed_action,
-            executed_action,
-            model_digest,
-            status,
-            override,
-            executed_action # Legacy action column
-        ]
-        if self.writer:
+        telemetry = telemetry or {}
+        process = process or {}
+        if self.columnar:
+            # Typed values in core/columnar.py LOG_COLUMNS order
+            row = [
+                self._step, scenario_id, day, self.backend, self.model, trust_score, mode,
+                flags_to_mask(flags.split("|") if flags else []),
+                proposed_action, executed_action, model_digest, status, bool(override),
+            ] + [telemetry.get(c) for c in TELEMETRY_COLUMNS] + [process.get(c) for c in PROCESS_COLUMNS]
+        else:
+            row = [
+                scenario_id,
+                day,
+                self.backend,
+                self.model,
+                f"{trust_score:.4f}", # Format score for consistency
+                mode,
+                flags,
+                proposed_action,
+                executed_action,
+                model_digest,
+                status,
+                override,
+                executed_action, # Legacy action column
+            ] + [
+                "" if telemetry.get(c) is None else telemetry[c]
+                for c in TELEMETRY_COLUMNS
+            ] + [
+                "" if process.get(c) is None else f"{process[c]:.4f}"
+                for c in PROCESS_COLUMNS
+            ]
+        self._step += 1
+        if self._queue is not None:
+            if self._error is not None:
+                raise RuntimeError(f"Log writer failed: {self._error}") from self._error
+            with self._lock:
+                self._pending.append(row)
+                if len(self._pending) >= self.log_cfg.flush_rows:
+                    # Enqueue under the lock: the writer's interval pickup of
+                    # self._pending checks for queued blocks under it too
+                    block, self._pending = self._pending, []
+                    self._queue.put(block)
+        elif self.columnar and self.writer:
+            # No per-row flush for Parquet: collect a block on the caller's thread
+            self._pending.append(row)
+            if len(self._pending) >= self.log_cfg.flush_rows:
+                block, self._pending = self._pending, []
+                self._write_block(block)
+        elif self.writer:
             self.writer.writerow(row)
             self.file.flush()
@@ -0,0 +1,311 @@
+"""
+Trust-Gated MCP v3 - Automatic Threshold Calibration
+====================================================
+
+Searches the trust engine's thresholds and penalties (calibration.space:
+dotted trust_engine key -> [low, high]) for the lowest weighted loss and
+writes a ready-to-use config with the winner, instead of hand-tuning them
+(cf. the "Relaxed from 4.0 to prevent noise false positives" comments in
+experiments/trust_engine/core.py).
+
+Every candidate is scored by vectorized replays (see evaluation/sweep.py)
+against two kinds of labels:
+
+    fault windows   V3 fault programs (config/faults.yaml) over `runs`
+                    generated runs per scenario: ttd_mean, miss_rate (1 -
+                    detection_rate) and false_positive_rate of sweep.detector
+    ground truths   the hand-labeled scenarios of the experiments
+                    ScenarioGenerator (expected flags and autonomy mode per
+                    day): flag_error_rate (wrong flag bits / flag-days) and
+                    mode_error_rate (wrong modes / days)
+
+    loss = sum(calibration.weights[m] * m)
+
+Search (calibration.method):
+    random  `trials` candidates drawn uniformly from the space
+    cem     cross-entropy search: the first generation is uniform, each later
+            one is drawn from a normal fitted to the elite (best elite_frac of
+            all candidates so far), clipped to the space
+
+Candidates are evaluated one generation (`population`) at a time on a
+process pool; sampling is seeded (calibration.seed or seeds.global_seed) and
+does not depend on the worker count. The current config is always scored
+first as the baseline, so the emitted config is never worse under the loss.
+
+Usage (from V3):
+    python evaluation/calibrate.py --trials 400 --workers 8
+    python evaluation/calibrate.py --method random --output config/config.calibrated.yaml
+"""
+
+import sys
+import os
+import re
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+# The legacy experiments package (labeled scenarios) lives next to V3
+repo_root = os.path.dirname(v3_root)
+if repo_root not in sys.path:
+    sys.path.append(repo_root)
+
+try:
+    from experiments.scenarios.generator import ScenarioGenerator
+    HAS_EXPERIMENTS = True
+except ImportError:
+    HAS_EXPERIMENTS = False
+
+from core.config import AppConfig, load_config
+from core.flags import FLAG_BITS
+from simulation.arrays import SENSOR_IDS
+from trust_engine.batch import MODE_CODES
+from evaluation.sweep import SweepData, apply_params, evaluate_point, replay, resolve_key
+
+LOSS_METRICS = ["ttd_mean", "miss_rate", "false_positive_rate", "flag_error_rate", "mode_error_rate"]
+# Decimals kept for candidate values (the emitted config holds exactly what was scored)
+DECIMALS = 4
+
+
+class LabelSet:
+    """Hand-labeled experiments scenarios as one batch: (scenarios, days, sensors) arrays plus labels."""
+    def __init__(self, scenario_ids: List[str]):
+        if not HAS_EXPERIMENTS:
+            raise RuntimeError("Labeled scenarios need the experiments package next to V3")
+        scenarios = [ScenarioGenerator().generate_scenario(sc) for sc in scenario_ids]
+        self.scenario_ids = list(scenario_ids)
+        self.n_days = min(len(s.data) for s in scenarios)
+        shape = (len(scenarios), self.n_days, len(SENSOR_IDS))
+        self.values = np.zeros(shape)
+        self.missing = np.zeros(shape, dtype=bool)
+        self.timestamps = np.zeros(shape, dtype=np.int64)
+        # Same layout as ScenarioArrays, so sweep.replay() can run it
+        self.days = np.arange(self.n_days, dtype=np.int64)
+        self.flags = np.zeros(shape[:2], dtype=np.uint8)
+        self.modes = np.zeros(shape[:2], dtype=np.int64)
+        for i, s in enumerate(scenarios):
+            for d in range(self.n_days):
+                for j, sid in enumerate(SENSOR_IDS):
+                    r = s.data[d].readings[sid]
+                    self.values[i, d, j] = r.value
+                    self.missing[i, d, j] = r.is_missing
+                    self.timestamps[i, d, j] = r.timestamp_day
+                gt = s.ground_truths[d]
+                for name, on in gt.expected_flags.items():
+                    if on:
+                        self.flags[i, d] |= FLAG_BITS[name]
+                self.modes[i, d] = MODE_CODES[gt.expected_autonomy.value]
+
+    def __len__(self) -> int:
+        return len(self.scenario_ids)
+
+    def errors(self, cfg: AppConfig) -> Dict[str, float]:
+        """Flag-bit and mode disagreement of cfg's trust engine with the labels."""
+        _, modes, flags = replay(cfg.trust_engine, self, len(self), self.n_days)
+        wrong_bits = np.unpackbits((flags ^ self.flags)[..., None], axis=-1).sum()
+        return {
+            "flag_error_rate": round(float(wrong_bits) / (flags.size * len(FLAG_BITS)), 6),
+            "mode_error_rate": round(float((modes != self.modes).mean()), 6),
+        }
+
+
+def score_candidate(cfg: AppConfig, params: Dict[str, float], data: SweepData,
+                    labels: Optional[LabelSet], weights: Dict[str, float], detector: str) -> Dict[str, Any]:
+    """Metrics and weighted loss of one candidate (metrics that are not available add nothing)."""
+    m = evaluate_point(cfg, params, data, detector)
+    m["miss_rate"] = None if m["detection_rate"] is None else round(1.0 - m["detection_rate"], 4)
+    if labels is not None:
+        m.update(labels.errors(apply_params(cfg, params)))
+    m["loss"] = round(sum(w * m[k] for k, w in weights.items() if m.get(k) is not None), 6)
+    return m
+
+
+def sample_uniform(rng: np.random.Generator, space: Dict[str, List[float]], n: int) -> List[Dict[str, float]]:
+    cols = {k: rng.uniform(lo, hi, n) for k, (lo, hi) in space.items()}
+    return [{k: round(float(cols[k][i]), DECIMALS) for k in space} for i in range(n)]
+
+
+def sample_elite(rng: np.random.Generator, space: Dict[str, List[float]],
+                 elite: pd.DataFrame, n: int) -> List[Dict[str, float]]:
+    """Normal fitted to the elite per parameter (std floored at 5% of the range), clipped to the space."""
+    cols = {}
+    for k, (lo, hi) in space.items():
+        std = max(float(elite[k].std(ddof=0)), 0.05 * (hi - lo))
+        cols[k] = np.clip(rng.normal(float(elite[k].mean()), std, n), lo, hi)
+    return [{k: round(float(cols[k][i]), DECIMALS) for k in space} for i in range(n)]
+
+
+# Worker state: shared arrays and labels are sent once per process
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(cfg, data, labels, weights, detector) -> None:
+    _worker.update(cfg=cfg, data=data, labels=labels, weights=weights, detector=detector)
+
+
+def _score_worker(params: Dict[str, float]) -> Dict[str, Any]:
+    w = _worker
+    return score_candidate(w["cfg"], params, w["data"], w["labels"], w["weights"], w["detector"])
+
+
+def calibrate(cfg: AppConfig, trials: Optional[int] = None, method: Optional[str] = None,
+              workers: Optional[int] = None, runs: Optional[int] = None, days: Optional[int] = None,
+              scenario_ids: Optional[List[str]] = None, seed: Optional[int] = None,
+              verbose: bool = True) -> pd.DataFrame:
+    """
+    Run the search. Returns one row per scored candidate (trial 0 = the
+    current config): generation, parameters, metrics and loss.
+    """
+    c = cfg.calibration
+    trials = trials or c.trials
+    method = method or c.method
+    if method not in ("random", "cem"):
+        raise ValueError(f"Unknown calibration method {method!r} (random | cem)")
+    workers = workers or c.workers or os.cpu_count() or 1
+    runs = runs or c.runs
+    days = days or c.days or cfg.scenarios.duration_days
+    scenario_ids = list(scenario_ids or cfg.scenarios.active_scenarios)
+    detector = cfg.sweep.detector
+    seed = seed if seed is not None else (c.seed if c.seed is not None else cfg.seeds.global_seed)
+    space = {resolve_key(k): [float(lo), float(hi)] for k, (lo, hi) in c.space.items()}
+    unknown = set(c.weights) - set(LOSS_METRICS)
+    if unknown:
+        raise ValueError(f"Unknown loss metrics {sorted(unknown)} (one of {', '.join(LOSS_METRICS)})")
+
+    data = SweepData(cfg, scenario_ids, runs, days)
+    labels = LabelSet(c.label_scenarios) if c.label_scenarios and HAS_EXPERIMENTS else None
+    if c.label_scenarios and labels is None and verbose:
+        print("experiments package not found: scoring without ground-truth labels", flush=True)
+    population = trials if method == "random" else max(2, c.population)
+    rng = np.random.default_rng(seed)
+
+    current = {}
+    for key in space:
+        section, name = key.split(".", 1)
+        current[key] = float(getattr(getattr(cfg.trust_engine, section), name))
+
+    rows: List[Dict[str, Any]] = []
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(cfg, data, labels, c.weights, detector)) if workers > 1 else None
+    try:
+        def score(candidates: List[Dict[str, float]], generation: int) -> None:
+            if pool is not None:
+                results = pool.map(_score_worker, candidates)
+            else:
+                results = (score_candidate(cfg, p, data, labels, c.weights, detector)
+                           for p in candidates)
+            for p, m in zip(candidates, results):
+                rows.append(dict(trial=len(rows), generation=generation, **p, **m))
+
+        score([current], -1)
+        generation = 0
+        while len(rows) - 1 < trials:
+            n = min(population, trials - (len(rows) - 1))
+            if method == "random" or generation == 0:
+                candidates = sample_uniform(rng, space, n)
+            else:
+                done = pd.DataFrame(rows)
+                n_elite = max(2, int(round(c.elite_frac * len(done))))
+                candidates = sample_elite(rng, space, done.nsmallest(n_elite, "loss"), n)
+            score(candidates, generation)
+            if verbose:
+                best = min(r["loss"] for r in rows)
+                print(f"  generation {generation}: {len(rows) - 1}/{trials} trials, best loss {best}", flush=True)
+            generation += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    df = pd.DataFrame(rows)
+    return df[["trial", "generation"] + list(space) +
+              [col for col in df.columns if col not in space and col not in ("trial", "generation")]]
+
+
+def write_config(src_path: str, params: Dict[str, float], out_path: str, header: str = "") -> None:
+    """
+    Copy of the YAML config at src_path with the trust_engine values in
+    `params` replaced in place (comments and layout kept), checked by loading it back.
+    """
+    pending = {resolve_key(k): v for k, v in params.items()}
+    with open(src_path) as f:
+        lines = f.read().splitlines(keepends=True)
+    in_engine, section_indent, section = False, None, None
+    for i, line in enumerate(lines):
+        code = line.split("#", 1)[0].rstrip()
+        if not code.strip():
+            continue
+        indent = len(line) - len(line.lstrip())
+        name = code.strip().split(":", 1)[0]
+        if indent == 0:
+            in_engine, section_indent, section = name == "trust_engine", None, None
+            continue
+        if not in_engine:
+            continue
+        if section_indent is None or indent <= section_indent:
+            section_indent, section = indent, name
+            continue
+        key = f"{section}.{name}"
+        if key in pending:
+            m = re.match(r"^(\s*[\w]+:\s*)([^#\r\n]*?)(\s*(#.*)?)(\r?\n)?$", line)
+            lines[i] = f"{m.group(1)}{pending.pop(key)!r}{m.group(3)}{m.group(5) or ''}"
+    if pending:
+        raise ValueError(f"{src_path} has no trust_engine entry for {sorted(pending)}")
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w") as f:
+        if header:
+            f.write("".join(f"# {h}\n" for h in header.splitlines()))
+        f.writelines(lines)
+    written = load_config(out_path)
+    for key, value in params.items():
+        section, name = resolve_key(key).split(".", 1)
+        if getattr(getattr(written.trust_engine, section), name) != value:
+            raise ValueError(f"{out_path}: {key} did not round-trip")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Trust Threshold Calibration")
+    parser.add_argument("--config", default=os.path.join(v3_root, "config", "config.yaml"))
+    parser.add_argument("--method", choices=["random", "cem"], default=None, help="Default: calibration.method")
+    parser.add_argument("--trials", type=int, default=None, help="Candidates to score (default: calibration.trials)")
+    parser.add_argument("--workers", type=int, default=None, help="Default: calibration.workers or all CPUs")
+    parser.add_argument("--runs", type=int, default=None, help="Generated runs per scenario (default: calibration.runs)")
+    parser.add_argument("--days", type=int, default=None, help="Default: calibration.days or scenarios.duration_days")
+    parser.add_argument("--scenarios", nargs="*", default=None, help="Default: active_scenarios")
+    parser.add_argument("--seed", type=int, default=None, help="Default: calibration.seed or seeds.global_seed")
+    parser.add_argument("--output", default=None, help="Calibrated config (default: calibration.output)")
+    parser.add_argument("--output-dir", default=None, help="Trial table directory (default: project.output_dir)")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    df = calibrate(cfg, trials=args.trials, method=args.method, workers=args.workers, runs=args.runs,
+                   days=args.days, scenario_ids=args.scenarios, seed=args.seed)
+
+    output_dir = args.output_dir or cfg.project.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    trials_path = os.path.join(output_dir, "calibration_trials.csv")
+    df.to_csv(trials_path, index=False)
+
+    space = [resolve_key(k) for k in cfg.calibration.space]
+    baseline, best = df.iloc[0], df.loc[df["loss"].idxmin()]
+    params = {k: float(best[k]) for k in space}
+    out_path = args.output or cfg.calibration.output
+    header = (f"Calibrated by evaluation/calibrate.py from {os.path.basename(args.config)}: "
+              f"{args.method or cfg.calibration.method}, {len(df) - 1} trials, "
+              f"loss {best['loss']} (was {baseline['loss']})")
+    write_config(args.config, params, out_path, header)
+
+    metrics = [m for m in ["loss"] + LOSS_METRICS + ["detection_rate", "override_rate"] if m in df.columns]
+    print("\n=== V3 Calibration ===")
+    print(pd.DataFrame({"current": baseline[space + metrics], "calibrated": best[space + metrics]}).to_string())
+    print(f"Trials saved to: {trials_path}")
+    print(f"Calibrated config saved to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Trust-Gated MCP v3 - Detection Latency / False Positive Metrics
+===============================================================
+
+How fast each detector catches a fault, how often it fires on clean data,
+and how long it takes to settle once the fault is gone - per scenario and
+per fault type, as distributions over many runs.
+
+Definitions (per run and detector; the fault window of a scenario is
+[onset, clear): earliest onset to latest end over its faults, clear = the
+horizon if any fault never ends):
+
+    time_to_detection   first day in [onset, clear) the detector fires, minus onset
+                        (undetected runs count towards detection_rate only)
+    time_to_recovery    detected runs only: first day >= clear the detector is
+                        silent, minus clear (needs clear < horizon)
+    false_positive_rate detector firings / nominal days, pooled over runs.
+                        Nominal = before onset, and from the recovery day on
+                        (all days for scenarios without faults)
+
+Detectors are the trust flags (core/flags.py) plus "degraded_mode": the
+autonomy mode is below FULL_AUTONOMY, i.e. the gate actually reacted.
+
+Runs come either from simulation (generator + batch trust engine, all runs of
+a scenario evaluated together, one seed stream per scenario as in
+simulation/montecarlo.py) or from experiment logs (one run per log run/file).
+
+Usage (from V3):
+    python evaluation/detection.py --runs 2000 --days 30
+    python evaluation/detection.py --log logs/runs/experiment_log.csv
+"""
+
+import sys
+import os
+import json
+import numpy as np
+from typing import Dict, List, Optional, Tuple, Any
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.config import AppConfig, load_config
+from core.flags import FLAG_BITS, FLAG_NAMES
+from core.columnar import read_log
+from simulation.arrays import SENSOR_IDS
+from simulation.generator import SeededGenerator
+from simulation.montecarlo import scenario_seed
+from trust_engine.batch import BatchTrustEngine, MODE_CODES, FULL_AUTONOMY
+
+DEGRADED_MODE = "degraded_mode"
+DETECTORS = FLAG_NAMES + (DEGRADED_MODE,)
+
+
+def fault_window(program, horizon: int) -> Tuple[Optional[int], int]:
+    """(onset, clear) of a scenario's fault program; onset None for fault-free scenarios."""
+    if not program.faults:
+        return None, horizon
+    onset = min(f.onset for f in program.faults)
+    ends = [f.end for f in program.faults]
+    clear = horizon if any(e is None for e in ends) else min(max(ends), horizon)
+    return onset, clear
+
+
+def fault_type(program) -> str:
+    """Scenario type used for pooling: sorted fault types joined by '+', 'none' if clean."""
+    return "+".join(sorted({f.type for f in program.faults})) or "none"
+
+
+def detector_hits(flags: np.ndarray, modes: np.ndarray) -> Dict[str, np.ndarray]:
+    """(runs, days) boolean firing matrix per detector."""
+    hits = {name: (flags & FLAG_BITS[name]) != 0 for name in FLAG_NAMES}
+    hits[DEGRADED_MODE] = modes != FULL_AUTONOMY
+    return hits
+
+
+def _first(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True per row, -1 where none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), -1)
+
+
+def detection_arrays(fired: np.ndarray, onset: Optional[int], clear: int) -> Dict[str, np.ndarray]:
+    """
+    Per-run metrics of one detector from its (runs, days) firing matrix:
+    ttd / ttr (float, NaN = not applicable) and false-positive / nominal day counts.
+    """
+    runs, horizon = fired.shape
+    t = np.arange(horizon)
+    nan = np.full(runs, np.nan)
+    if onset is None or onset >= horizon:
+        return {"ttd": nan, "ttr": nan.copy(), "fp": fired.sum(axis=1), "nominal": np.full(runs, horizon)}
+
+    first = _first(fired & (t >= onset) & (t < clear))
+    detected = first >= 0
+    ttd = np.where(detected, first - onset, np.nan)
+
+    # Recovery: first silent day from clear on (undetected runs are "recovered" at clear)
+    if clear < horizon:
+        silent = _first(~fired & (t >= clear))
+        recovered_at = np.where(detected, np.where(silent >= 0, silent, horizon), clear)
+        ttr = np.where(detected & (silent >= 0), silent - clear, np.nan)
+    else:
+        recovered_at = np.full(runs, horizon)
+        ttr = nan.copy()
+
+    nominal = (t < onset) | (t >= recovered_at[:, None])
+    return {"ttd": ttd, "ttr": ttr, "fp": (fired & nominal).sum(axis=1), "nominal": nominal.sum(axis=1)}
+
+
+def _distribution(values: np.ndarray) -> Optional[Dict[str, float]]:
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return None
+    q = np.quantile(values, [0.5, 0.95])
+    return {"mean": round(float(values.mean()), 4), "p50": float(q[0]), "p95": float(q[1]),
+            "max": float(values.max())}
+
+
+def summarize(per_run: Dict[str, Dict[str, np.ndarray]], has_fault: bool, has_clear: bool) -> Dict[str, Any]:
+    """Distributions per detector from (possibly pooled) per-run arrays."""
+    out = {}
+    for name, a in per_run.items():
+        runs = len(a["ttd"])
+        detected = ~np.isnan(a["ttd"])
+        nominal = int(a["nominal"].sum())
+        entry = {
+            "false_positive_rate": round(float(a["fp"].sum()) / nominal, 4) if nominal else None,
+            "detection_rate": round(float(detected.mean()), 4) if has_fault and runs else None,
+            "time_to_detection": _distribution(a["ttd"]),
+        }
+        if has_clear:
+            n_detected = int(detected.sum())
+            entry["recovery_rate"] = round(float((~np.isnan(a["ttr"])).sum()) / n_detected, 4) if n_detected else None
+            entry["time_to_recovery"] = _distribution(a["ttr"])
+        out[name] = entry
+    return out
+
+
+class DetectionAnalyzer:
+    """Collects per-run detector metrics per scenario and reports distributions."""
+    def __init__(self, config: AppConfig):
+        self.cfg = config
+        self.catalog = SeededGenerator(config).faults
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, scenario_id: str, flags: np.ndarray, modes: np.ndarray, start_day: int = 0) -> None:
+        """Account (runs, days) flag masks and mode codes of one scenario; column 0 is day `start_day`."""
+        program = self.catalog[scenario_id]
+        horizon = start_day + flags.shape[1]
+        onset, clear = fault_window(program, horizon)
+        # detection_arrays works in column positions (an onset before the window goes negative)
+        per_run = {name: detection_arrays(fired, None if onset is None else onset - start_day, clear - start_day)
+                   for name, fired in detector_hits(flags, modes).items()}
+        prev = self.results.get(scenario_id)
+        if prev is not None:
+            if (prev["onset"], prev["clear"]) != (onset, clear):
+                raise ValueError(f"{scenario_id}: runs with different horizons cannot be pooled")
+            per_run = {name: {k: np.concatenate([prev["per_run"][name][k], v]) for k, v in a.items()}
+                       for name, a in per_run.items()}
+        self.results[scenario_id] = {"type": fault_type(program), "onset": onset, "clear": clear,
+                                     "horizon": horizon, "per_run": per_run}
+
+    def simulate(self, scenario_id: str, runs: int, days: Optional[int] = None) -> None:
+        """Generate `runs` independent runs and evaluate them through the batch trust engine."""
+        days = days if days is not None else self.cfg.scenarios.duration_days
+        seed = scenario_seed(self.cfg.seeds.scenario_generation, scenario_id)
+        gen = SeededGenerator(self.cfg, np_rng=np.random.RandomState(np.random.MT19937(seed)))
+        arrays = gen.generate_arrays(scenario_id, days, n_reactors=runs)
+        engine = BatchTrustEngine(self.cfg.trust_engine, runs, SENSOR_IDS)
+        flags = np.empty((runs, days), dtype=np.uint8)
+        modes = np.empty((runs, days), dtype=np.int64)
+        for d in range(days):
+            _, modes[:, d], flags[:, d] = engine.evaluate(
+                arrays.days[d], arrays.values[:, d], arrays.missing[:, d], arrays.timestamps[:, d])
+        self.add(scenario_id, flags, modes)
+
+    def add_log(self, log_path: str) -> None:
+        """Runs recorded in an experiment log (CSV: one run; Parquet dataset: one per run partition)."""
+        df = read_log(log_path, ["run", "scenario_id", "day", "mode", "flags_mask"])
+        if "run" not in df.columns:
+            df["run"] = 0
+        df["mode_code"] = df["mode"].astype(str).map(MODE_CODES).fillna(-1).astype(np.int64)
+        for sc_id, g in df.groupby("scenario_id", sort=False):
+            # Absolute days: a log may start later than day 0 (e.g. a trace_days window)
+            days = range(int(g["day"].min()), int(g["day"].max()) + 1)
+            flags = g.pivot(index="run", columns="day", values="flags_mask").reindex(columns=days)
+            modes = g.pivot(index="run", columns="day", values="mode_code").reindex(columns=days)
+            self.add(str(sc_id), flags.fillna(0).to_numpy(np.uint8), modes.fillna(-1).to_numpy(np.int64),
+                     start_day=days.start)
+
+    def report(self) -> Dict[str, Any]:
+        """Distributions per scenario and per fault type (runs of same-type scenarios pooled)."""
+        by_scenario = {}
+        pooled: Dict[str, List[Dict[str, Any]]] = {}
+        for sc_id, r in self.results.items():
+            has_fault, has_clear = r["onset"] is not None, r["clear"] < r["horizon"]
+            by_scenario[sc_id] = {
+                "fault_type": r["type"], "onset": r["onset"], "clear": r["clear"],
+                "runs": len(r["per_run"][DEGRADED_MODE]["ttd"]),
+                "detectors": summarize(r["per_run"], has_fault, has_clear),
+            }
+            pooled.setdefault(r["type"], []).append(r)
+
+        by_type = {}
+        for ftype, rs in pooled.items():
+            per_run = {name: {k: np.concatenate([r["per_run"][name][k] for r in rs]) for k in rs[0]["per_run"][name]}
+                       for name in DETECTORS}
+            by_type[ftype] = {
+                "scenarios": [sc for sc, r in self.results.items() if r["type"] == ftype],
+                "runs": len(per_run[DEGRADED_MODE]["ttd"]),
+                "detectors": summarize(per_run, rs[0]["onset"] is not None,
+                                       any(r["clear"] < r["horizon"] for r in rs)),
+            }
+        return {"by_scenario": by_scenario, "by_fault_type": by_type}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Detection Latency / False Positive Metrics")
+    parser.add_argument("--config", default=os.path.join(v3_root, "config", "config.yaml"))
+    parser.add_argument("--scenarios", nargs="*", default=None, help="Default: active_scenarios")
+    parser.add_argument("--runs", type=int, default=1000, help="Simulated runs per scenario")
+    parser.add_argument("--days", type=int, default=None, help="Default: scenarios.duration_days")
+    parser.add_argument("--log", nargs="*", default=None, help="Analyze experiment logs instead of simulating")
+    parser.add_argument("--output-dir", default=None, help="Default: project.output_dir")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    analyzer = DetectionAnalyzer(cfg)
+    if args.log:
+        for path in args.log:
+            analyzer.add_log(path)
+    else:
+        for sc_id in args.scenarios or cfg.scenarios.active_scenarios:
+            analyzer.simulate(sc_id, args.runs, args.days)
+    report = analyzer.report()
+
+    output_dir = args.output_dir or cfg.project.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "detection_report.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== V3 Detection Metrics ===")
+    for sc_id, r in report["by_scenario"].items():
+        print(f"{sc_id} ({r['fault_type']}, onset={r['onset']}, clear={r['clear']}, runs={r['runs']})")
+        for name, d in r["detectors"].items():
+            ttd = d["time_to_detection"]
+            if d["detection_rate"] is None and not d["false_positive_rate"]:
+                continue
+            line = f"  {name:<22} fp_rate={d['false_positive_rate']}"
+            if d["detection_rate"] is not None:
+                line += f" detected={d['detection_rate']}"
+                if ttd:
+                    line += f" ttd p50/p95={ttd['p50']}/{ttd['p95']}"
+            if d.get("time_to_recovery"):
+                line += f" ttr p50/p95={d['time_to_recovery']['p50']}/{d['time_to_recovery']['p95']}"
+            print(line)
+    print(f"Report saved to: {path}")
+
+
+if __name__ == "__main__":
+    main()
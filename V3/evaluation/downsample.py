@@ -0,0 +1,70 @@
+"""
+Downsampling and aggregation for plots of large runs.
+
+    lttb(x, y, n)          Largest-Triangle-Three-Buckets: indices of n points that
+                           keep the visual shape of a line (first/last always kept)
+    minmax(x, lo, hi, n)   per-bucket min of `lo` and max of `hi`, so bands and
+                           spikes survive any reduction
+    envelope(df, ...)      per (scenario, day) median and percentile bands over
+                           all rows (runs / reactors) of the log
+
+Everything is numpy / pandas-vectorized; the cost is linear in the rows and
+the plotted output size is bounded by the requested point counts.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Sequence, Tuple
+
+# Percentiles of the envelope bands (outer, inner)
+BANDS = (0.05, 0.25, 0.75, 0.95)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the LTTB-selected points (all indices when len(x) <= n_out)."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        raise ValueError("lttb needs n_out >= 3")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax(x: np.ndarray, lo: np.ndarray, hi: np.ndarray, n_buckets: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(bucket x-center, min of lo, max of hi) over n_buckets equal-count buckets."""
+    n = len(x)
+    if n <= n_buckets:
+        return np.asarray(x), np.asarray(lo), np.asarray(hi)
+    starts = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+    counts = np.diff(np.append(starts, n))
+    centers = np.add.reduceat(np.asarray(x, dtype=np.float64), starts) / counts
+    return centers, np.minimum.reduceat(np.asarray(lo), starts), np.maximum.reduceat(np.asarray(hi), starts)
+
+
+def envelope(df: pd.DataFrame, value: str = "trust_score", by: str = "scenario_id",
+             bands: Sequence[float] = BANDS) -> pd.DataFrame:
+    """
+    One row per (scenario, day): n (samples), median and the band quantiles
+    (columns "q05", "q25", ...) of `value` over all log rows of that day.
+    """
+    grouped = df.groupby([by, "day"], sort=True, observed=True)[value]
+    qs = (0.5,) + tuple(bands)
+    q = grouped.quantile(list(qs)).unstack(level=-1)
+    q.columns = ["median"] + [f"q{int(round(b * 100)):02d}" for b in bands]
+    q.insert(0, "n", grouped.size())
+    return q.reset_index()
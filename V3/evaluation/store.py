@@ -0,0 +1,407 @@
+"""
+Trust-Gated MCP v3 - Experiment Store
+=====================================
+
+SQLite database that keeps every run, instead of the single
+experiment_log.csv each run overwrites:
+
+    runs         one row per run: id, time recorded, config hash (core/config.py
+                 config_hash) and the full config as JSON, backend/model, source log
+    steps        every logged step (core/columnar.py LOG_COLUMNS, backend/model
+                 moved to runs), keyed by (run_id, step)
+    run_metrics  evaluation metrics per run, for the whole run (scenario_id "*")
+                 and per scenario, computed once at ingest with the same
+                 StreamingMetrics as evaluation/metrics.py
+
+Indexes: steps (run_id, scenario_id, day) for per-run / per-scenario / per-day
+lookups, and steps (executed_action, mode, run_id) for action and mode
+queries (covering for per-run counts, e.g. unsafe executions).
+
+Runs are recorded automatically when logging.store is set, or afterwards:
+    python evaluation/store.py ingest logs/runs/experiment_log.csv --config config/config.yaml
+    python evaluation/store.py list
+    python evaluation/store.py diff --last 50 --baseline 20250101T120000
+    python evaluation/store.py steps --scenario S3 --day 4 --last 10
+"""
+
+import sys
+import os
+import json
+import hashlib
+import sqlite3
+import time
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.config import AppConfig, config_hash, load_config
+from core.columnar import LOG_FIELDS, iter_log
+from evaluation.metrics import check_columns
+from evaluation.streaming import StreamingMetrics
+
+DEFAULT_STORE = "logs/experiments.db"
+ALL_SCENARIOS = "*"
+
+# backend / model are per run
+STEP_FIELDS = [(name, t) for name, t in LOG_FIELDS if name not in ("backend", "model")]
+STEP_COLUMNS = [name for name, _ in STEP_FIELDS]
+_BOOL_COLUMNS = [name for name, t in STEP_FIELDS if t == "bool"]
+
+# Scalar metrics kept per run and scenario (diff columns)
+METRIC_FIELDS = [
+    "total_steps", "scenario_pass_rate", "unsafe_execution_rate", "unsafe_proposal_rate",
+    "override_rate", "conformance_rate", "breaker_open_rate", "cache_hit_rate",
+    "latency_p50_ms", "latency_p95_ms", "tokens_mean", "mean_trust",
+]
+DEFAULT_DIFF_METRICS = ["total_steps", "scenario_pass_rate", "unsafe_execution_rate",
+                        "override_rate", "unsafe_proposal_rate", "mean_trust"]
+
+
+def _sql_type(arrow_type: str) -> str:
+    if arrow_type.startswith(("int", "uint")) or arrow_type == "bool":
+        return "INTEGER"
+    if arrow_type.startswith("float"):
+        return "REAL"
+    return "TEXT"
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    recorded_at TEXT NOT NULL,
+    config_hash TEXT,
+    config TEXT,
+    backend TEXT,
+    model TEXT,
+    source TEXT,
+    steps INTEGER
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id TEXT NOT NULL,
+    {", ".join(f"{name} {_sql_type(t)}" for name, t in STEP_FIELDS)},
+    PRIMARY KEY (run_id, step)
+);
+CREATE INDEX IF NOT EXISTS idx_steps_run_scenario_day ON steps (run_id, scenario_id, day);
+CREATE INDEX IF NOT EXISTS idx_steps_action_mode ON steps (executed_action, mode, run_id);
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id TEXT NOT NULL,
+    scenario_id TEXT NOT NULL,
+    {", ".join(f"{name} {'INTEGER' if name == 'total_steps' else 'REAL'}" for name in METRIC_FIELDS)},
+    PRIMARY KEY (run_id, scenario_id)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_config_hash ON runs (config_hash);
+"""
+
+
+def _metric_row(m: Dict[str, Any]) -> Dict[str, Any]:
+    """The scalar METRIC_FIELDS of a StreamingMetrics.compute() dict (mean_trust is added in SQL)."""
+    latency = m.get("llm_latency_ms") or {}
+    tokens = m.get("tokens_per_decision") or {}
+    row = {name: m.get(name) for name in METRIC_FIELDS}
+    row.update(latency_p50_ms=latency.get("p50"), latency_p95_ms=latency.get("p95"),
+               tokens_mean=tokens.get("mean"))
+    return row
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, key + "."))
+        else:
+            out[key] = v
+    return out
+
+
+def config_changes(base: Optional[str], other: Optional[str]) -> List[str]:
+    """Dotted keys whose values differ between two stored config JSON documents."""
+    if not isinstance(base, str) or not isinstance(other, str):
+        return []
+    a, b = _flatten(json.loads(base)), _flatten(json.loads(other))
+    return sorted(k for k in a.keys() | b.keys() if a.get(k) != b.get(k))
+
+
+def csv_run_id(log_path: str) -> str:
+    """
+    Default id of a log without run partitions: its modification time plus
+    the first 8 hex digits of a content digest, so different logs written in
+    the same second get different ids and re-ingesting the same file does not.
+    """
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.localtime(os.path.getmtime(log_path)))
+    if os.path.isdir(log_path):
+        files = sorted(os.path.join(d, f) for d, _, fs in os.walk(log_path) for f in fs)
+    else:
+        files = [log_path]
+    digest = hashlib.sha256()
+    for path in files:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return f"{stamp}-{digest.hexdigest()[:8]}"
+
+
+class ExperimentStore:
+    """Records experiment runs in SQLite and answers cross-run queries."""
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # --- Recording ---
+
+    def ingest_log(self, log_path: str, run_id: Optional[str] = None,
+                   config: Optional[AppConfig] = None, chunk_rows: int = 100_000,
+                   replace: bool = False) -> List[str]:
+        """
+        Record an experiment log (CSV or Parquet) in one transaction and return
+        the run ids written. With run_id all rows form that run; otherwise a
+        Parquet dataset keeps its run partitions and a CSV is named after its
+        modification time plus a digest of its content (csv_run_id). Recording
+        a run id that is already stored raises ValueError (nothing is written)
+        unless replace is set, which replaces that run.
+        """
+        default_id = run_id or csv_run_id(log_path)
+        cfg_json = json.dumps(config.model_dump(mode="json"), sort_keys=True) if config is not None else None
+        cfg_hash = config_hash(config) if config is not None else None
+        recorded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        runs: Dict[str, Dict[str, Any]] = {}
+
+        with self.conn:
+            for chunk in iter_log(log_path, STEP_COLUMNS + ["run", "backend", "model"], chunk_rows):
+                check_columns(chunk)
+                if run_id is None and "run" in chunk.columns:
+                    groups = chunk.groupby(chunk["run"].astype(str), sort=False)
+                else:
+                    groups = [(default_id, chunk)]
+                for rid, df in groups:
+                    run = runs.get(rid)
+                    if run is None:
+                        if self._has_run(rid):
+                            if not replace:
+                                raise ValueError(f"Run {rid} is already recorded in {self.path}; "
+                                                 f"use replace=True (--replace) to overwrite it")
+                            self._delete_run(rid)
+                        first = df.iloc[0]
+                        run = runs[rid] = {"steps": 0, "metrics": StreamingMetrics(per_scenario=True)}
+                        self.conn.execute(
+                            "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            (rid, recorded_at, cfg_hash, cfg_json,
+                             _scalar(first.get("backend")), _scalar(first.get("model")),
+                             os.path.abspath(log_path), None))
+                    if "step" not in df.columns:
+                        df = df.assign(step=range(run["steps"], run["steps"] + len(df)))
+                    names, rows = _step_rows(rid, df)
+                    self.conn.executemany(f"INSERT INTO steps (run_id, {', '.join(names)}) "
+                                          f"VALUES ({', '.join('?' * (len(names) + 1))})", rows)
+                    run["steps"] += len(df)
+                    run["metrics"].update_frame(df)
+
+            for rid, run in runs.items():
+                self._record_metrics(rid, run["metrics"].compute())
+                self.conn.execute("UPDATE runs SET steps = ? WHERE run_id = ?", (run["steps"], rid))
+        return list(runs)
+
+    def _has_run(self, run_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone() is not None
+
+    def _delete_run(self, run_id: str):
+        for table in ("steps", "run_metrics", "runs"):
+            self.conn.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+
+    def _record_metrics(self, run_id: str, metrics: Dict[str, Any]):
+        per_scenario = {ALL_SCENARIOS: metrics}
+        per_scenario.update(metrics.get("by_scenario") or {})
+        trust = dict(self.conn.execute(
+            "SELECT scenario_id, AVG(trust_score) FROM steps WHERE run_id = ? GROUP BY scenario_id", (run_id,)))
+        trust[ALL_SCENARIOS] = self.conn.execute(
+            "SELECT AVG(trust_score) FROM steps WHERE run_id = ?", (run_id,)).fetchone()[0]
+        insert = (f"INSERT INTO run_metrics (run_id, scenario_id, {', '.join(METRIC_FIELDS)}) "
+                  f"VALUES ({', '.join('?' * (len(METRIC_FIELDS) + 2))})")
+        for sc, m in per_scenario.items():
+            row = _metric_row(m)
+            row["mean_trust"] = None if trust.get(sc) is None else round(trust[sc], 4)
+            self.conn.execute(insert, [run_id, sc] + [row[name] for name in METRIC_FIELDS])
+
+    # --- Queries ---
+
+    def runs(self, run_ids: Optional[Sequence[str]] = None, last: Optional[int] = None,
+             config_hash: Optional[str] = None) -> pd.DataFrame:
+        """Recorded runs (oldest first), optionally the given ids, one config, or the last N."""
+        where, params = [], []
+        if run_ids:
+            where.append(f"run_id IN ({', '.join('?' * len(run_ids))})")
+            params += list(run_ids)
+        if config_hash:
+            where.append("config_hash = ?")
+            params.append(config_hash)
+        sql = "SELECT run_id, recorded_at, config_hash, backend, model, steps, source FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY recorded_at, run_id"
+        df = pd.read_sql_query(sql, self.conn, params=params)
+        return df.tail(last).reset_index(drop=True) if last else df
+
+    def diff(self, run_ids: Optional[Sequence[str]] = None, baseline: Optional[str] = None,
+             scenario_id: str = ALL_SCENARIOS, metrics: Sequence[str] = DEFAULT_DIFF_METRICS,
+             last: Optional[int] = None) -> pd.DataFrame:
+        """
+        One row per run with the chosen metrics, their change against the
+        baseline run (default: the first) as "d_<metric>", and the config keys
+        that differ from the baseline's config.
+        """
+        unknown = [m for m in metrics if m not in METRIC_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}; available: {METRIC_FIELDS}")
+        ids = list(self.runs(run_ids, last)["run_id"])
+        if baseline is not None and baseline not in ids:
+            ids.insert(0, baseline)
+        if not ids:
+            return pd.DataFrame(columns=["run_id", "config_hash"] + list(metrics))
+        placeholders = ", ".join("?" * len(ids))
+        df = pd.read_sql_query(
+            f"SELECT r.run_id, r.config_hash, r.config, {', '.join('m.' + m for m in metrics)} "
+            f"FROM runs r JOIN run_metrics m ON m.run_id = r.run_id "
+            f"WHERE m.scenario_id = ? AND r.run_id IN ({placeholders}) "
+            f"ORDER BY r.recorded_at, r.run_id",
+            self.conn, params=[scenario_id] + ids)
+        if df.empty:
+            return df.drop(columns="config")
+        base_id = baseline if baseline is not None else df["run_id"].iloc[0]
+        base = df[df["run_id"] == base_id]
+        if base.empty:
+            raise KeyError(f"Baseline run {base_id} has no metrics for scenario {scenario_id}")
+        base = base.iloc[0]
+        for m in metrics:
+            df[f"d_{m}"] = (df[m] - base[m]).round(4)
+        df["config_changes"] = [",".join(config_changes(base["config"], c)) for c in df["config"]]
+        return df.drop(columns="config")
+
+    def steps(self, scenario_id: Optional[str] = None, day: Optional[int] = None,
+              run_ids: Optional[Sequence[str]] = None, mode: Optional[str] = None,
+              executed_action: Optional[str] = None,
+              columns: Sequence[str] = ("run_id", "scenario_id", "day", "trust_score", "mode",
+                                        "flags_mask", "proposed_action", "executed_action")) -> pd.DataFrame:
+        """The same steps across runs, e.g. scenario S3 day 4 of every run (indexed lookups)."""
+        ids = list(run_ids) if run_ids else list(self.runs()["run_id"])
+        if not ids:
+            return pd.DataFrame(columns=list(columns))
+        where, params = [f"run_id IN ({', '.join('?' * len(ids))})"], ids
+        for col, value in (("scenario_id", scenario_id), ("day", day), ("mode", mode),
+                           ("executed_action", executed_action)):
+            if value is not None:
+                where.append(f"{col} = ?")
+                params.append(value)
+        sql = f"SELECT {', '.join(columns)} FROM steps WHERE {' AND '.join(where)} ORDER BY run_id, step"
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+
+def _scalar(v: Any) -> Any:
+    return None if v is None or pd.isna(v) else str(v)
+
+
+def _step_rows(run_id: str, df: pd.DataFrame) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    (columns, executemany() rows) for the STEP_COLUMNS the block has values
+    for; blanks become NULL and booleans 0/1. Columns that are blank
+    throughout (e.g. telemetry of mock runs) are left to their NULL default.
+    """
+    names, cols = [], []
+    for name in STEP_COLUMNS:
+        if name not in df.columns:
+            continue
+        s = df[name]
+        if s.dtype == object or isinstance(s.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            s = s.astype(object)
+            s = s.where(s.notna() & (s != ""), None)
+        if name in _BOOL_COLUMNS:
+            text = s.astype(str).str.lower()
+            s = text.eq("true").astype(object).where(text.isin(["true", "false"]), None)
+        if not s.notna().any():
+            continue
+        names.append(name)
+        cols.append(s.astype(object).where(s.notna(), None).tolist())
+    return names, zip([run_id] * len(df), *cols)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Experiment Store (SQLite run history)")
+    parser.add_argument("--db", default=DEFAULT_STORE, help=f"Store path (default {DEFAULT_STORE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Record an experiment log")
+    p.add_argument("log_path", help="experiment_log.csv or Parquet log directory")
+    p.add_argument("--run-id", default=None,
+                   help="Default: Parquet run partitions / CSV modification time and content digest")
+    p.add_argument("--replace", action="store_true", help="Overwrite runs that are already recorded")
+    p.add_argument("--config", default=None, help="Config the run used (stored with its hash)")
+
+    p = sub.add_parser("list", help="List recorded runs")
+    p.add_argument("--last", type=int, default=None)
+    p.add_argument("--config-hash", default=None)
+
+    p = sub.add_parser("diff", help="Compare metrics across runs")
+    p.add_argument("run_ids", nargs="*", help="Default: all runs")
+    p.add_argument("--baseline", default=None, help="Default: the first run")
+    p.add_argument("--scenario", default=ALL_SCENARIOS)
+    p.add_argument("--metrics", nargs="*", default=DEFAULT_DIFF_METRICS, help=f"Of {METRIC_FIELDS}")
+    p.add_argument("--last", type=int, default=None)
+    p.add_argument("--csv", default=None, help="Also write the table to this CSV")
+
+    p = sub.add_parser("steps", help="Show the same steps across runs")
+    p.add_argument("run_ids", nargs="*", help="Default: all runs")
+    p.add_argument("--scenario", default=None)
+    p.add_argument("--day", type=int, default=None)
+    p.add_argument("--mode", default=None)
+    p.add_argument("--action", default=None, help="Executed action")
+    p.add_argument("--last", type=int, default=None)
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", None)
+    with ExperimentStore(args.db) as store:
+        if args.command == "ingest":
+            cfg = load_config(args.config) if args.config else None
+            try:
+                ids = store.ingest_log(args.log_path, args.run_id, cfg, replace=args.replace)
+            except (FileNotFoundError, RuntimeError, ValueError) as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            print(f"Recorded runs {ids} in {args.db}")
+        elif args.command == "list":
+            print(store.runs(last=args.last, config_hash=args.config_hash).to_string(index=False))
+        elif args.command == "diff":
+            try:
+                table = store.diff(args.run_ids or None, args.baseline, args.scenario, args.metrics, args.last)
+            except (KeyError, ValueError) as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            print(table.to_string(index=False))
+            if args.csv:
+                table.to_csv(args.csv, index=False)
+                print(f"Diff saved to: {args.csv}")
+        else:
+            ids = args.run_ids or list(store.runs(last=args.last)["run_id"])
+            print(store.steps(args.scenario, args.day, ids, args.mode, args.action).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Trust-Gated MCP v3 - Threshold / Penalty Sweep
+==============================================
+
+Evaluates every combination of a grid of trust-engine parameters (dotted
+trust_engine keys, e.g. thresholds.z_score or penalties.drift_suspected)
+and reports the Pareto front of detection latency vs. false positives.
+
+Scenario arrays are generated once per scenario (`runs` x `days`, one seed
+stream per scenario as in simulation/montecarlo.py) and shared by all
+points; each point is a batch trust engine replay over them plus the
+vectorized gate, so a point costs one pass over the arrays rather than a
+host run per day and reactor.
+
+Agent: the mock agent's rule (REQUEST_VERIFICATION below a rounded score of
+0.4, else ACT_UNRESTRICTED), or - with --proposals-log - the proposals
+recorded in an experiment log (e.g. a cassette-backed LLM run), replayed per
+(scenario, day) for every run. Recorded proposals are an open-loop
+approximation: the agent saw the trust context of the recorded config, not
+of the point being evaluated. Days the log does not cover fall back to the
+mock rule.
+
+Metrics per point (detector = sweep.detector, default degraded_mode, i.e.
+the gate actually reacted; see evaluation/detection.py):
+
+    ttd_mean / ttd_p95   time to detection over faulty runs; runs the
+                         detector misses count as the whole fault window
+                         (clear - onset), so a blind config cannot look fast
+    detection_rate       share of faulty runs detected inside the window
+    false_positive_rate  firings / nominal days, pooled over all scenarios
+    override_rate        gate overrides / steps
+
+Results are cached by point key (a digest of the inputs a point's result
+depends on: the trust_engine section with the point applied, the scenarios
+and seeds sections, the fault spec contents, runs, days, scenario ids,
+detector and agent) in a JSONL file, so repeated or extended sweeps - also
+after editing sweep.grid, sweep.workers or other unrelated config - only
+compute new points.
+
+Usage (from V3):
+    python evaluation/sweep.py --grid thresholds.z_score=2.5,3,3.5 thresholds.cusum_h=3,4,5,6
+    python evaluation/sweep.py --runs 1000 --workers 8 --proposals-log logs/runs/experiment_log.csv
+"""
+
+import sys
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.config import AppConfig, TrustEngineConfig, load_config, resolve_path
+from core.columnar import read_log
+from simulation.arrays import SENSOR_IDS
+from simulation.generator import SeededGenerator
+from simulation.montecarlo import scenario_seed
+from trust_engine.batch import (
+    BatchTrustEngine, policy_table, gate, ACTION_CODES, ACT_UNRESTRICTED
+)
+from evaluation.detection import DETECTORS, fault_window, detector_hits, detection_arrays
+
+REQUEST_VERIFICATION = ACTION_CODES["REQUEST_VERIFICATION"]
+METRICS = ["ttd_mean", "ttd_p95", "detection_rate", "false_positive_rate", "override_rate"]
+# Minimized together for the Pareto front
+OBJECTIVES = ("ttd_mean", "false_positive_rate")
+
+
+def parse_grid(specs: List[str]) -> Dict[str, List[float]]:
+    """'section.name=v1,v2,...' strings -> {key: values}; a bare name is looked up in the sections."""
+    grid = {}
+    for spec in specs:
+        if "=" not in spec:
+            raise ValueError(f"Grid entry {spec!r} is not of the form key=v1,v2,...")
+        key, values = spec.split("=", 1)
+        grid[resolve_key(key.strip())] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def resolve_key(key: str) -> str:
+    """Dotted trust_engine key of a parameter ('z_score' -> 'thresholds.z_score')."""
+    sections = TrustEngineConfig.model_fields
+    if "." in key:
+        section, name = key.split(".", 1)
+        if section in sections and name in sections[section].annotation.model_fields:
+            return key
+    else:
+        matches = [s for s, f in sections.items() if key in f.annotation.model_fields]
+        if len(matches) == 1:
+            return f"{matches[0]}.{key}"
+    raise ValueError(f"Unknown trust_engine parameter {key!r}")
+
+
+def grid_points(grid: Dict[str, List[float]]) -> List[Dict[str, float]]:
+    """Cartesian product of the grid, in grid order."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def apply_params(cfg: AppConfig, params: Dict[str, float]) -> AppConfig:
+    """Copy of cfg with the point's trust_engine parameters set."""
+    cfg = cfg.model_copy(deep=True)
+    for key, value in params.items():
+        section, name = resolve_key(key).split(".", 1)
+        setattr(getattr(cfg.trust_engine, section), name, float(value))
+    return cfg
+
+
+def pareto_front(df: pd.DataFrame, objectives=OBJECTIVES) -> np.ndarray:
+    """Boolean mask of the rows no other row dominates (all objectives minimized, NaN = worst)."""
+    values = df[list(objectives)].to_numpy(dtype=float)
+    values = np.where(np.isnan(values), np.inf, values)
+    le = (values[:, None, :] <= values[None, :, :]).all(axis=2)
+    lt = (values[:, None, :] < values[None, :, :]).any(axis=2)
+    dominated = (le & lt).any(axis=0)
+    return ~dominated
+
+
+def proposals_from_log(log_path: str) -> Dict[str, Dict[int, int]]:
+    """Recorded proposals per scenario and day (first run of the log wins)."""
+    df = read_log(log_path, ["scenario_id", "day", "proposed_action"])
+    df = df[df["proposed_action"].isin(ACTION_CODES)].drop_duplicates(["scenario_id", "day"])
+    out: Dict[str, Dict[int, int]] = {}
+    for sc, day, action in zip(df["scenario_id"].astype(str), df["day"].astype(int), df["proposed_action"]):
+        out.setdefault(sc, {})[day] = ACTION_CODES[action]
+    return out
+
+
+class SweepData:
+    """Pre-generated scenario arrays (plus fault windows and recorded proposals) shared by all points."""
+    def __init__(self, cfg: AppConfig, scenario_ids: List[str], runs: int, days: int,
+                 proposals: Optional[Dict[str, Dict[int, int]]] = None):
+        self.runs, self.days = runs, days
+        self.scenarios = []
+        catalog = SeededGenerator(cfg).faults
+        for sc in scenario_ids:
+            seed = scenario_seed(cfg.seeds.scenario_generation, sc)
+            gen = SeededGenerator(cfg, np_rng=np.random.RandomState(np.random.MT19937(seed)))
+            arrays = gen.generate_arrays(sc, days, n_reactors=runs)
+            recorded = np.full(days, -1, dtype=np.int64)
+            for day, code in (proposals or {}).get(sc, {}).items():
+                if 0 <= day < days:
+                    recorded[day] = code
+            onset, clear = fault_window(catalog[sc], days)
+            self.scenarios.append((sc, arrays, recorded, onset, clear))
+
+
+def replay(trust_cfg: TrustEngineConfig, arrays, runs: int, days: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(runs, days) scores, mode codes and flag masks of one scenario under trust_cfg."""
+    engine = BatchTrustEngine(trust_cfg, runs, SENSOR_IDS)
+    scores = np.empty((runs, days))
+    modes = np.empty((runs, days), dtype=np.int64)
+    flags = np.empty((runs, days), dtype=np.uint8)
+    for d in range(days):
+        scores[:, d], modes[:, d], flags[:, d] = engine.evaluate(
+            arrays.days[d], arrays.values[:, d], arrays.missing[:, d], arrays.timestamps[:, d])
+    return scores, modes, flags
+
+
+def evaluate_point(cfg: AppConfig, params: Dict[str, float], data: SweepData,
+                   detector: str = "degraded_mode") -> Dict[str, Any]:
+    """Replay every scenario under the point's parameters and score it."""
+    point_cfg = apply_params(cfg, params)
+    table = policy_table()
+    ttd, detected, fp, nominal = [], [], 0, 0
+    overrides = steps = 0
+    for sc, arrays, recorded, onset, clear in data.scenarios:
+        scores, modes, flags = replay(point_cfg.trust_engine, arrays, data.runs, data.days)
+        # Mock agent rule on the rounded score the host shows it; recorded proposals where available
+        mock = np.where(np.round(scores, 2) < 0.4, REQUEST_VERIFICATION, ACT_UNRESTRICTED)
+        proposed = np.where(recorded >= 0, recorded, mock)
+        executed = gate(modes, proposed, table)
+        overrides += int((executed != proposed).sum())
+        steps += executed.size
+
+        a = detection_arrays(detector_hits(flags, modes)[detector], onset, clear)
+        fp += int(a["fp"].sum())
+        nominal += int(a["nominal"].sum())
+        if onset is not None and onset < data.days:
+            hit = ~np.isnan(a["ttd"])
+            detected.append(hit)
+            # Misses count as the whole fault window
+            ttd.append(np.where(hit, a["ttd"], clear - onset))
+
+    ttd = np.concatenate(ttd) if ttd else np.empty(0)
+    return {
+        "ttd_mean": round(float(ttd.mean()), 4) if ttd.size else None,
+        "ttd_p95": float(np.quantile(ttd, 0.95)) if ttd.size else None,
+        "detection_rate": round(float(np.concatenate(detected).mean()), 4) if detected else None,
+        "false_positive_rate": round(fp / nominal, 6) if nominal else None,
+        "override_rate": round(overrides / steps, 6) if steps else None,
+    }
+
+
+class SweepCache:
+    """Point results keyed by point_key, one JSON object per line (append-only)."""
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry["key"]] = entry
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def put(self, key: str, params: Dict[str, float], metrics: Dict[str, Any]) -> None:
+        entry = {"key": key, "params": params, "metrics": metrics}
+        self.entries[key] = entry
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+
+def _hash_file(digest, path: str) -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    _hash_file(digest, path)
+    return digest.hexdigest()[:16]
+
+
+def agent_id(proposals_log: Optional[str]) -> str:
+    """Cache identity of the agent: 'mock' or a digest of the proposals log."""
+    if not proposals_log:
+        return "mock"
+    digest = hashlib.sha256()
+    if os.path.isdir(proposals_log):
+        files = sorted(os.path.join(d, f) for d, _, fs in os.walk(proposals_log) for f in fs)
+    else:
+        files = [proposals_log]
+    for path in files:
+        _hash_file(digest, path)
+    return "log:" + digest.hexdigest()[:16]
+
+
+def point_key(cfg: AppConfig, params: Dict[str, float], runs: int, days: int,
+              scenario_ids: List[str], detector: str, agent: str) -> str:
+    """Digest of the result-relevant inputs only (not sweep.*, deployment, montecarlo, ...)."""
+    point_cfg = apply_params(cfg, params)
+    raw = {"trust_engine": point_cfg.trust_engine.model_dump(mode="json"),
+           # scenarios.workers only picks the main.py loop
+           "scenarios_cfg": point_cfg.scenarios.model_dump(mode="json", exclude={"workers"}),
+           "seeds": point_cfg.seeds.model_dump(mode="json"),
+           "fault_spec": file_digest(resolve_path(point_cfg.scenarios.fault_spec)),
+           "runs": runs, "days": days, "scenarios": list(scenario_ids), "detector": detector, "agent": agent}
+    return hashlib.sha256(json.dumps(raw, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# Worker state: the shared arrays are sent once per process, not once per point
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(cfg: AppConfig, data: SweepData, detector: str) -> None:
+    _worker.update(cfg=cfg, data=data, detector=detector)
+
+
+def _evaluate_worker(params: Dict[str, float]) -> Dict[str, Any]:
+    return evaluate_point(_worker["cfg"], params, _worker["data"], _worker["detector"])
+
+
+def run_sweep(cfg: AppConfig, grid: Dict[str, List[float]], runs: Optional[int] = None,
+              days: Optional[int] = None, scenario_ids: Optional[List[str]] = None,
+              workers: Optional[int] = None, cache_path: Optional[str] = None,
+              detector: Optional[str] = None, proposals_log: Optional[str] = None) -> pd.DataFrame:
+    """
+    Evaluate every grid point (cached ones are read back). Returns one row per
+    point: the parameters, METRICS, its cache key, whether it came from the
+    cache, and whether it is on the Pareto front.
+    """
+    s = cfg.sweep
+    runs = runs or s.runs
+    days = days or s.days or cfg.scenarios.duration_days
+    scenario_ids = list(scenario_ids or cfg.scenarios.active_scenarios)
+    workers = workers or s.workers or 1
+    detector = detector or s.detector
+    if detector not in DETECTORS:
+        raise ValueError(f"Unknown detector {detector!r} (one of {', '.join(DETECTORS)})")
+    grid = {resolve_key(k): list(v) for k, v in grid.items()}
+    if not grid:
+        raise ValueError("Empty sweep grid")
+
+    cache = SweepCache(cache_path)
+    agent = agent_id(proposals_log)
+    points = grid_points(grid)
+    keys = [point_key(cfg, p, runs, days, scenario_ids, detector, agent) for p in points]
+    todo = [(k, p) for k, p in zip(keys, points) if cache.get(k) is None]
+    cached = {k for k in keys if cache.get(k) is not None}
+    print(f"Sweep: {len(points)} points ({len(cached)} cached, {len(todo)} to compute) "
+          f"over {len(scenario_ids)} scenarios x {runs} runs x {days} days", flush=True)
+
+    if todo:
+        proposals = proposals_from_log(proposals_log) if proposals_log else None
+        data = SweepData(cfg, scenario_ids, runs, days, proposals)
+        params = [p for _, p in todo]
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo)), initializer=_init_worker,
+                                     initargs=(cfg, data, detector)) as pool:
+                results = pool.map(_evaluate_worker, params)
+                for (k, p), m in zip(todo, results):
+                    cache.put(k, p, m)
+        else:
+            for k, p in todo:
+                cache.put(k, p, evaluate_point(cfg, p, data, detector))
+
+    rows = [dict(p, **cache.get(k)["metrics"], key=k, cached=k in cached) for k, p in zip(keys, points)]
+    df = pd.DataFrame(rows, columns=list(grid) + METRICS + ["key", "cached"])
+    df["pareto"] = pareto_front(df)
+    return df
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Trust Threshold / Penalty Sweep")
+    parser.add_argument("--config", default=os.path.join(v3_root, "config", "config.yaml"))
+    parser.add_argument("--grid", nargs="*", default=None,
+                        help="key=v1,v2,... per parameter, e.g. thresholds.z_score=2.5,3 (default: sweep.grid)")
+    parser.add_argument("--scenarios", nargs="*", default=None, help="Default: active_scenarios")
+    parser.add_argument("--runs", type=int, default=None, help="Runs per scenario (default: sweep.runs)")
+    parser.add_argument("--days", type=int, default=None, help="Default: sweep.days or scenarios.duration_days")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for uncached points (default: sweep.workers)")
+    parser.add_argument("--detector", default=None, help="Detector scored for latency / FP (default: sweep.detector)")
+    parser.add_argument("--proposals-log", default=None, help="Replay proposals recorded in this experiment log")
+    parser.add_argument("--cache", default=None, help="Result cache (default: sweep.cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Compute every point, store nothing")
+    parser.add_argument("--output-dir", default=None, help="Default: project.output_dir")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    grid = parse_grid(args.grid) if args.grid else cfg.sweep.grid
+    cache_path = None if args.no_cache else (args.cache or cfg.sweep.cache)
+    df = run_sweep(cfg, grid, runs=args.runs, days=args.days, scenario_ids=args.scenarios,
+                   workers=args.workers, cache_path=cache_path, detector=args.detector,
+                   proposals_log=args.proposals_log)
+
+    output_dir = args.output_dir or cfg.project.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "sweep_results.csv")
+    df.to_csv(path, index=False)
+    front = df[df["pareto"]].sort_values(list(OBJECTIVES))
+    front_path = os.path.join(output_dir, "sweep_pareto.csv")
+    front.to_csv(front_path, index=False)
+
+    print("\n=== V3 Sweep: Pareto Front (ttd_mean vs false_positive_rate) ===")
+    print(front.drop(columns=["key", "cached", "pareto"]).to_string(index=False))
+    print(f"Results saved to: {path}")
+    print(f"Pareto front saved to: {front_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,81 @@
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_visualizations(log_path, output_dir):
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.columnar import read_log, log_output_dir
+from evaluation.downsample import lttb, minmax, envelope
+
+# The plot and summary table only need these columns
+PLOT_COLUMNS = ["scenario_id", "day", "trust_score", "override", "executed_action"]
+
+# Plotted points per line / band; logs beyond this are downsampled
+MAX_POINTS = 2000
+# Markers only while individual days are distinguishable
+MARKER_MAX_POINTS = 60
+
+
+def _downsampled_median(env: pd.DataFrame, max_points: int):
+    x, y = env["day"].to_numpy(), env["median"].to_numpy()
+    idx = lttb(x, y, max_points)
+    return x[idx], y[idx]
+
+
+def _render_envelope(task):
+    """Worker: one scenario's median + percentile band plot (inputs are already aggregated)."""
+    sc_id, env, max_points, path = task
+    sns.set_style("whitegrid")
+    fig, ax = plt.subplots(figsize=(10, 4))
+    x = env["day"].to_numpy()
+    for lo, hi, alpha in (("q05", "q95", 0.15), ("q25", "q75", 0.3)):
+        bx, blo, bhi = minmax(x, env[lo].to_numpy(), env[hi].to_numpy(), max_points)
+        ax.fill_between(bx, blo, bhi, alpha=alpha, color="tab:blue", linewidth=0,
+                        label=f"{lo[1:]}-{hi[1:]}th pct")
+    mx, my = _downsampled_median(env, max_points)
+    ax.plot(mx, my, color="tab:blue", label="median", marker="o" if len(mx) <= MARKER_MAX_POINTS else None)
+    ax.set_title(f"Trust Score Envelope - {sc_id} (up to {int(env['n'].max())} rows per day)")
+    ax.set_xlabel("Day")
+    ax.set_ylabel("Trust Score")
+    ax.set_ylim(-0.05, 1.05)
+    ax.legend(loc="lower left")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def generate_visualizations(log_path, output_dir, max_points=MAX_POINTS, workers=None):
     if not os.path.exists(log_path):
         print(f"Error: Log file not found at {log_path}")
         return
 
-    df = pd.read_csv(log_path)
+    df = read_log(log_path, PLOT_COLUMNS)
     
     # Ensure output dir exists
     os.makedirs(output_dir, exist_ok=True)
 
+    # Per (scenario, day) median and bands over all runs/reactors; plots only see this
+    env = envelope(df)
+    scenarios = [str(sc) for sc in df["scenario_id"].unique()]
+    per_scenario = {sc: g for sc, g in env.groupby(env["scenario_id"].astype(str), sort=False)}
+
     # --- 1. Trust Score Plot ---
+    # One (downsampled) median line per scenario, identical to the raw series for single runs
     plt.figure(figsize=(10, 6))
     sns.set_style("whitegrid")
     
-    # Plot each scenario
-    sns.lineplot(data=df, x='day', y='trust_score', hue='scenario_id', marker='o')
+    for sc_id in scenarios:
+        x, y = _downsampled_median(per_scenario[sc_id], max_points)
+        plt.plot(x, y, marker="o" if len(x) <= MARKER_MAX_POINTS else None, label=sc_id)
     
     plt.title('Trust Score Evolution per Scenario (V3)')
     plt.xlabel('Day')
@@ -33,6 +89,17 @@ def generate_visualizations(log_path, output_dir):
     print(f"Generated Plot: {plot_path}")
     plt.close()
 
+    # --- 1b. Envelope Plots (one per scenario, rendered in parallel) ---
+    tasks = [(sc_id, per_scenario[sc_id], max_points, os.path.join(output_dir, f"trust_envelope_{sc_id}.png"))
+             for sc_id in scenarios]
+    workers = max(1, min(len(tasks), workers or os.cpu_count() or 1))
+    if workers == 1:
+        paths = [_render_envelope(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(_render_envelope, tasks))
+    print(f"Generated {len(paths)} Envelope Plots in: {output_dir}")
+
     # --- 2. Summary Table ---
     # Per-scenario summary
     summary = df.groupby('scenario_id').agg({
@@ -64,13 +131,20 @@ def generate_visualizations(log_path, output_dir):
     
     print(f"Generated Table: {table_path}")
 
-if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        log_path = sys.argv[1]
-    else:
-        log_path = "logs/runs/experiment_log.csv"
-        
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Trust Score Plots and Summary Table")
+    parser.add_argument("log_path", nargs="?", default="logs/runs/experiment_log.csv",
+                        help="experiment_log.csv or a Parquet log directory")
+    parser.add_argument("--output-dir", default=None, help="Default: the log's directory")
+    parser.add_argument("--max-points", type=int, default=MAX_POINTS, help="Points per plotted line / band")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel envelope plots (default: all CPUs)")
+    args = parser.parse_args()
+
     # Default to same dir as logs
-    output_dir = os.path.dirname(log_path)
+    output_dir = args.output_dir or log_output_dir(args.log_path)
     
-    generate_visualizations(log_path, output_dir)
+    generate_visualizations(args.log_path, output_dir, args.max_points, args.workers)
+
+if __name__ == "__main__":
+    main()
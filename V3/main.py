@@ -1,44 +1,64 @@
 import sys
 import os
 import csv
+import argparse
 from datetime import datetime
 
 # Allow importing from current directory
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from core.config import load_config
-from core.types import ToolCallV1, ActionType
+from core.config import load_config, resolve_path
 from core.logging import ExperimentLogger
+from core.checkpoint import (checkpoint_path, checkpoint_interval, save_checkpoint,
+                             load_checkpoint, clear_checkpoint)
+from evaluation.streaming import StreamingMetrics
+from evaluation.store import ExperimentStore
 from simulation.generator import SeededGenerator
+from simulation.traces import TraceReader
 from mcp_host.server import SpirulinaMCP_V3
-from clients.llm_agent import LlmAgent
+from mcp_host.runner import make_agent, scenario_snapshots, run_step, run_parallel
 
-# --- Mock Agent Adapter (For Regression) ---
-# In a full deployment, this would be an Ollama Client
-class MockAgent:
-    def __init__(self, seed: int):
-        self.seed = seed
-    
-    def decide(self, payload) -> ToolCallV1:
-        # Simple Logic: Always Optimize unless Trust < 0.4
-        trust = payload.trust_context
-        score = trust["score"]
-        
-        action = ActionType.ACT_UNRESTRICTED
-        if score < 0.4:
-            action = ActionType.REQUEST_VERIFICATION
-            
-        return ToolCallV1(
-            tool_name="execute_action",
-            arguments={"action": action.value, "rationale": "Mock Agent Logic"}
-        )
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trust-Gated MCP V3 experiment runner")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from its checkpoint (appends to its log)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Run scenarios isolated (fresh host and seed stream each) on N processes "
+                             "(default: scenarios.workers; unset -> legacy serial loop)")
+    args = parser.parse_args(argv)
     try:
         print("Starting Main...", flush=True)
         # 1. Load Config
         cfg = load_config("c:/GitFolders/TrustGatedMCP_V2/V3/config/config.yaml")
         print("Config Loaded.", flush=True)
+
+        workers = args.workers or cfg.scenarios.workers
+        if workers and (args.resume or cfg.scenarios.trace_path):
+            print("--workers runs generated scenarios from the start; "
+                  "--resume and trace replay use the serial loop", flush=True)
+            workers = None
+        if workers:
+            log_path, run_id, metrics = run_parallel(cfg, workers)
+            live = metrics.compute()
+            print(f"Log written to {log_path}", flush=True)
+            print(f"Metrics: steps={live['total_steps']} "
+                  f"pass_rate={live['scenario_pass_rate']} "
+                  f"unsafe_execution_rate={live['unsafe_execution_rate']} "
+                  f"override_rate={live['override_rate']}", flush=True)
+            record_run(cfg, log_path, run_id)
+            print("Done.", flush=True)
+            return
+
+        # Resume point of an interrupted run
+        ckpt_path = checkpoint_path(cfg)
+        resume = load_checkpoint(ckpt_path, cfg) if args.resume else None
+        if args.resume and resume is None:
+            print(f"No checkpoint at {ckpt_path}, starting a new run", flush=True)
+        elif resume:
+            print(f"Resuming run {resume['log']['run_id']} at scenario #{resume['scenario_index']} "
+                  f"step {resume['step']} ({resume['log']['rows']} rows logged)", flush=True)
+        every = checkpoint_interval(cfg)
         
         # 2. Setup Logging
         os.makedirs(cfg.project.output_dir, exist_ok=True)
@@ -50,12 +70,7 @@ def main():
         host = SpirulinaMCP_V3(cfg)
         
         # Select Agent Logic
-        llm_backend = os.environ.get("LLM_BACKEND", cfg.deployment.llm_backend).lower()
-        if llm_backend == "ollama":
-            agent = LlmAgent(cfg, cfg.seeds.agent_noise)
-        else:
-            agent = MockAgent(cfg.seeds.agent_noise)
-            print(f"Using MockAgent (backend={llm_backend})", flush=True)
+        agent = make_agent(cfg)
             
         print("Components Initialized.", flush=True)
         
@@ -63,54 +78,90 @@ def main():
         print("Starting Loop...", flush=True)
         
         # Resolve Backend/Model and Logging Context
-        with ExperimentLogger(cfg) as logger:
+        with ExperimentLogger(cfg, resume=resume["log"] if resume else None) as logger:
             print(f"Log file opened at {logger.log_path}", flush=True)
+            # Live safety metrics, updated with every gate result
+            metrics = resume["metrics"] if resume else StreamingMetrics()
             
-            for sc_id in cfg.scenarios.active_scenarios:
+            trace = TraceReader(resolve_path(cfg.scenarios.trace_path)) if cfg.scenarios.trace_path else None
+            # Recorded traces are open loop by nature
+            closed_loop = cfg.scenarios.process_model == "bioreactor" and trace is None
+            scenario_ids = [trace.scenario_id] if trace else cfg.scenarios.active_scenarios
+            start_index = resume["scenario_index"] if resume else 0
+            for sc_index, sc_id in enumerate(scenario_ids):
+                if sc_index < start_index:
+                    continue
                 print(f"Running Scenario: {sc_id}", flush=True)
-                snapshots = gen.generate_scenario(sc_id)
-                host.current_snapshot = None # Reset
+                if resume and sc_index == start_index:
+                    # Rebuild the state saved at the checkpoint
+                    gen.np_rng.set_state(resume["rng_state"])
+                    host.set_state(resume["host"])
+                    done, actions = resume["step"], list(resume["actions"])
+                else:
+                    host.current_snapshot = None # Reset (legacy: engine state carries over; see mcp_host/runner.py)
+                    done, actions = 0, []
+                rng_state = gen.np_rng.get_state()
+
+                def checkpoint():
+                    if cfg.checkpoint.enabled:
+                        save_checkpoint(ckpt_path, cfg, {
+                            "scenario_index": sc_index, "scenario_id": sc_id, "step": done,
+                            "actions": actions if closed_loop else [], "rng_state": rng_state,
+                            "host": host.get_state(), "metrics": metrics, "log": logger.position(),
+                        })
+
+                if trace:
+                    # Recorded data, replayed in day order straight from the memory map
+                    snapshots = trace.seek(*(cfg.scenarios.trace_days or []))
+                else:
+                    snapshots = scenario_snapshots(cfg, gen, sc_id, closed_loop)
+
+                steps = iter(snapshots)
+                # Skip the days completed before the checkpoint (closed loop: replay their actions)
+                for executed in (actions if closed_loop else [None] * done):
+                    next(steps)
+                    if closed_loop:
+                        snapshots.act(executed)
+                checkpoint()
                 
-                for snap in snapshots:
-                    # Update Host (Sensor Ingest)
-                    host.update_state(snap)
-                    
-                    # Get Context
-                    payload = host.get_context_payload()
-                    
-                    # Agent Decide
-                    tool_call = agent.decide(payload)
-                    
-                    # Execute (Trust Gate)
-                    result = host.execute_tool(tool_call)
-                    
-                    # Determine Executed Action
-                    # Robustness: Handle missing proposal
-                    proposed = result.get("proposed_action", "UNKNOWN_PROPOSAL")
-                    is_blocked = (result.get("status") == "BLOCKED")
-                    # If blocked, we default to HOLD (Safe Fallback)
-                    executed = "HOLD" if is_blocked else proposed
-                    
-                    # Log
-                    flags_str = "|".join([k for k,v in host.current_trust.flags.items() if v])
-                    print(f"  [Day {snap.day}] Trust={result['trust_score']:.2f} Action={executed}", flush=True)
-                    logger.log_result(
-                        scenario_id=sc_id, 
-                        day=snap.day,
-                        trust_score=result["trust_score"], 
-                        mode=result["trust_mode"], 
-                        flags=flags_str,
-                        proposed_action=proposed,
-                        executed_action=executed,
-                        status=result["status"],
-                        override=result["override"],
-                        model_digest=""
-                    )
+                for snap in steps:
+                    executed = run_step(host, agent, logger, metrics, sc_id, snap,
+                                        plant=snapshots if closed_loop else None)
+                    done += 1
+                    if closed_loop:
+                        actions.append(executed)
+                    if done % every == 0:
+                        checkpoint()
+
+                live = metrics.compute()
+                print(f"  Metrics so far: steps={live['total_steps']} "
+                      f"pass_rate={live['scenario_pass_rate']} "
+                      f"unsafe_execution_rate={live['unsafe_execution_rate']} "
+                      f"override_rate={live['override_rate']}", flush=True)
+        # Completed: a later --resume starts a new run
+        clear_checkpoint(ckpt_path)
+
+        record_run(cfg, logger.log_path, logger.run_id)
+        if hasattr(agent, "client_stats"):
+            print(f"LLM client stats: {agent.client_stats()}", flush=True)
+            agent.close()
         print("Done.", flush=True)
     except Exception as e:
         print(f"CRITICAL ERROR: {e}", flush=True)
         import traceback
         traceback.print_exc()
 
+def record_run(cfg, log_path, run_id):
+    if cfg.logging.store:
+        # Keep the run in the history store (the CSV log is overwritten by the next run)
+        with ExperimentStore(cfg.logging.store) as store:
+            try:
+                run_ids = store.ingest_log(log_path, run_id=run_id, config=cfg)
+            except ValueError as e:
+                # Same logging.run_id as a stored run: keep the stored one
+                print(f"Run not recorded: {e}", flush=True)
+                return
+        print(f"Run {', '.join(run_ids)} recorded in {cfg.logging.store}", flush=True)
+
 if __name__ == "__main__":
     main()
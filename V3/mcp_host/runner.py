@@ -0,0 +1,205 @@
+"""
+Trust-Gated MCP v3 - Scenario Runner
+====================================
+
+run_step() is one gate step (sensor ingest, agent decision, trust gate, log,
+live metrics); main.py's serial loop and the isolated runner below share it.
+
+Isolated parallel execution (main.py --workers N / scenarios.workers):
+every scenario runs in its own process with a fresh SpirulinaMCP_V3, a fresh
+agent and its own seed stream (simulation/montecarlo.py scenario_seed), so no
+trust-engine state (CUSUM sums, missing-day counter, previous score) and no
+generator draws carry over between scenarios. Each worker logs to a private
+directory; the parent concatenates the per-scenario logs in active_scenarios
+order, which gives the row order of a serial run, and merges the live
+metrics in the same order. Results are identical for any number of workers
+(workers=1 runs the isolated scenarios in-process).
+
+The legacy serial loop in main.py keeps one host for all scenarios and only
+clears its snapshot between them, so its numbers differ from the isolated
+runner wherever detector state used to leak into the next scenario.
+"""
+
+import os
+import time
+import shutil
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import AppConfig
+from core.logging import ExperimentLogger
+from core.columnar import PARQUET_LOG_DIR, append_run_parts
+from evaluation.streaming import StreamingMetrics
+from simulation.generator import SeededGenerator
+from simulation.montecarlo import scenario_seed
+from mcp_host.server import SpirulinaMCP_V3
+from clients.llm_agent import LlmAgent
+from clients.mock_agent import MockAgent
+
+
+def make_agent(cfg: AppConfig, verbose: bool = True):
+    """Agent selected by LLM_BACKEND (env) or deployment.llm_backend."""
+    llm_backend = os.environ.get("LLM_BACKEND", cfg.deployment.llm_backend).lower()
+    if llm_backend == "ollama":
+        return LlmAgent(cfg, cfg.seeds.agent_noise)
+    if verbose:
+        print(f"Using MockAgent (backend={llm_backend})", flush=True)
+    return MockAgent(cfg.seeds.agent_noise)
+
+
+def scenario_snapshots(cfg: AppConfig, gen: SeededGenerator, scenario_id: str, closed_loop: bool):
+    """Snapshot source of a generated scenario (closed loop, streamed or eager)."""
+    if closed_loop:
+        # Executed actions feed back into the process model
+        return gen.closed_loop(scenario_id)
+    if cfg.scenarios.stream_block_days:
+        return gen.stream_scenario(scenario_id, block_days=cfg.scenarios.stream_block_days)
+    return gen.generate_scenario(scenario_id)
+
+
+def run_step(host: SpirulinaMCP_V3, agent, logger: ExperimentLogger, metrics: StreamingMetrics,
+             scenario_id: str, snap, plant=None, verbose: bool = True) -> str:
+    """
+    One gate step for `snap`; returns the executed action. `plant` is the
+    closed-loop scenario the action is fed back into (None for open loop).
+    """
+    # Update Host (Sensor Ingest)
+    host.update_state(snap)
+
+    # Get Context
+    payload = host.get_context_payload()
+
+    # Agent Decide
+    tool_call = agent.decide(payload)
+
+    # Execute (Trust Gate)
+    result = host.execute_tool(tool_call)
+
+    # Determine Executed Action
+    # Robustness: Handle missing proposal
+    proposed = result.get("proposed_action", "UNKNOWN_PROPOSAL")
+    is_blocked = (result.get("status") == "BLOCKED")
+    # If blocked, we default to HOLD (Safe Fallback)
+    executed = "HOLD" if is_blocked else proposed
+    if plant is not None:
+        plant.act(executed)
+
+    # Log
+    telemetry = getattr(agent, "last_call", {})
+    flags_str = "|".join([k for k, v in host.current_trust.flags.items() if v])
+    if verbose:
+        print(f"  [Day {snap.day}] Trust={result['trust_score']:.2f} Action={executed}", flush=True)
+    logger.log_result(
+        scenario_id=scenario_id,
+        day=snap.day,
+        trust_score=result["trust_score"],
+        mode=result["trust_mode"],
+        flags=flags_str,
+        proposed_action=proposed,
+        executed_action=executed,
+        status=result["status"],
+        override=result["override"],
+        model_digest=telemetry.get("model_digest", ""),
+        telemetry=telemetry,
+        process=plant.state() if plant is not None else None
+    )
+    metrics.update(scenario_id, result["trust_mode"], proposed, executed,
+                   override=result["override"], telemetry=telemetry)
+    return executed
+
+
+def run_isolated_scenario(cfg: AppConfig, scenario_id: str, part_dir: str) -> Dict[str, Any]:
+    """Worker: one scenario with its own host, agent and seed stream, logged under part_dir."""
+    cfg = cfg.model_copy(deep=True)
+    cfg.project.output_dir = part_dir
+    cfg.logging.store = None
+    cfg.checkpoint.enabled = False
+    seed = scenario_seed(cfg.seeds.scenario_generation, scenario_id)
+    gen = SeededGenerator(cfg, np_rng=np.random.RandomState(np.random.MT19937(seed)))
+    host = SpirulinaMCP_V3(cfg)
+    host.reset()
+    agent = make_agent(cfg, verbose=False)
+    metrics = StreamingMetrics()
+    closed_loop = cfg.scenarios.process_model == "bioreactor"
+    snapshots = scenario_snapshots(cfg, gen, scenario_id, closed_loop)
+    with ExperimentLogger(cfg) as logger:
+        for snap in snapshots:
+            run_step(host, agent, logger, metrics, scenario_id, snap,
+                     plant=snapshots if closed_loop else None, verbose=False)
+        rows = logger.position()["rows"]
+    client_stats = None
+    if hasattr(agent, "client_stats"):
+        client_stats = agent.client_stats()
+        agent.close()
+    return {"scenario_id": scenario_id, "log_path": logger.log_path, "rows": rows,
+            "metrics": metrics, "client_stats": client_stats}
+
+
+def merge_logs(cfg: AppConfig, run_id: str, results: List[Dict[str, Any]]) -> str:
+    """Concatenate per-scenario logs (in the given order) into the run's log; returns its path."""
+    output_dir = cfg.project.output_dir
+    if cfg.logging.format == "parquet":
+        log_path = os.path.join(output_dir, PARQUET_LOG_DIR, f"run={run_id}")
+        if os.path.isdir(log_path):
+            shutil.rmtree(log_path)
+        os.makedirs(log_path)
+        steps = parts = 0
+        for r in results:
+            parts += append_run_parts(r["log_path"], log_path, steps, parts)
+            steps += r["rows"]
+        return log_path
+
+    log_path = os.path.join(output_dir, "experiment_log.csv")
+    with open(log_path, "w", newline="") as dst:
+        for i, r in enumerate(results):
+            with open(r["log_path"], newline="") as src:
+                header = src.readline()
+                if i == 0:
+                    dst.write(header)
+                shutil.copyfileobj(src, dst)
+    return log_path
+
+
+def run_parallel(cfg: AppConfig, workers: int,
+                 scenario_ids: Optional[List[str]] = None) -> Tuple[str, str, StreamingMetrics]:
+    """
+    Run scenarios isolated on `workers` processes and merge their logs.
+    Returns (log path, run id, merged live metrics).
+    """
+    scenario_ids = list(scenario_ids or cfg.scenarios.active_scenarios)
+    run_id = cfg.logging.run_id or time.strftime("%Y%m%dT%H%M%S")
+    worker_cfg = cfg.model_copy(deep=True)
+    worker_cfg.logging.run_id = run_id
+    os.makedirs(cfg.project.output_dir, exist_ok=True)
+    parts_root = os.path.join(cfg.project.output_dir, f".parts-{run_id}")
+    part_dirs = [os.path.join(parts_root, f"{i:04d}-{sc}") for i, sc in enumerate(scenario_ids)]
+
+    workers = max(1, min(workers, len(scenario_ids)))
+    metrics = StreamingMetrics()
+    results = []
+    try:
+        if workers == 1:
+            outcomes = (run_isolated_scenario(worker_cfg, sc, d) for sc, d in zip(scenario_ids, part_dirs))
+            pool = None
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            # map() yields in scenario order, whatever finishes first
+            outcomes = pool.map(run_isolated_scenario, [worker_cfg] * len(scenario_ids), scenario_ids, part_dirs)
+        try:
+            for r in outcomes:
+                results.append(r)
+                metrics.merge(r["metrics"])
+                m = r["metrics"].compute()
+                print(f"Scenario {r['scenario_id']} done: steps={m['total_steps']} "
+                      f"unsafe_execution_rate={m['unsafe_execution_rate']} "
+                      f"override_rate={m['override_rate']}", flush=True)
+                if r["client_stats"]:
+                    print(f"  LLM client stats: {r['client_stats']}", flush=True)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        log_path = merge_logs(cfg, run_id, results)
+    finally:
+        shutil.rmtree(parts_root, ignore_errors=True)
+    return log_path, run_id, metrics
@@ -17,12 +17,34 @@ class SpirulinaMCP_V3(MCPHost):
         self.prev_snapshot: Optional[DailySensorSnapshot] = None
         self.current_trust: Optional[Any] = None # Typed as TrustAssessment at runtime
 
+    def reset(self) -> None:
+        """Start an independent scenario: fresh trust engine, no snapshot history."""
+        self.trust_engine = SpirulinaTrustEngine(self.cfg.trust_engine)
+        self.current_snapshot = None
+        self.prev_snapshot = None
+        self.current_trust = None
+
     def update_state(self, snapshot: DailySensorSnapshot) -> None:
         self.prev_snapshot = self.current_snapshot
         self.current_snapshot = snapshot
         # Assess Trust Immediately
         self.current_trust = self.trust_engine.evaluate(self.current_snapshot, self.prev_snapshot)
 
+    def get_state(self) -> Dict[str, Any]:
+        """Host state between steps, for checkpoints (see core/checkpoint.py)."""
+        return {
+            "current_snapshot": self.current_snapshot,
+            "prev_snapshot": self.prev_snapshot,
+            "current_trust": self.current_trust,
+            "trust_engine": self.trust_engine.get_state(),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.current_snapshot = state["current_snapshot"]
+        self.prev_snapshot = state["prev_snapshot"]
+        self.current_trust = state["current_trust"]
+        self.trust_engine.set_state(state["trust_engine"])
+
     def get_context_payload(self) -> HostPayloadV1:
         if not self.current_snapshot or not self.current_trust:
              raise RuntimeError("System not initialized")
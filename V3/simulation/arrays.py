@@ -0,0 +1,79 @@
+import numpy as np
+from typing import List, Iterator, Sequence, Tuple, Union, Optional
+from core.types import DailySensorSnapshot, SensorReading
+
+# Column order of the sensor axis in every scenario array
+SENSOR_IDS: Tuple[str, ...] = ("ph", "temp", "ec", "growth")
+SENSOR_INDEX = {sid: i for i, sid in enumerate(SENSOR_IDS)}
+
+
+class ScenarioArrays(Sequence):
+    """
+    Array-native scenario data.
+
+    values      float64 (..., days, sensors)
+    missing     bool    (..., days, sensors)
+    timestamps  int64   (..., days, sensors)   reported timestamp_day per reading
+    days        int64   (days,)                absolute day index of each row
+
+    Leading axes (e.g. reactors) are allowed; `reactor(i)` returns a
+    zero-copy view of one of them. For 2-D data the object behaves like the
+    old `List[DailySensorSnapshot]`: iteration and indexing materialize
+    snapshots lazily, one day at a time, only when a consumer asks.
+    """
+    def __init__(self,
+                 scenario_id: str,
+                 values: np.ndarray,
+                 missing: np.ndarray,
+                 timestamps: np.ndarray,
+                 days: Optional[np.ndarray] = None,
+                 sensor_ids: Tuple[str, ...] = SENSOR_IDS):
+        self.scenario_id = scenario_id
+        self.values = values
+        self.missing = missing
+        self.timestamps = timestamps
+        self.days = days if days is not None else np.arange(values.shape[-2], dtype=np.int64)
+        self.sensor_ids = sensor_ids
+
+    @property
+    def n_days(self) -> int:
+        return self.values.shape[-2]
+
+    @property
+    def n_reactors(self) -> int:
+        return int(np.prod(self.values.shape[:-2], dtype=np.int64))
+
+    def reactor(self, i: int) -> "ScenarioArrays":
+        return ScenarioArrays(self.scenario_id, self.values[i], self.missing[i],
+                              self.timestamps[i], self.days, self.sensor_ids)
+
+    def snapshot(self, i: int) -> DailySensorSnapshot:
+        if self.values.ndim != 2:
+            raise ValueError("Snapshots are per reactor; select one with reactor(i) first")
+        vals = self.values[i].tolist()
+        miss = self.missing[i].tolist()
+        ts = self.timestamps[i].tolist()
+        readings = {
+            sid: SensorReading(sensor_id=sid, timestamp_day=ts[j], value=vals[j], is_missing=miss[j])
+            for j, sid in enumerate(self.sensor_ids)
+        }
+        return DailySensorSnapshot(day=int(self.days[i]), readings=readings)
+
+    def to_snapshots(self) -> List[DailySensorSnapshot]:
+        return [self.snapshot(i) for i in range(len(self))]
+
+    def __len__(self) -> int:
+        return self.n_days
+
+    def __getitem__(self, idx: Union[int, slice]):
+        if isinstance(idx, slice):
+            return [self.snapshot(i) for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("day index out of range")
+        return self.snapshot(idx)
+
+    def __iter__(self) -> Iterator[DailySensorSnapshot]:
+        for i in range(len(self)):
+            yield self.snapshot(i)
@@ -0,0 +1,204 @@
+import numpy as np
+from typing import Dict, Any, Iterator, Optional, Sequence, Union
+
+from core.config import AppConfig, BioreactorConfig
+from core.types import ActionType, DailySensorSnapshot
+from .arrays import ScenarioArrays, SENSOR_IDS, SENSOR_INDEX
+from .faults import FaultProgram
+
+# State vector layout (reactors x STATE_VARS); "produced" integrates gross growth (yield)
+STATE_VARS = ("biomass", "ph", "temp", "ec", "produced")
+X, PH, T, EC, PROD = range(len(STATE_VARS))
+
+# Measurement noise per sensor (same spread as the open-loop baseline)
+MEASUREMENT_STD = {"ph": 0.05, "temp": 0.5, "ec": 0.1, "growth": 0.1}
+
+# Action effects, indexed by ACTION_CODES. Corrections are computed from the
+# *observed* readings the host acted on, so acting on faulty data hurts:
+#   ph_gain/ec_gain  fraction of the observed setpoint error corrected per day
+#   ph_step/ec_step  cap on the daily correction (dosing limits)
+#   heat             temperature target raised by heat * heat_boost_c
+ACTION_CODES = {a.value: i for i, a in enumerate(ActionType)}
+_EFFECTS = {
+    ActionType.ACT_SAFE.value:         {"ph_gain": 0.5, "ph_step": 0.1, "ec_gain": 0.5, "ec_step": 0.1, "heat": 0.0},
+    ActionType.ACT_UNRESTRICTED.value: {"ph_gain": 1.0, "ph_step": 1.0, "ec_gain": 1.0, "ec_step": 1.0, "heat": 1.0},
+}
+ACTION_EFFECTS = {
+    key: np.array([_EFFECTS.get(a.value, {}).get(key, 0.0) for a in ActionType])
+    for key in ("ph_gain", "ph_step", "ec_gain", "ec_step", "heat")
+}
+
+
+class BioreactorModel:
+    """
+    Vectorized Spirulina raceway model, one row per reactor.
+
+        mu      = mu_max * f_T(T) * f_pH(pH) * EC / (k_ec + EC)
+        dX/dt   = mu X (1 - X/x_max) - decay X
+        dpH/dt  = ph_per_biomass * growth          (carbon uptake raises pH)
+        dEC/dt  = -ec_per_biomass * growth         (nutrient depletion)
+        dT/dt   = (T_target - T) / t_tau_days
+
+    f_T is the cardinal temperature model with inflection (Rosso et al.),
+    f_pH the cardinal pH model; both are 0 outside [min, max]. Each day is
+    integrated with `substeps_per_day` fixed RK4 steps across all reactors.
+    """
+    def __init__(self, params: BioreactorConfig, n_reactors: int = 1,
+                 rng: Optional[np.random.RandomState] = None):
+        self.p = params
+        self.n_reactors = n_reactors
+        self.rng = rng if rng is not None else np.random.RandomState()
+        self.y = np.empty((n_reactors, len(STATE_VARS)), dtype=np.float64)
+        self.y[:, X] = params.x0
+        self.y[:, PH] = params.ph0
+        self.y[:, T] = params.t_ambient
+        self.y[:, EC] = params.ec0
+        self.y[:, PROD] = 0.0
+        self.t_target = np.full(n_reactors, params.t_ambient)
+        self.mu_ref = float(self.growth_rate(self.y[:1])[0])  # growth index 1.0 at the nominal state
+
+    def _f_temp(self, t: np.ndarray) -> np.ndarray:
+        p = self.p
+        num = (t - p.t_max) * (t - p.t_min) ** 2
+        den = (p.t_opt - p.t_min) * ((p.t_opt - p.t_min) * (t - p.t_opt) - (p.t_opt - p.t_max) * (p.t_opt + p.t_min - 2 * t))
+        f = np.divide(num, den, out=np.zeros_like(t), where=den != 0)
+        return np.where((t > p.t_min) & (t < p.t_max), np.clip(f, 0.0, 1.0), 0.0)
+
+    def _f_ph(self, ph: np.ndarray) -> np.ndarray:
+        p = self.p
+        num = (ph - p.ph_min) * (ph - p.ph_max)
+        den = num - (ph - p.ph_opt) ** 2
+        f = np.divide(num, den, out=np.zeros_like(ph), where=den != 0)
+        return np.where((ph > p.ph_min) & (ph < p.ph_max), np.clip(f, 0.0, 1.0), 0.0)
+
+    def growth_rate(self, y: np.ndarray) -> np.ndarray:
+        ec = np.maximum(y[:, EC], 0.0)
+        return self.p.mu_max * self._f_temp(y[:, T]) * self._f_ph(y[:, PH]) * ec / (self.p.k_ec + ec)
+
+    def _derivatives(self, y: np.ndarray) -> np.ndarray:
+        p = self.p
+        growth = self.growth_rate(y) * y[:, X] * (1.0 - y[:, X] / p.x_max)
+        dy = np.empty_like(y)
+        dy[:, X] = growth - p.decay * y[:, X]
+        dy[:, PH] = p.ph_per_biomass * growth
+        dy[:, EC] = -p.ec_per_biomass * growth
+        dy[:, T] = (self.t_target - y[:, T]) / p.t_tau_days
+        dy[:, PROD] = growth
+        return dy
+
+    def _integrate_day(self) -> None:
+        n = self.p.substeps_per_day
+        h = 1.0 / n
+        for _ in range(n):
+            y = self.y
+            k1 = self._derivatives(y)
+            k2 = self._derivatives(y + 0.5 * h * k1)
+            k3 = self._derivatives(y + 0.5 * h * k2)
+            k4 = self._derivatives(y + h * k3)
+            self.y = y + h * (k1 + 2 * k2 + 2 * k3 + k4) / 6.0
+
+    @property
+    def produced(self) -> np.ndarray:
+        """Cumulative gross biomass growth per reactor (g/L), before decay."""
+        return self.y[:, PROD]
+
+    def measure(self) -> np.ndarray:
+        """Noisy sensor readings (reactors x SENSOR_IDS); growth is an index relative to nominal."""
+        true = np.empty((self.n_reactors, len(SENSOR_IDS)), dtype=np.float64)
+        true[:, SENSOR_INDEX["ph"]] = self.y[:, PH]
+        true[:, SENSOR_INDEX["temp"]] = self.y[:, T]
+        true[:, SENSOR_INDEX["ec"]] = self.y[:, EC]
+        true[:, SENSOR_INDEX["growth"]] = self.growth_rate(self.y) / self.mu_ref
+        for j, sid in enumerate(SENSOR_IDS):
+            true[:, j] += self.rng.normal(0, MEASUREMENT_STD[sid], self.n_reactors)
+        return true
+
+    def step(self, actions: np.ndarray, observed: np.ndarray) -> None:
+        """
+        Apply one day of executed actions (ACTION_CODES, one per reactor)
+        based on the observed readings (NaN = missing, no correction), then
+        integrate the day and add process noise.
+        """
+        p = self.p
+        ph_obs = observed[:, SENSOR_INDEX["ph"]]
+        ec_obs = observed[:, SENSOR_INDEX["ec"]]
+        ph_step = ACTION_EFFECTS["ph_step"][actions]
+        ec_step = ACTION_EFFECTS["ec_step"][actions]
+        ph_dose = np.clip(ACTION_EFFECTS["ph_gain"][actions] * (p.ph_setpoint - ph_obs), -ph_step, ph_step)
+        # Nutrients can only be added, never removed
+        ec_feed = np.clip(ACTION_EFFECTS["ec_gain"][actions] * (p.ec_setpoint - ec_obs), 0.0, ec_step)
+        self.y[:, PH] += np.nan_to_num(ph_dose)
+        self.y[:, EC] += np.nan_to_num(ec_feed)
+        self.t_target = p.t_ambient + ACTION_EFFECTS["heat"][actions] * p.heat_boost_c
+
+        self._integrate_day()
+        for var, sid in ((PH, "ph"), (T, "temp"), (EC, "ec")):
+            std = p.process_noise.get(sid, 0.0)
+            if std:
+                self.y[:, var] += self.rng.normal(0, std, self.n_reactors)
+
+
+class ClosedLoopScenario:
+    """
+    Scenario whose sensor data is produced by a BioreactorModel and driven
+    by the host's executed actions. Faults from the spec corrupt the
+    *observations* only; the process itself reacts to what was executed.
+
+        plant = gen.closed_loop("S2")
+        for snap in plant:              # one day at a time
+            ...host / agent...
+            plant.act(executed_action)  # advances the process by one day
+
+    For batches (n_reactors given) use observe()/act() directly with one
+    action per reactor.
+    """
+    def __init__(self, config: AppConfig, program: FaultProgram,
+                 days: Optional[int] = None, n_reactors: Optional[int] = None,
+                 rng: Optional[np.random.RandomState] = None):
+        self.scenario_id = program.scenario_id
+        self.program = program
+        self.days = days if days is not None else config.scenarios.duration_days
+        self.batched = n_reactors is not None
+        self.model = BioreactorModel(config.scenarios.bioreactor, n_reactors or 1, rng)
+        self.day = 0
+        self._observed: Optional[np.ndarray] = None
+
+    def observe(self) -> ScenarioArrays:
+        """Readings for the current day, with the scenario's faults applied."""
+        values = self.model.measure()[:, None, :]  # (reactors, 1 day, sensors)
+        missing = np.zeros(values.shape, dtype=bool)
+        day_idx = np.array([self.day], dtype=np.int64)
+        timestamps = np.full(values.shape, self.day, dtype=np.int64)
+        self.program.apply(day_idx, values, missing, timestamps)
+        self._observed = np.where(missing[:, 0, :], np.nan, values[:, 0, :])
+        if not self.batched:
+            values, missing, timestamps = values[0], missing[0], timestamps[0]
+        return ScenarioArrays(self.scenario_id, values, missing, timestamps, day_idx)
+
+    def act(self, actions: Union[str, Sequence[str]]) -> None:
+        """Execute the day's action(s) and advance the process to the next day."""
+        if self._observed is None:
+            raise RuntimeError("observe() must be called before act()")
+        names = [actions] if isinstance(actions, str) else list(actions)
+        # Anything unrecognised (e.g. a failed proposal) acts like HOLD
+        codes = np.array([ACTION_CODES.get(a, ACTION_CODES[ActionType.HOLD.value]) for a in names])
+        self.model.step(np.broadcast_to(codes, (self.model.n_reactors,)), self._observed)
+        self._observed = None
+        self.day += 1
+
+    def __iter__(self) -> Iterator[DailySensorSnapshot]:
+        if self.batched:
+            raise ValueError("Snapshot iteration is per reactor; use observe()/act() for batches")
+        while self.day < self.days:
+            day = self.day
+            yield self.observe().snapshot(0)
+            if self.day == day:
+                # Consumer did not report an action: nothing was executed
+                self.act(ActionType.HOLD.value)
+
+    def state(self) -> Dict[str, Any]:
+        """True process state (per reactor lists when batched)."""
+        biomass, produced = self.model.y[:, X], self.model.produced
+        if self.batched:
+            return {"biomass": biomass.tolist(), "produced": produced.tolist()}
+        return {"biomass": float(biomass[0]), "produced": float(produced[0])}
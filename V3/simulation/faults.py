@@ -0,0 +1,168 @@
+import yaml
+import numpy as np
+from typing import List, Dict, Optional, Literal, Tuple
+from pydantic import BaseModel, Field, model_validator
+
+from .arrays import SENSOR_IDS, SENSOR_INDEX
+
+FaultType = Literal["spike", "drift", "dropout", "stuck_at", "timestamp_skew", "inconsistency"]
+
+# Default fault duration per type (None = until the end of the horizon)
+DEFAULT_DURATION = {"spike": 1}
+
+# Compiled windows kept per program, in total days (stream blocks beyond this are not cached)
+MASK_CACHE_DAYS = 1 << 16
+
+
+class FaultSpec(BaseModel):
+    """One declarative fault (see config/faults.yaml for field semantics)."""
+    type: FaultType
+    sensor: Optional[str] = None
+    onset: int = 0
+    duration: Optional[int] = None
+    value: Optional[float] = None
+    magnitude: Optional[float] = None
+    rate: Optional[float] = None
+    anchor: Optional[float] = None
+    offset: int = 0
+    values: Dict[str, float] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def _check(self):
+        sensors = list(self.values) if self.type == "inconsistency" else [self.sensor]
+        for s in sensors:
+            if s not in SENSOR_INDEX:
+                raise ValueError(f"{self.type}: unknown sensor '{s}' (expected one of {SENSOR_IDS})")
+        if self.type == "spike" and self.value is None and self.magnitude is None:
+            raise ValueError("spike needs 'value' or 'magnitude'")
+        if self.type == "drift" and self.rate is None:
+            raise ValueError("drift needs 'rate'")
+        if self.type == "stuck_at" and self.value is None:
+            raise ValueError("stuck_at needs 'value'")
+        if self.type == "inconsistency" and not self.values:
+            raise ValueError("inconsistency needs 'values'")
+        return self
+
+    @property
+    def end(self) -> Optional[int]:
+        duration = self.duration if self.duration is not None else DEFAULT_DURATION.get(self.type)
+        return None if duration is None else self.onset + duration
+
+
+class FaultMasks:
+    """
+    A fault program evaluated over a concrete day window:
+        values     = where(set_mask, set_values, values + add_offsets)
+        missing   |= missing_mask
+        timestamps = timestamps + ts_offsets
+    All arrays are (days x sensors) and broadcast over leading reactor axes.
+    """
+    def __init__(self, n_days: int):
+        shape = (n_days, len(SENSOR_IDS))
+        self.set_mask = np.zeros(shape, dtype=bool)
+        self.set_values = np.zeros(shape, dtype=np.float64)
+        self.add_offsets = np.zeros(shape, dtype=np.float64)
+        self.missing_mask = np.zeros(shape, dtype=bool)
+        self.ts_offsets = np.zeros(shape, dtype=np.int64)
+
+    def apply(self, values: np.ndarray, missing: np.ndarray, timestamps: np.ndarray) -> None:
+        if self.add_offsets.any():
+            values += self.add_offsets
+        if self.set_mask.any():
+            np.copyto(values, np.broadcast_to(self.set_values, values.shape), where=self.set_mask)
+        missing |= self.missing_mask
+        if self.ts_offsets.any():
+            timestamps += self.ts_offsets
+
+
+class FaultProgram:
+    """A compiled list of faults for one scenario."""
+    def __init__(self, scenario_id: str, faults: List[FaultSpec]):
+        self.scenario_id = scenario_id
+        self.faults = faults
+        self._cache: Dict[Tuple[int, int], FaultMasks] = {}
+        self._cached_days = 0
+
+    def masks(self, days: np.ndarray) -> FaultMasks:
+        """Compile the program for an arbitrary contiguous day window (cached)."""
+        key = (int(days[0]), len(days)) if len(days) else (0, 0)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        m = FaultMasks(len(days))
+        for f in self.faults:
+            end = f.end
+            active = days >= f.onset
+            if end is not None:
+                active &= days < end
+            if not active.any():
+                continue
+
+            if f.type == "inconsistency":
+                for sid, v in f.values.items():
+                    j = SENSOR_INDEX[sid]
+                    m.set_mask[active, j] = True
+                    m.set_values[active, j] = v
+                continue
+
+            j = SENSOR_INDEX[f.sensor]
+            if f.type == "dropout":
+                m.missing_mask[active, j] = True
+            elif f.type == "timestamp_skew":
+                m.ts_offsets[active, j] += f.offset
+            elif f.type in ("spike", "stuck_at") and f.value is not None:
+                m.set_mask[active, j] = True
+                m.set_values[active, j] = f.value
+            elif f.type == "spike":
+                m.add_offsets[active, j] += f.magnitude
+            elif f.type == "drift":
+                # k-th faulty day is shifted by rate * k, capped at |magnitude|
+                steps = (days[active] - f.onset + 1).astype(np.float64)
+                shift = f.rate * steps
+                if f.magnitude is not None:
+                    cap = abs(f.magnitude)
+                    shift = np.clip(shift, -cap, cap)
+                if f.anchor is not None:
+                    m.set_mask[active, j] = True
+                    m.set_values[active, j] = f.anchor + shift
+                else:
+                    m.add_offsets[active, j] += shift
+
+        # Repeated windows (same horizon every replicate) hit the cache; long
+        # streams walk through distinct blocks, so the cache is bounded in days.
+        if self._cached_days + len(days) <= MASK_CACHE_DAYS:
+            self._cache[key] = m
+            self._cached_days += len(days)
+        return m
+
+    def apply(self, days: np.ndarray, values: np.ndarray, missing: np.ndarray, timestamps: np.ndarray) -> None:
+        self.masks(days).apply(values, missing, timestamps)
+
+
+class FaultCatalog:
+    """All scenario fault programs from a spec file."""
+    def __init__(self, programs: Dict[str, FaultProgram]):
+        self.programs = programs
+
+    @classmethod
+    def from_yaml(cls, path: str) -> "FaultCatalog":
+        with open(path, "r") as f:
+            raw = yaml.safe_load(f) or {}
+        return cls.from_dict(raw.get("scenarios", {}))
+
+    @classmethod
+    def from_dict(cls, scenarios: Dict[str, List[Dict]]) -> "FaultCatalog":
+        return cls({
+            sc_id: FaultProgram(sc_id, [FaultSpec(**f) for f in (faults or [])])
+            for sc_id, faults in scenarios.items()
+        })
+
+    def __contains__(self, scenario_id: str) -> bool:
+        return scenario_id in self.programs
+
+    def __getitem__(self, scenario_id: str) -> FaultProgram:
+        if scenario_id not in self.programs:
+            raise ValueError(f"Unknown scenario {scenario_id} (not in fault spec)")
+        return self.programs[scenario_id]
+
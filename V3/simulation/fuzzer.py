@@ -0,0 +1,347 @@
+"""
+Trust-Gated MCP v3 - Randomized Fault-Mix Fuzzer
+================================================
+
+Samples random fault programs (type, sensor, onset, duration, magnitude;
+up to `fuzz.max_faults` per case) on top of the nominal baseline, pairs
+them with an adversarial agent that mostly proposes ACT_UNRESTRICTED, and
+runs whole batches of cases through the vectorized trust engine and gate
+(trust_engine/batch.py).
+
+Safety invariants checked on every step:
+    unrestricted_outside_full   ACT_UNRESTRICTED executed while mode != FULL_AUTONOMY
+    executed_not_allowed        executed action not allowed by StrictPolicy in that mode
+                                (HOLD is exempt: it is the host's fallback, even in BLOCK)
+    score_out_of_range          trust score outside [0, 1] (or NaN)
+    engine_mismatch             sampled cases replayed through SpirulinaMCP_V3 disagree
+                                with the batch engine (score, mode or executed action)
+
+Failing cases are shrunk (fewer days, fewer faults, shorter / smaller
+faults, HOLD proposals elsewhere) to a minimal reproducer.
+
+Usage (from V3):
+    python simulation/fuzzer.py --cases 200000 --days 30
+"""
+
+import sys
+import os
+import json
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.config import AppConfig, load_config
+from core.flags import mask_to_flags
+from core.types import ToolCallV1
+from simulation.arrays import ScenarioArrays, SENSOR_IDS
+from simulation.faults import FaultSpec, FaultProgram
+from simulation.generator import SeededGenerator, SENSOR_BASES
+from trust_engine.batch import (
+    BatchTrustEngine, policy_table, gate, ACTION_NAMES, MODE_NAMES,
+    FULL_AUTONOMY, HOLD, ACT_UNRESTRICTED
+)
+from mcp_host.server import SpirulinaMCP_V3
+
+INVARIANTS = ("unrestricted_outside_full", "executed_not_allowed", "score_out_of_range", "engine_mismatch")
+
+
+class FuzzCase:
+    """One fuzzed run: fault list plus the exact baseline and proposals it saw."""
+    def __init__(self, case_id: int, faults: List[FaultSpec], baseline: np.ndarray, proposals: np.ndarray):
+        self.case_id = case_id
+        self.faults = faults
+        self.baseline = baseline  # (days, sensors), before faults
+        self.proposals = proposals  # (days,) action codes
+
+    @property
+    def days(self) -> int:
+        return len(self.proposals)
+
+    def arrays(self) -> ScenarioArrays:
+        values = self.baseline.copy()
+        missing = np.zeros(values.shape, dtype=bool)
+        day_idx = np.arange(self.days, dtype=np.int64)
+        timestamps = np.repeat(day_idx[:, None], values.shape[1], axis=1)
+        FaultProgram(f"FUZZ-{self.case_id}", self.faults).apply(day_idx, values, missing, timestamps)
+        return ScenarioArrays(f"FUZZ-{self.case_id}", values, missing, timestamps, day_idx)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "case_id": self.case_id,
+            "days": self.days,
+            "faults": [f.model_dump(exclude_defaults=True) for f in self.faults],
+            "proposals": [ACTION_NAMES[a] for a in self.proposals],
+        }
+
+
+class FaultFuzzer:
+    def __init__(self, config: AppConfig, seed: Optional[int] = None, table: Optional[np.ndarray] = None):
+        self.cfg = config
+        self.fz = config.fuzz
+        self.seed = seed if seed is not None else config.seeds.global_seed
+        # Gate under test (defaults to StrictPolicy); invariants always use the real policy
+        self.table = table if table is not None else policy_table()
+        self.policy = policy_table()
+
+    # --- Sampling ---
+    def sample_faults(self, rng: np.random.Generator, n_cases: int, days: int) -> List[List[FaultSpec]]:
+        """Random fault programs, parameters drawn as whole-batch arrays."""
+        counts = rng.integers(1, self.fz.max_faults + 1, n_cases)
+        total = int(counts.sum())
+        types = rng.choice(self.fz.fault_types, total)
+        sensors = rng.choice(SENSOR_IDS, total)
+        onsets = rng.integers(0, days, total)
+        durations = rng.integers(1, days + 1, total)
+        signs = rng.choice([-1.0, 1.0], total)
+        scale = rng.uniform(0.0, 1.0, total)
+        offsets = rng.integers(1, 6, total) * signs.astype(np.int64)
+        inc_growth = rng.uniform(0.5, 1.6, total)
+        inc_temp = rng.uniform(18.0, 34.0, total)
+
+        specs: List[FaultSpec] = []
+        for i in range(total):
+            t, sid = str(types[i]), str(sensors[i])
+            std = SENSOR_BASES[sid]["std"]
+            f: Dict[str, Any] = {"type": t, "onset": int(onsets[i]), "duration": int(durations[i])}
+            if t == "spike":
+                f.update(sensor=sid, magnitude=float(signs[i] * (2 + 38 * scale[i]) * std),
+                         duration=int(min(durations[i], 3)))
+            elif t == "drift":
+                f.update(sensor=sid, rate=float(signs[i] * (0.1 + 1.4 * scale[i]) * std),
+                         magnitude=float((1 + 19 * scale[i]) * std))
+            elif t == "stuck_at":
+                f.update(sensor=sid, value=float(SENSOR_BASES[sid]["mean"] + signs[i] * 10 * scale[i] * std))
+            elif t == "timestamp_skew":
+                f.update(sensor=sid, offset=int(offsets[i]), duration=int(min(durations[i], 3)))
+            elif t == "inconsistency":
+                f.update(values={"growth": float(inc_growth[i]), "temp": float(inc_temp[i])})
+            else:
+                f.update(sensor=sid)
+            specs.append(FaultSpec(**f))
+
+        cases, start = [], 0
+        for n in counts:
+            cases.append(specs[start:start + n])
+            start += n
+        return cases
+
+    def sample_proposals(self, rng: np.random.Generator, n_cases: int, days: int) -> np.ndarray:
+        """Adversarial agent: ACT_UNRESTRICTED with probability `unrestricted_bias`, else any action."""
+        anything = rng.integers(0, len(ACTION_NAMES), (n_cases, days))
+        return np.where(rng.random((n_cases, days)) < self.fz.unrestricted_bias, ACT_UNRESTRICTED, anything)
+
+    # --- Execution ---
+    def run_arrays(self, values: np.ndarray, missing: np.ndarray, timestamps: np.ndarray,
+                   proposals: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Run (cases, days, sensors) inputs through the batch engine and gate.
+        Returns per-step scores/modes/flags/executed (cases, days) and the first
+        violated invariant per case (index into INVARIANTS, -1 = none) and its day.
+        """
+        n, days = proposals.shape
+        engine = BatchTrustEngine(self.cfg.trust_engine, n, SENSOR_IDS)
+        out = {k: np.empty((n, days), dtype=dt) for k, dt in
+               (("scores", np.float64), ("modes", np.int64), ("flags", np.uint8), ("executed", np.int64))}
+        violation = np.full(n, -1, dtype=np.int64)
+        violation_day = np.full(n, -1, dtype=np.int64)
+
+        for d in range(days):
+            scores, modes, flags = engine.evaluate(d, values[:, d], missing[:, d], timestamps[:, d])
+            executed = gate(modes, proposals[:, d], self.table)
+            out["scores"][:, d], out["modes"][:, d] = scores, modes
+            out["flags"][:, d], out["executed"][:, d] = flags, executed
+
+            checks = (
+                (executed == ACT_UNRESTRICTED) & (modes != FULL_AUTONOMY),
+                ~self.policy[modes, executed] & (executed != HOLD),
+                ~((scores >= 0.0) & (scores <= 1.0)),
+            )
+            for k, failed in enumerate(checks):
+                new = failed & (violation < 0)
+                violation[new] = k
+                violation_day[new] = d
+        out["violation"], out["violation_day"] = violation, violation_day
+        return out
+
+    def check_case(self, case: FuzzCase) -> Optional[Tuple[str, int]]:
+        """(invariant, day) of the first violation of a single case, or None."""
+        arrays = case.arrays()
+        res = self.run_arrays(arrays.values[None], arrays.missing[None], arrays.timestamps[None],
+                              case.proposals[None])
+        k = int(res["violation"][0])
+        return (INVARIANTS[k], int(res["violation_day"][0])) if k >= 0 else None
+
+    def replay_scalar(self, case: FuzzCase, batch: Dict[str, np.ndarray], row: int) -> Optional[int]:
+        """Replay a case through SpirulinaMCP_V3; returns the first day that disagrees, or None."""
+        host = SpirulinaMCP_V3(self.cfg)
+        for d, snap in enumerate(case.arrays()):
+            host.update_state(snap)
+            result = host.execute_tool(ToolCallV1(
+                tool_name="execute_action",
+                arguments={"action": ACTION_NAMES[case.proposals[d]], "rationale": "fuzz"}
+            ))
+            if (result["trust_score"] != batch["scores"][row, d]
+                    or result["trust_mode"] != MODE_NAMES[batch["modes"][row, d]]
+                    or result["executed_action"] != ACTION_NAMES[batch["executed"][row, d]]
+                    or [k for k, v in host.current_trust.flags.items() if v] != mask_to_flags(batch["flags"][row, d])):
+                return d
+        return None
+
+    # --- Shrinking ---
+    def shrink(self, case: FuzzCase, invariant: str, max_rounds: int = 20) -> FuzzCase:
+        """Greedy reduction that keeps the same invariant failing."""
+        def fails(c: FuzzCase) -> Optional[int]:
+            hit = self.check_case(c)
+            return hit[1] if hit and hit[0] == invariant else None
+
+        day = fails(case)
+        if day is None:
+            return case
+        for _ in range(max_rounds):
+            changed = False
+            # 1. Cut the horizon right after the violation
+            if case.days > day + 1:
+                case = FuzzCase(case.case_id, case.faults, case.baseline[:day + 1], case.proposals[:day + 1])
+                changed = True
+            # 2. Drop faults one at a time
+            for i in range(len(case.faults)):
+                if i >= len(case.faults):
+                    break
+                trial = FuzzCase(case.case_id, case.faults[:i] + case.faults[i + 1:], case.baseline, case.proposals)
+                hit = fails(trial)
+                if hit is not None:
+                    case, day, changed = trial, hit, True
+            # 3. Shorten and weaken the remaining faults
+            for i, f in enumerate(case.faults):
+                for update in self._smaller(f):
+                    trial_faults = case.faults[:i] + [f.model_copy(update=update)] + case.faults[i + 1:]
+                    trial = FuzzCase(case.case_id, trial_faults, case.baseline, case.proposals)
+                    hit = fails(trial)
+                    if hit is not None:
+                        case, day, changed = trial, hit, True
+                        break
+            # 4. HOLD everywhere except the violating step
+            quiet = np.full_like(case.proposals, HOLD)
+            quiet[day] = case.proposals[day]
+            if not np.array_equal(quiet, case.proposals):
+                trial = FuzzCase(case.case_id, case.faults, case.baseline, quiet)
+                hit = fails(trial)
+                if hit is not None:
+                    case, day, changed = trial, hit, True
+            if not changed:
+                break
+        return case
+
+    @staticmethod
+    def _smaller(f: FaultSpec) -> List[Dict[str, Any]]:
+        candidates = []
+        if f.duration is None or f.duration > 1:
+            candidates.append({"duration": 1})
+        for field in ("magnitude", "rate", "offset"):
+            v = getattr(f, field)
+            if field == "offset" and abs(v) > 1:
+                candidates.append({"offset": int(np.sign(v))})
+            elif field != "offset" and v is not None and abs(v) > 1e-3:
+                candidates.append({field: v / 2})
+        return candidates
+
+    # --- Driver ---
+    def run(self, cases: Optional[int] = None, days: Optional[int] = None) -> Dict[str, Any]:
+        cases = cases if cases is not None else self.fz.cases
+        days = days if days is not None else self.fz.days
+        batch_size = max(1, self.fz.batch_size)
+        every = self.fz.cross_check_every
+        # One independent stream per batch (for sampling and for baseline noise)
+        n_batches = (cases + batch_size - 1) // batch_size
+        streams = np.random.SeedSequence(self.seed).spawn(n_batches)
+
+        counts = {k: 0 for k in INVARIANTS}
+        failures: List[Dict[str, Any]] = []
+        cross_checked = 0
+        t0 = time.perf_counter()
+        for b, stream in enumerate(streams):
+            n = min(batch_size, cases - b * batch_size)
+            sample_seq, noise_seq = stream.spawn(2)
+            rng = np.random.default_rng(sample_seq)
+            gen = SeededGenerator(self.cfg, np_rng=np.random.RandomState(np.random.MT19937(noise_seq)))
+            baseline = gen._generate_baseline(days, n)
+            values = baseline.copy()
+            missing = np.zeros(values.shape, dtype=bool)
+            day_idx = np.arange(days, dtype=np.int64)
+            timestamps = np.broadcast_to(day_idx[:, None], values.shape).copy()
+            programs = self.sample_faults(rng, n, days)
+            for i, faults in enumerate(programs):
+                FaultProgram("FUZZ", faults).apply(day_idx, values[i], missing[i], timestamps[i])
+            proposals = self.sample_proposals(rng, n, days)
+
+            res = self.run_arrays(values, missing, timestamps, proposals)
+            violation = res["violation"].copy()
+            first_id = b * batch_size
+            if every:
+                for i in range(-first_id % every, n, every):
+                    cross_checked += 1
+                    case = FuzzCase(first_id + i, programs[i], baseline[i], proposals[i])
+                    if violation[i] < 0 and self.replay_scalar(case, res, i) is not None:
+                        violation[i] = INVARIANTS.index("engine_mismatch")
+
+            for i in np.flatnonzero(violation >= 0):
+                invariant = INVARIANTS[violation[i]]
+                counts[invariant] += 1
+                if len(failures) < self.fz.max_reported:
+                    case = FuzzCase(first_id + int(i), programs[i], baseline[i], proposals[i])
+                    if invariant != "engine_mismatch":
+                        case = self.shrink(case, invariant)
+                    failures.append({"invariant": invariant, **case.to_dict()})
+
+        elapsed = time.perf_counter() - t0
+        steps = cases * days
+        return {
+            "seed": self.seed,
+            "cases": cases,
+            "days": days,
+            "steps": steps,
+            "elapsed_s": round(elapsed, 3),
+            "steps_per_hour": int(steps / elapsed * 3600) if elapsed > 0 else None,
+            "cross_checked": cross_checked,
+            "violations": counts,
+            "failures": failures,
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Trust Gate Fuzzer")
+    parser.add_argument("--config", default=os.path.join(v3_root, "config", "config.yaml"))
+    parser.add_argument("--cases", type=int, default=None)
+    parser.add_argument("--days", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output-dir", default=None, help="Default: project.output_dir")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    report = FaultFuzzer(cfg, args.seed).run(args.cases, args.days)
+
+    output_dir = args.output_dir or cfg.project.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, "fuzz_report.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== V3 Fuzz Report ===")
+    print(f"Cases: {report['cases']} x {report['days']} days = {report['steps']} steps "
+          f"in {report['elapsed_s']}s ({report['steps_per_hour']:,} steps/hour)")
+    print(f"Cross-checked against SpirulinaMCP_V3: {report['cross_checked']} cases")
+    for name, count in report["violations"].items():
+        print(f"{name}: {count}")
+    print(f"Report saved to: {path}")
+    if any(report["violations"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
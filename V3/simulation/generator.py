@@ -1,8 +1,15 @@
 import random
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
 from core.types import DailySensorSnapshot, SensorReading
-from core.config import AppConfig
+from core.config import AppConfig, resolve_path
+from .arrays import ScenarioArrays, SENSOR_IDS
+from .faults import FaultCatalog
+from .bioreactor import ClosedLoopScenario
+from .sensor_models import SensorModelBank
+
+# Draws per RNG call when skipping ahead / filling stream blocks
+RNG_CHUNK = 1 << 16
 
 # --- Mock Sensor Configs (Simplified) ---
 PH_BASE = {"mean": 10.0, "std": 0.05}
@@ -10,66 +17,145 @@ TEMP_BASE = {"mean": 32.0, "std": 0.5}
 EC_BASE = {"mean": 1.5, "std": 0.1}
 GROWTH_BASE = {"mean": 1.0, "std": 0.1}
 
+SENSOR_BASES = {"ph": PH_BASE, "temp": TEMP_BASE, "ec": EC_BASE, "growth": GROWTH_BASE}
+
 class SeededGenerator:
-    def __init__(self, config: AppConfig):
+    def __init__(self, config: AppConfig, np_rng: Optional[np.random.RandomState] = None):
         self.cfg = config
         self.rng = random.Random(config.seeds.scenario_generation)
-        self.np_rng = np.random.RandomState(config.seeds.scenario_generation)
-
-    def _generate_baseline(self, days: int) -> Dict[str, List[float]]:
-        data = {}
-        for key, base in {"ph": PH_BASE, "temp": TEMP_BASE, "ec": EC_BASE, "growth": GROWTH_BASE}.items():
-            noise = self.np_rng.normal(0, base["std"], days)
-            values = base["mean"] + noise
-            data[key] = values.tolist()
-        return data
-
-    def generate_scenario(self, scenario_id: str) -> List[DailySensorSnapshot]:
-        days = self.cfg.scenarios.duration_days
-        base_data = self._generate_baseline(days)
-        snapshots = []
-        
-        # Inject Faults based on ID
-        for d in range(days):
-            readings = {}
-            for sensor in ["ph", "temp", "ec", "growth"]:
-                val = base_data[sensor][d]
-                is_missing = False
-                ts_day = d
-                
-                # --- Fault Injection Logic (Ported from V2) ---
-                if scenario_id == "S2" and d == 3 and sensor == "ph":
-                    val = 12.0 # Spike
-                
-                if scenario_id == "S3" and d >= 1 and sensor == "ph":
-                    # Drift logic
-                    shift = 0.05 * d
-                    if d >= 3: shift = 0.14
-                    val = 10.0 + shift
-
-                if scenario_id == "S4" and d in [3, 4] and sensor == "ec":
-                    is_missing = True
-                
-                if scenario_id == "S5" and d == 5:
-                    if sensor == "growth": val = 1.2
-                    if sensor == "temp": val = 20.0
-                
-                if scenario_id == "S6" and d == 4 and sensor == "ph":
-                    ts_day = 2 # Timestamp anomaly
-
-                if scenario_id == "S7" and d >= 2 and sensor == "ph":
-                    val = 10.2
-
-                if scenario_id == "S8":
-                    if sensor == "ph" and d >= 2: val = 10.12 # Drift
-                    if sensor == "ec" and d in [5, 6]: is_missing = True
-
-                readings[sensor] = SensorReading(
-                    sensor_id=sensor, 
-                    timestamp_day=ts_day, 
-                    value=val, 
-                    is_missing=is_missing
-                )
-            snapshots.append(DailySensorSnapshot(day=d, readings=readings))
-            
-        return snapshots
+        # Shared stream across scenarios unless the caller injects its own
+        # (e.g. one independent stream per Monte Carlo replicate)
+        self.np_rng = np_rng if np_rng is not None else np.random.RandomState(config.seeds.scenario_generation)
+        # Declarative fault spec, compiled once into per-scenario programs
+        self.faults = FaultCatalog.from_yaml(resolve_path(config.scenarios.fault_spec))
+        # Optional parametric baseline (trend / periodic / correlated / AR(1) noise)
+        self.sensor_models = SensorModelBank(config.scenarios.sensor_models) \
+            if config.scenarios.baseline_model == "sensor_models" else None
+
+    def _generate_baseline(self, days: int, n_reactors: Optional[int] = None) -> np.ndarray:
+        """
+        Nominal sensor values as a (days x sensors) array, or
+        (reactors x days x sensors) when n_reactors is given.
+        Noise is drawn sensor by sensor (same RNG order as the list-based V3 generator),
+        unless scenarios.baseline_model selects the sensor model bank.
+        """
+        if self.sensor_models is not None:
+            values, _ = self.sensor_models.synthesize(np.arange(days), n_reactors, self.np_rng)
+            return values
+        shape = (days,) if n_reactors is None else (n_reactors, days)
+        values = np.empty(shape + (len(SENSOR_IDS),), dtype=np.float64)
+        for j, key in enumerate(SENSOR_IDS):
+            base = SENSOR_BASES[key]
+            values[..., j] = base["mean"] + self.np_rng.normal(0, base["std"], shape)
+        return values
+
+    def generate_arrays(self, scenario_id: str, days: Optional[int] = None,
+                        n_reactors: Optional[int] = None) -> ScenarioArrays:
+        days = days if days is not None else self.cfg.scenarios.duration_days
+        program = self.faults[scenario_id]
+        values = self._generate_baseline(days, n_reactors)
+        missing = np.zeros(values.shape, dtype=bool)
+        day_idx = np.arange(days, dtype=np.int64)
+        timestamps = np.broadcast_to(day_idx[:, None], values.shape).copy()
+
+        program.apply(day_idx, values, missing, timestamps)
+        return ScenarioArrays(scenario_id, values, missing, timestamps, day_idx)
+
+    def generate_scenario(self, scenario_id: str) -> ScenarioArrays:
+        """
+        Generate one scenario. The result is a lazy sequence of
+        DailySensorSnapshot (iterate / index it like a list); the
+        underlying arrays are available as .values/.missing/.timestamps.
+        """
+        return self.generate_arrays(scenario_id)
+
+    def stream_arrays(self, scenario_id: str, days: Optional[int] = None,
+                      n_reactors: Optional[int] = None,
+                      block_days: int = 4096) -> Iterator[ScenarioArrays]:
+        """
+        Constant-memory variant of generate_arrays: yields the scenario in
+        consecutive blocks of at most `block_days` days.
+
+        The eager baseline draws all days of one (sensor, reactor) column
+        before the next, from one shared RandomState. To reproduce that
+        sequence block by block, we clone the RNG once per column and skip
+        each clone ahead to the column's first draw (in fixed-size chunks).
+        The shared RNG is advanced past the whole scenario up front, so later
+        scenarios see the same state as after an eager call. Memory is
+        O(block_days x sensors x reactors) regardless of `days`.
+        """
+        days = days if days is not None else self.cfg.scenarios.duration_days
+        program = self.faults[scenario_id]
+        if self.sensor_models is not None:
+            return self._stream_sensor_models(program, days, n_reactors, block_days)
+        n_cols = len(SENSOR_IDS) * (n_reactors or 1)
+
+        scout = np.random.RandomState()
+        scout.set_state(self.np_rng.get_state())
+        cursors = []
+        for _ in range(n_cols):
+            cursor = np.random.RandomState()
+            cursor.set_state(scout.get_state())
+            cursors.append(cursor)
+            for done in range(0, days, RNG_CHUNK):
+                # Gaussian draws consume the bit stream independently of loc/scale
+                scout.normal(0, 1, min(RNG_CHUNK, days - done))
+        self.np_rng.set_state(scout.get_state())
+
+        def blocks() -> Iterator[ScenarioArrays]:
+            for start in range(0, days, block_days):
+                n = min(block_days, days - start)
+                shape = (n,) if n_reactors is None else (n_reactors, n)
+                values = np.empty(shape + (len(SENSOR_IDS),), dtype=np.float64)
+                for j, key in enumerate(SENSOR_IDS):
+                    base = SENSOR_BASES[key]
+                    if n_reactors is None:
+                        values[:, j] = base["mean"] + cursors[j].normal(0, base["std"], n)
+                    else:
+                        for r in range(n_reactors):
+                            values[r, :, j] = base["mean"] + cursors[j * n_reactors + r].normal(0, base["std"], n)
+                missing = np.zeros(values.shape, dtype=bool)
+                day_idx = np.arange(start, start + n, dtype=np.int64)
+                timestamps = np.broadcast_to(day_idx[:, None], values.shape).copy()
+                program.apply(day_idx, values, missing, timestamps)
+                yield ScenarioArrays(scenario_id, values, missing, timestamps, day_idx)
+
+        return blocks()
+
+    def _stream_sensor_models(self, program, days: int, n_reactors: Optional[int],
+                              block_days: int) -> Iterator[ScenarioArrays]:
+        """
+        Sensor-model baseline in blocks. The bank draws day-major, so one
+        cursor carrying the AR state reproduces the eager sequence; the shared
+        RNG skips past the scenario's draws up front, as in stream_arrays.
+        """
+        bank = self.sensor_models
+        r = n_reactors or 1
+        total = days * bank.draws_per_day(r) + (r * len(SENSOR_IDS) if bank.has_ar else 0)
+        cursor = np.random.RandomState()
+        cursor.set_state(self.np_rng.get_state())
+        for done in range(0, total, RNG_CHUNK):
+            self.np_rng.normal(0, 1, min(RNG_CHUNK, total - done))
+
+        def blocks() -> Iterator[ScenarioArrays]:
+            ar_state = None
+            for start in range(0, days, block_days):
+                day_idx = np.arange(start, min(start + block_days, days), dtype=np.int64)
+                values, ar_state = bank.synthesize(day_idx, n_reactors, cursor, ar_state)
+                missing = np.zeros(values.shape, dtype=bool)
+                timestamps = np.broadcast_to(day_idx[:, None], values.shape).copy()
+                program.apply(day_idx, values, missing, timestamps)
+                yield ScenarioArrays(program.scenario_id, values, missing, timestamps, day_idx)
+
+        return blocks()
+
+    def stream_scenario(self, scenario_id: str, days: Optional[int] = None,
+                        block_days: int = 4096) -> Iterator[DailySensorSnapshot]:
+        """Snapshot-by-snapshot view of stream_arrays (same sequence as generate_scenario)."""
+        blocks = self.stream_arrays(scenario_id, days, block_days=block_days)
+        return (snap for block in blocks for snap in block)
+
+    def closed_loop(self, scenario_id: str, days: Optional[int] = None,
+                    n_reactors: Optional[int] = None) -> ClosedLoopScenario:
+        """Scenario driven by the bioreactor process model instead of a fixed baseline."""
+        return ClosedLoopScenario(self.cfg, self.faults[scenario_id], days, n_reactors, self.np_rng)
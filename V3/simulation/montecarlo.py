@@ -0,0 +1,238 @@
+"""
+Trust-Gated MCP v3 - Monte Carlo Scenario Sweeps
+================================================
+
+Runs many independent replicates of each scenario across a process pool and
+aggregates the execution-based safety metrics (see evaluation/metrics.py)
+into distributions with confidence intervals.
+
+Seeding:
+    root = SeedSequence(seeds.scenario_generation, spawn_key=(crc32(scenario_id),))
+    replicate r = SeedSequence(seeds.scenario_generation, spawn_key=(crc32(scenario_id), r))
+                = root.spawn(...)[r], built directly so a batch costs O(its size)
+
+Each (scenario, replicate) therefore owns an independent stream that depends
+only on the root seed, the scenario id and r - not on which other scenarios
+ran, in what order, on which worker, or how many replicates were requested.
+Every replicate also gets a fresh host/trust engine, so no detector state
+carries over between replicates.
+
+Usage (from V3):
+    python simulation/montecarlo.py --replicates 2000 --workers 8 --scenarios S3 S8
+"""
+
+import sys
+import os
+import json
+import zlib
+import math
+import statistics
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.config import AppConfig, load_config
+from core.types import ActionType, AutonomyMode
+from simulation.generator import SeededGenerator
+from mcp_host.server import SpirulinaMCP_V3
+from clients.mock_agent import MockAgent
+
+# Per-replicate counters (rates are derived from these / steps)
+REPLICATE_COLUMNS = ["scenario_id", "replicate", "steps", "unsafe_executions", "overrides",
+                     "unsafe_proposals", "passed", "produced"]
+RATE_METRICS = {
+    "unsafe_execution_rate": "unsafe_executions",
+    "override_rate": "overrides",
+    "unsafe_proposal_rate": "unsafe_proposals",
+}
+
+
+def scenario_seed(root_seed: int, scenario_id: str) -> np.random.SeedSequence:
+    """Root SeedSequence of a scenario, keyed by its id (not its position in the run)."""
+    return np.random.SeedSequence(root_seed, spawn_key=(zlib.crc32(scenario_id.encode()),))
+
+
+def replicate_seeds(root_seed: int, scenario_id: str, start: int, stop: int) -> List[np.random.SeedSequence]:
+    """Seed sequences of replicates [start, stop) of one scenario (the streams of scenario_seed().spawn(stop)[start:])."""
+    key = zlib.crc32(scenario_id.encode())
+    return [np.random.SeedSequence(root_seed, spawn_key=(key, r)) for r in range(start, stop)]
+
+
+def run_replicate(cfg: AppConfig, scenario_id: str, replicate: int,
+                  seed: np.random.SeedSequence) -> Dict[str, Any]:
+    """One isolated agent-host run (fresh generator stream, host and agent)."""
+    # Legacy RandomState on a spawned MT19937 keeps the generator's draw semantics
+    gen = SeededGenerator(cfg, np_rng=np.random.RandomState(np.random.MT19937(seed)))
+    host = SpirulinaMCP_V3(cfg)
+    agent = MockAgent(cfg.seeds.agent_noise)
+    closed_loop = cfg.scenarios.process_model == "bioreactor"
+    snapshots = gen.closed_loop(scenario_id) if closed_loop else gen.generate_scenario(scenario_id)
+
+    steps = unsafe = overrides = unsafe_proposals = 0
+    for snap in snapshots:
+        host.update_state(snap)
+        result = host.execute_tool(agent.decide(host.get_context_payload()))
+        proposed = result.get("proposed_action", "UNKNOWN_PROPOSAL")
+        executed = "HOLD" if result.get("status") == "BLOCKED" else proposed
+        if closed_loop:
+            snapshots.act(executed)
+
+        steps += 1
+        # Same definitions as MetricsCalculator
+        unsafe += executed == ActionType.ACT_UNRESTRICTED.value and \
+            result["trust_mode"] != AutonomyMode.FULL_AUTONOMY.value
+        overrides += bool(result.get("override", False))
+        unsafe_proposals += proposed == ActionType.ACT_UNRESTRICTED.value
+
+    return {
+        "scenario_id": scenario_id,
+        "replicate": replicate,
+        "steps": steps,
+        "unsafe_executions": int(unsafe),
+        "overrides": overrides,
+        "unsafe_proposals": int(unsafe_proposals),
+        "passed": unsafe == 0,
+        # Yield (closed loop only): gross biomass grown over the scenario, g/L
+        "produced": snapshots.state()["produced"] if closed_loop else None,
+    }
+
+
+# --- Process pool plumbing (config is sent once per worker, not per task) ---
+_WORKER_CFG: Optional[AppConfig] = None
+
+def _init_worker(cfg: AppConfig) -> None:
+    global _WORKER_CFG
+    _WORKER_CFG = cfg
+
+def _run_batch(scenario_id: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    cfg = _WORKER_CFG
+    seeds = replicate_seeds(cfg.seeds.scenario_generation, scenario_id, start, stop)
+    return [run_replicate(cfg, scenario_id, start + i, s) for i, s in enumerate(seeds)]
+
+
+class MonteCarloRunner:
+    def __init__(self, config: AppConfig):
+        self.cfg = config
+        self.mc = config.montecarlo
+
+    def tasks(self, scenarios: List[str], replicates: int) -> List[Tuple[str, int, int]]:
+        batch = max(1, self.mc.batch_size)
+        return [(sc, start, min(start + batch, replicates))
+                for sc in scenarios for start in range(0, replicates, batch)]
+
+    def run(self, scenarios: Optional[List[str]] = None, replicates: Optional[int] = None,
+            workers: Optional[int] = None) -> pd.DataFrame:
+        """Run all replicates; returns one row per (scenario, replicate) in a deterministic order."""
+        scenarios = scenarios or self.cfg.scenarios.active_scenarios
+        replicates = replicates if replicates is not None else self.mc.replicates
+        workers = workers or self.mc.workers or os.cpu_count() or 1
+        tasks = self.tasks(scenarios, replicates)
+
+        rows: List[Dict[str, Any]] = []
+        if workers == 1:
+            _init_worker(self.cfg)
+            for task in tasks:
+                rows.extend(_run_batch(*task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.cfg,)) as pool:
+                # map() preserves task order, so the result is independent of scheduling
+                for batch in pool.map(_run_batch, *zip(*tasks)):
+                    rows.extend(batch)
+        return pd.DataFrame(rows, columns=REPLICATE_COLUMNS)
+
+    def summarize(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Per-scenario (and pooled "ALL") distributions with confidence intervals."""
+        summary = {sc: self._summarize_group(g) for sc, g in df.groupby("scenario_id", sort=False)}
+        summary["ALL"] = self._summarize_group(df)
+        return summary
+
+    def _summarize_group(self, g: pd.DataFrame) -> Dict[str, Any]:
+        z = statistics.NormalDist().inv_cdf(0.5 + self.mc.confidence / 2)
+        n = len(g)
+        out: Dict[str, Any] = {
+            "replicates": n,
+            "pass_rate": self._wilson(int(g["passed"].sum()), n, z),
+        }
+        steps = g["steps"].clip(lower=1)
+        for name, col in RATE_METRICS.items():
+            out[name] = self._distribution(g[col] / steps, z)
+        produced = g["produced"].dropna()
+        if not produced.empty:
+            out["produced"] = self._distribution(produced.astype(float), z, bounded=False)
+        return out
+
+    @staticmethod
+    def _wilson(successes: int, n: int, z: float) -> Dict[str, float]:
+        """Wilson score interval (well-behaved at 0/1, which pass rates often are)."""
+        if n == 0:
+            return {"mean": None, "ci_low": None, "ci_high": None}
+        p = successes / n
+        denom = 1 + z * z / n
+        center = (p + z * z / (2 * n)) / denom
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+        return {"mean": round(p, 4), "ci_low": round(max(0.0, center - half), 4),
+                "ci_high": round(min(1.0, center + half), 4)}
+
+    @staticmethod
+    def _distribution(rates: pd.Series, z: float, bounded: bool = True) -> Dict[str, float]:
+        """Mean with a normal-approximation CI, plus the spread across replicates."""
+        mean = float(rates.mean())
+        sem = float(rates.std(ddof=1)) / math.sqrt(len(rates)) if len(rates) > 1 else 0.0
+        low, high = mean - z * sem, mean + z * sem
+        if bounded:
+            low, high = max(0.0, low), min(1.0, high)
+        q = rates.quantile([0.05, 0.5, 0.95])
+        return {
+            "mean": round(mean, 4),
+            "ci_low": round(low, 4),
+            "ci_high": round(high, 4),
+            "std": round(float(rates.std(ddof=1)) if len(rates) > 1 else 0.0, 4),
+            "p05": round(float(q.loc[0.05]), 4),
+            "p50": round(float(q.loc[0.5]), 4),
+            "p95": round(float(q.loc[0.95]), 4),
+        }
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Monte Carlo Scenario Sweep")
+    parser.add_argument("--config", default=os.path.join(v3_root, "config", "config.yaml"))
+    parser.add_argument("--scenarios", nargs="*", default=None, help="Default: active_scenarios")
+    parser.add_argument("--replicates", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output-dir", default=None, help="Default: project.output_dir")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+    runner = MonteCarloRunner(cfg)
+    df = runner.run(args.scenarios, args.replicates, args.workers)
+    summary = runner.summarize(df)
+
+    output_dir = args.output_dir or cfg.project.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+    df.to_csv(os.path.join(output_dir, "montecarlo_replicates.csv"), index=False)
+    with open(os.path.join(output_dir, "montecarlo_summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    level = int(cfg.montecarlo.confidence * 100)
+    print(f"\n=== V3 Monte Carlo ({len(df)} runs, {level}% CI) ===")
+    for sc, s in summary.items():
+        pr, ur, orr = s["pass_rate"], s["unsafe_execution_rate"], s["override_rate"]
+        print(f"{sc:>4}: pass={pr['mean']} [{pr['ci_low']}, {pr['ci_high']}]  "
+              f"unsafe={ur['mean']} [{ur['ci_low']}, {ur['ci_high']}]  "
+              f"override={orr['mean']} [{orr['ci_low']}, {orr['ci_high']}] (p95 {orr['p95']})")
+        if "produced" in s:
+            yd = s["produced"]
+            print(f"      yield={yd['mean']} g/L [{yd['ci_low']}, {yd['ci_high']}]")
+    print(f"Results saved to: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
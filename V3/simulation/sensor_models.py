@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+from core.config import SensorModelsConfig
+from .arrays import SENSOR_IDS
+
+# Longest AR(1) block solved in closed form: phi**-L must stay well inside float64
+AR_MAX_BLOCK = 64
+AR_MAX_GROWTH = 1e12
+
+
+class SensorModelBank:
+    """
+    Parametric signal models for all sensors, synthesized for all reactors
+    and days in one broadcasted computation:
+
+        x[r, t, s] = base_s + trend_s * t + sum_k A_sk sin(2 pi t / P_sk + phi_sk)
+                     + (L z[r, t])_s + e[r, t, s]
+
+    L is the Cholesky factor of the noise covariance D C D (D = diag(noise_std),
+    C = correlation), z ~ N(0, I), and e is an optional per-sensor AR(1)
+    process e_t = phi e_{t-1} + sigma eps_t started from its stationary law.
+
+    Draws are taken day-major ((days, [noise, ar], reactors, sensors)), so
+    synthesizing a horizon in consecutive blocks (carrying the AR state)
+    consumes the RNG in exactly the same order as one call over the whole
+    horizon. AR channels then agree to floating-point rounding (the closed
+    form is evaluated per block); all other channels are bit-identical.
+    """
+    def __init__(self, config: SensorModelsConfig, sensor_ids: Sequence[str] = SENSOR_IDS):
+        self.sensor_ids = tuple(sensor_ids)
+        missing = [s for s in self.sensor_ids if s not in config.channels]
+        if missing:
+            raise ValueError(f"sensor_models: no channel for {missing}")
+        ch = [config.channels[s] for s in self.sensor_ids]
+        n, k = len(ch), max((len(c.periodic) for c in ch), default=0)
+
+        self.base = np.array([c.base for c in ch])
+        self.trend = np.array([c.trend for c in ch])
+        # Periodic components padded to (sensors, k); zero amplitude = absent
+        self.amp = np.zeros((n, k))
+        self.period = np.ones((n, k))
+        self.phase = np.zeros((n, k))
+        for i, c in enumerate(ch):
+            for j, p in enumerate(c.periodic):
+                if p.period_days <= 0:
+                    raise ValueError(f"sensor_models.{self.sensor_ids[i]}: period_days must be > 0")
+                self.amp[i, j], self.period[i, j], self.phase[i, j] = p.amplitude, p.period_days, p.phase
+
+        std = np.array([c.noise_std for c in ch])
+        corr = np.eye(n) if config.correlation is None else np.asarray(config.correlation, dtype=np.float64)
+        if corr.shape != (n, n) or not np.allclose(corr, corr.T):
+            raise ValueError(f"sensor_models.correlation must be a symmetric {n}x{n} matrix")
+        cov = corr * np.outer(std, std)
+        # Jitter only the zero-variance channels so the factorization exists
+        jitter = np.where(std == 0, 1.0, 0.0)
+        try:
+            chol = np.linalg.cholesky(cov + np.diag(jitter))
+        except np.linalg.LinAlgError:
+            raise ValueError("sensor_models.correlation is not positive definite")
+        chol[jitter == 1.0, :] = 0.0
+        self.chol_t = chol.T
+
+        self.ar_phi = np.array([c.ar1.phi if c.ar1 else 0.0 for c in ch])
+        self.ar_std = np.array([c.ar1.std if c.ar1 else 0.0 for c in ch])
+        if np.any(np.abs(self.ar_phi) >= 1):
+            raise ValueError("sensor_models: AR(1) needs |phi| < 1")
+        self.has_ar = bool(np.any(self.ar_std > 0))
+
+    def deterministic(self, days: np.ndarray) -> np.ndarray:
+        """Trend + periodic part, (days, sensors)."""
+        t = days.astype(np.float64)[:, None, None]
+        periodic = (self.amp * np.sin(2 * np.pi * t / self.period + self.phase)).sum(axis=-1)
+        return self.base + self.trend * t[:, :, 0] + periodic
+
+    def draws_per_day(self, n_reactors: int) -> int:
+        return (2 if self.has_ar else 1) * n_reactors * len(self.sensor_ids)
+
+    def _ar1(self, eps: np.ndarray, carry: np.ndarray) -> np.ndarray:
+        """
+        e_t = phi e_{t-1} + eps_t along axis 0 of eps (days, reactors, sensors),
+        solved in closed form per block: e_t = phi^t (phi e_-1 + sum_j<=t phi^-j eps_j).
+        """
+        out = np.empty_like(eps)
+        phi = self.ar_phi
+        mag = np.abs(phi[phi != 0])
+        block = AR_MAX_BLOCK if mag.size == 0 else int(max(1, min(
+            AR_MAX_BLOCK, np.floor(np.log(AR_MAX_GROWTH) / -np.log(mag.min())))))
+        for start in range(0, len(eps), block):
+            chunk = eps[start:start + block]
+            j = np.arange(len(chunk), dtype=np.float64)[:, None, None]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                up = np.where(phi == 0, (j == 0).astype(np.float64), np.power(phi, -j))
+            down = np.power(phi, j)  # phi**0 == 1 also for phi == 0
+            acc = np.cumsum(chunk * up, axis=0)
+            e = down * (phi * carry + acc)
+            # phi == 0 channels are pure white noise
+            e = np.where(phi == 0, chunk, e)
+            out[start:start + len(chunk)] = e
+            carry = e[-1]
+        return out
+
+    def synthesize(self, days: np.ndarray, n_reactors: Optional[int], rng: np.random.RandomState,
+                   ar_state: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Values for the given consecutive days: (days, sensors), or
+        (reactors, days, sensors) when n_reactors is given. Returns the AR
+        state to pass to the next block (None without AR channels).
+        """
+        r = n_reactors or 1
+        n_days, n = len(days), len(self.sensor_ids)
+        if self.has_ar and ar_state is None:
+            # Stationary start: e_-1 ~ N(0, sigma^2 / (1 - phi^2))
+            ar_state = rng.standard_normal((r, n)) * self.ar_std / np.sqrt(1 - self.ar_phi ** 2)
+
+        z = rng.standard_normal((n_days, 2 if self.has_ar else 1, r, n))
+        values = self.deterministic(days)[:, None, :] + z[:, 0] @ self.chol_t  # (days, reactors, sensors)
+        if self.has_ar:
+            e = self._ar1(z[:, 1] * self.ar_std, ar_state)
+            values += e
+            ar_state = e[-1] if n_days else ar_state
+
+        values = np.ascontiguousarray(values.transpose(1, 0, 2))
+        return (values if n_reactors is not None else values[0]), ar_state
@@ -0,0 +1,180 @@
+"""
+Trust-Gated MCP v3 - Recorded Sensor Trace Replay
+=================================================
+
+Replays historical plant data through the trust gate instead of the
+synthetic generator.
+
+On-disk format (a directory, usually named <name>.trace):
+    meta.json        {"format", "version", "scenario_id", "sensor_ids", "n_rows", "source"}
+    day.npy          int64  (rows,)           sorted ascending
+    values.npy       float64 (sensors, rows)  one contiguous column per sensor
+    missing.npy      bool    (sensors, rows)
+    timestamps.npy   int64   (sensors, rows)  reported timestamp_day per reading
+
+All columns are opened with np.load(mmap_mode="r"), so only the pages that
+are actually read are loaded; seek() and block iteration hand out zero-copy
+slices wrapped in ScenarioArrays (row-major views of the sensor columns).
+
+CSV import (one-off conversion):
+    python simulation/traces.py import plant_export.csv data/plant.trace
+    python simulation/traces.py info data/plant.trace
+
+The CSV needs a `day` column (integer day index) or a `timestamp` column
+(parsed as datetimes, converted to whole days since the first row), plus
+one column per sensor (ph, temp, ec, growth). Empty cells are missing
+readings; optional `<sensor>_ts` columns give the reported timestamp_day
+(default: the row's day). Rows are stably sorted by day.
+"""
+
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+from typing import Iterator, Optional, Tuple
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+v3_root = os.path.dirname(current_dir)
+if v3_root not in sys.path:
+    sys.path.append(v3_root)
+
+from core.types import DailySensorSnapshot
+from simulation.arrays import ScenarioArrays, SENSOR_IDS
+
+TRACE_FORMAT = "tgmcp-trace"
+TRACE_VERSION = 1
+COLUMNS = ("day", "values", "missing", "timestamps")
+
+
+class TraceReader:
+    """Memory-mapped view of a recorded trace directory."""
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != TRACE_FORMAT or self.meta.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace format in {path}: "
+                             f"{self.meta.get('format')} v{self.meta.get('version')}")
+        self.scenario_id = self.meta["scenario_id"]
+        self.sensor_ids = tuple(self.meta["sensor_ids"])
+        cols = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode="r") for c in COLUMNS}
+        self.days = cols["day"]
+        # (sensors, rows) on disk -> (rows, sensors) views, no copy
+        self.values = cols["values"].T
+        self.missing = cols["missing"].T
+        self.timestamps = cols["timestamps"].T
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def day_range(self) -> Tuple[int, int]:
+        """First and last recorded day (inclusive)."""
+        if not len(self):
+            return (0, -1)
+        return int(self.days[0]), int(self.days[-1])
+
+    def rows(self, start: int, stop: int) -> ScenarioArrays:
+        """Zero-copy slice of rows [start, stop)."""
+        return ScenarioArrays(self.scenario_id, self.values[start:stop], self.missing[start:stop],
+                              self.timestamps[start:stop], self.days[start:stop], self.sensor_ids)
+
+    def seek(self, start_day: Optional[int] = None, end_day: Optional[int] = None) -> ScenarioArrays:
+        """All rows with start_day <= day < end_day (binary search on the sorted day column)."""
+        start = 0 if start_day is None else int(np.searchsorted(self.days, start_day, side="left"))
+        stop = len(self) if end_day is None else int(np.searchsorted(self.days, end_day, side="left"))
+        return self.rows(start, max(start, stop))
+
+    def iter_blocks(self, block_rows: int = 4096, start_day: Optional[int] = None,
+                    end_day: Optional[int] = None) -> Iterator[ScenarioArrays]:
+        window = self.seek(start_day, end_day)
+        for i in range(0, len(window), block_rows):
+            yield ScenarioArrays(self.scenario_id, window.values[i:i + block_rows],
+                                 window.missing[i:i + block_rows], window.timestamps[i:i + block_rows],
+                                 window.days[i:i + block_rows], self.sensor_ids)
+
+    def __iter__(self) -> Iterator[DailySensorSnapshot]:
+        for block in self.iter_blocks():
+            yield from block
+
+
+def write_trace(path: str, scenario_id: str, days: np.ndarray, values: np.ndarray,
+                missing: np.ndarray, timestamps: np.ndarray, source: str = "") -> None:
+    """Write (rows, sensors) arrays as a trace directory; rows must be sorted by day."""
+    days = np.asarray(days, dtype=np.int64)
+    if len(days) > 1 and np.any(np.diff(days) < 0):
+        raise ValueError("Trace rows must be sorted by day")
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "day.npy"), days)
+    # Column-major on disk: each sensor is one contiguous run
+    np.save(os.path.join(path, "values.npy"), np.ascontiguousarray(np.asarray(values, dtype=np.float64).T))
+    np.save(os.path.join(path, "missing.npy"), np.ascontiguousarray(np.asarray(missing, dtype=bool).T))
+    np.save(os.path.join(path, "timestamps.npy"), np.ascontiguousarray(np.asarray(timestamps, dtype=np.int64).T))
+    meta = {
+        "format": TRACE_FORMAT,
+        "version": TRACE_VERSION,
+        "scenario_id": scenario_id,
+        "sensor_ids": list(SENSOR_IDS),
+        "n_rows": int(len(days)),
+        "source": source,
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+def import_csv(csv_path: str, trace_path: str, scenario_id: Optional[str] = None) -> TraceReader:
+    """One-off conversion of a wide CSV export into a trace directory."""
+    df = pd.read_csv(csv_path)
+    if "day" in df.columns:
+        day = df["day"].astype(np.int64)
+    elif "timestamp" in df.columns:
+        ts = pd.to_datetime(df["timestamp"])
+        day = ((ts - ts.min()).dt.days).astype(np.int64)
+    else:
+        raise ValueError(f"{csv_path}: needs a 'day' or 'timestamp' column")
+    absent = [s for s in SENSOR_IDS if s not in df.columns]
+    if absent:
+        raise ValueError(f"{csv_path}: missing sensor columns {absent}")
+
+    order = np.argsort(day.to_numpy(), kind="stable")
+    days = day.to_numpy()[order]
+    raw = df[list(SENSOR_IDS)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)[order]
+    missing = np.isnan(raw)
+    values = np.where(missing, 0.0, raw)
+    timestamps = np.repeat(days[:, None], len(SENSOR_IDS), axis=1)
+    for j, sid in enumerate(SENSOR_IDS):
+        col = f"{sid}_ts"
+        if col in df.columns:
+            reported = pd.to_numeric(df[col], errors="coerce").to_numpy()[order]
+            timestamps[:, j] = np.where(np.isnan(reported), days, reported).astype(np.int64)
+
+    name = scenario_id or "TRACE_" + os.path.splitext(os.path.basename(csv_path))[0]
+    write_trace(trace_path, name, days, values, missing, timestamps, source=os.path.basename(csv_path))
+    return TraceReader(trace_path)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="V3 Sensor Trace Tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="Convert a CSV export into a memory-mapped trace")
+    p_import.add_argument("csv_path")
+    p_import.add_argument("trace_path")
+    p_import.add_argument("--scenario-id", default=None)
+    p_info = sub.add_parser("info", help="Summarize a trace")
+    p_info.add_argument("trace_path")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        trace = import_csv(args.csv_path, args.trace_path, args.scenario_id)
+        print(f"Imported {len(trace)} rows into {args.trace_path}")
+    else:
+        trace = TraceReader(args.trace_path)
+    first, last = trace.day_range
+    print(f"Trace '{trace.scenario_id}': {len(trace)} rows, days {first}..{last}, "
+          f"missing={int(np.asarray(trace.missing).sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Shared test doubles for the LLM agent tests (pytest puts tests/ on sys.path,
+so test modules import this as `fakes`).
+"""
+import io
+import os
+from contextlib import redirect_stdout
+from unittest import mock
+from core.types import HostPayloadV1
+from clients.llm_agent import LlmAgent
+
+class FakeBreaker:
+    class state:
+        value = "CLOSED"
+
+class FakeClient:
+    """Stands in for ResilientChatClient: canned Ollama responses, keeps the messages it was sent."""
+    def __init__(self, content="ALERT\nRange violation on pH.", prompt_tokens=120, completion_tokens=9):
+        self.content = content
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.calls = 0
+        self.messages = []
+        self.breaker = FakeBreaker()
+
+    def chat(self, model, messages, options):
+        self.calls += 1
+        self.messages.append(messages)
+        return {"model": model, "message": {"role": "assistant", "content": self.content},
+                "prompt_eval_count": self.prompt_tokens, "eval_count": self.completion_tokens,
+                "prompt_eval_duration": 4_000_000, "eval_duration": 9_000_000, "load_duration": 1_000_000,
+                "done_reason": "stop"}
+
+    def model_digest(self, model):
+        return "sha256:fake"
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+def payload(day=1, ph=10.0, temp=32.0, ec=1.5, growth=0.5, score=1.0, mode="FULL_AUTONOMY", flags=()):
+    return HostPayloadV1(day=day, sensor_context={"ph": ph, "temp": temp, "ec": ec, "growth": growth},
+                         trust_context={"score": score, "mode": mode, "flags": list(flags)})
+
+def ollama_agent(cfg, client=None):
+    """LlmAgent on the ollama backend (quietly built), talking to `client` if given."""
+    with mock.patch.dict(os.environ, {"LLM_BACKEND": "ollama"}), redirect_stdout(io.StringIO()):
+        agent = LlmAgent(cfg, seed=0)
+    if client is not None:
+        agent.client = client
+    return agent
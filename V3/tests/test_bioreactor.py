@@ -0,0 +1,39 @@
+import unittest
+import numpy as np
+from core.config import load_config
+from simulation.generator import SeededGenerator
+
+class TestBioreactor(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+
+    def _produced(self, scenario_id, actions, days=20):
+        plant = SeededGenerator(self.cfg).closed_loop(scenario_id, days=days, n_reactors=len(actions))
+        for _ in range(days):
+            plant.observe()
+            plant.act(actions)
+        return np.array(plant.state()["produced"])
+
+    def test_actions_drive_yield(self):
+        # One batch, one reactor per action: control beats doing nothing on clean data
+        hold, safe, unrestricted = self._produced("S1", ["HOLD", "ACT_SAFE", "ACT_UNRESTRICTED"])
+        self.assertLess(hold, safe)
+        self.assertLess(safe, unrestricted)
+
+    def test_acting_on_faulty_readings_costs_yield(self):
+        # S3's drifting pH sensor makes aggressive dosing push the true pH out of range
+        safe, unrestricted = self._produced("S3", ["ACT_SAFE", "ACT_UNRESTRICTED"])
+        self.assertLess(unrestricted, safe)
+
+    def test_snapshot_loop(self):
+        plant = SeededGenerator(self.cfg).closed_loop("S4")
+        days = []
+        for snap in plant:
+            days.append(snap.day)
+            self.assertEqual(snap.readings["ec"].is_missing, snap.day in (3, 4))
+            plant.act("ACT_SAFE")
+        self.assertEqual(days, list(range(self.cfg.scenarios.duration_days)))
+        self.assertGreater(plant.state()["biomass"], self.cfg.scenarios.bioreactor.x0)
+
+if __name__ == '__main__':
+    unittest.main()
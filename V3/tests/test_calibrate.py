@@ -0,0 +1,52 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import pandas as pd
+from core.config import load_config
+from evaluation.calibrate import HAS_EXPERIMENTS, LabelSet, calibrate, write_config
+
+class TestCalibration(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+        self.cfg.calibration.population = 4
+
+    def _calibrate(self, **kw):
+        with redirect_stdout(io.StringIO()):
+            return calibrate(self.cfg, trials=8, workers=1, runs=20, days=10,
+                             scenario_ids=["S1", "S2", "S3"], **kw)
+
+    @unittest.skipUnless(HAS_EXPERIMENTS, "experiments package not available")
+    def test_labels_match_current_engine(self):
+        # The hand-tuned defaults reproduce the experiments ground truths
+        errors = LabelSet(["S1", "S2", "S3", "S4", "S5", "S6", "S7", "S8"]).errors(self.cfg)
+        self.assertEqual(errors, {"flag_error_rate": 0.0, "mode_error_rate": 0.0})
+
+    def test_search_is_seeded_and_starts_from_current(self):
+        df = self._calibrate(method="cem")
+        self.assertEqual(len(df), 9)
+        self.assertEqual(df["thresholds.z_score"][0], self.cfg.trust_engine.thresholds.z_score)
+        self.assertEqual(df["generation"].tolist(), [-1, 0, 0, 0, 0, 1, 1, 1, 1])
+        lo, hi = self.cfg.calibration.space["thresholds.cusum_h"]
+        self.assertTrue(df["thresholds.cusum_h"].between(lo, hi).all())
+        pd.testing.assert_frame_equal(df, self._calibrate(method="cem"))
+        self.assertFalse(df.equals(self._calibrate(method="cem", seed=1)))
+
+    def test_write_config_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "config.yaml")
+            write_config("config/config.yaml", {"z_score": 3.25, "penalties.drift_suspected": 0.41}, out, "calibrated")
+            cfg = load_config(out)
+            with open(out) as f:
+                text = f.read()
+            with self.assertRaises(ValueError):
+                write_config("config/config.yaml", {"thresholds.nope": 1.0}, os.path.join(tmp, "x.yaml"))
+        self.assertEqual(cfg.trust_engine.thresholds.z_score, 3.25)
+        self.assertEqual(cfg.trust_engine.penalties.drift_suspected, 0.41)
+        self.assertEqual(cfg.trust_engine.thresholds.cusum_h, self.cfg.trust_engine.thresholds.cusum_h)
+        self.assertTrue(text.startswith("# calibrated\n"))
+        self.assertIn("# null -> all CPUs", text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from core.config import load_config
+from clients.cassette import LlmCassette, CassetteMissError
+from fakes import FakeClient, payload, ollama_agent
+
+def flagged(day=3):
+    return payload(day=day, ph=12.0, growth=0.1, score=0.5, mode="SUGGEST_ONLY", flags=("range_violation",))
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "tape.jsonl")
+
+    def _agent(self, mode, client=None):
+        cfg = load_config("config/config.yaml")
+        cfg.deployment.cassette.mode = mode
+        cfg.deployment.cassette.path = self.path
+        return ollama_agent(cfg, client)
+
+    def test_record_then_replay(self):
+        client = FakeClient()
+        recorder = self._agent("record", client)
+        recorded = recorder.decide(flagged())
+        recorded_call = dict(recorder.last_call)
+        recorder.close()
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(recorder.cassette.recorded, 1)
+
+        player = self._agent("replay")
+        self.assertIsNone(player.client)
+        replayed = player.decide(flagged())
+        self.assertEqual(replayed.arguments, recorded.arguments)
+        self.assertEqual(replayed.arguments["action"], "ALERT")
+        self.assertEqual(player.cassette.hits, 1)
+        for k in ("model_digest", "prompt_tokens", "completion_tokens", "prompt_eval_ms", "eval_ms", "cache_hit"):
+            self.assertEqual(player.last_call[k], recorded_call[k])
+
+    def test_replay_miss_propagates(self):
+        recorder = self._agent("record", FakeClient())
+        recorder.decide(flagged(day=3))
+        recorder.close()
+        player = self._agent("replay")
+        # A different prompt (day 4) was never recorded: no silent HOLD fallback
+        with self.assertRaises(CassetteMissError):
+            player.decide(flagged(day=4))
+
+    def test_key_sensitivity(self):
+        messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": "state"}]
+        options = {"temperature": 0.0, "top_p": 1.0}
+        key = LlmCassette.key("m1", messages, options)
+        self.assertEqual(key, LlmCassette.key("m1", [dict(m) for m in messages], {"top_p": 1.0, "temperature": 0.0}))
+        self.assertNotEqual(key, LlmCassette.key("m2", messages, options))
+        self.assertNotEqual(key, LlmCassette.key("m1", messages[:1] + [{"role": "user", "content": "state!"}], options))
+        self.assertNotEqual(key, LlmCassette.key("m1", messages, {"temperature": 0.1, "top_p": 1.0}))
+
+    def test_last_record_wins(self):
+        tape = LlmCassette(self.path, "record")
+        tape.append("k", {"message": {"content": "HOLD"}, "eval_count": 1}, 5.0)
+        tape.append("k", {"message": {"content": "ALERT"}, "eval_count": 2}, 6.0)
+        tape.close()
+        rec = LlmCassette(self.path, "replay").lookup("k")
+        self.assertEqual(rec["r"]["message"]["content"], "ALERT")
+        self.assertEqual((rec["r"]["eval_count"], rec["ms"]), (2, 6.0))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            LlmCassette(self.path, "rewind")
+
+if __name__ == '__main__':
+    unittest.main()
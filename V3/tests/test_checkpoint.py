@@ -0,0 +1,94 @@
+import os
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import main
+from mcp_host import runner
+from core.config import load_config
+from core.columnar import HAS_PYARROW, read_log
+from core.checkpoint import checkpoint_path, load_checkpoint
+from clients.mock_agent import MockAgent
+
+
+class CrashingAgent(MockAgent):
+    """Mock agent that raises on its n-th decision (simulated crash mid-run)."""
+    crash_at = None
+
+    def __init__(self, seed):
+        super().__init__(seed)
+        self.calls = 0
+
+    def decide(self, payload):
+        self.calls += 1
+        if self.calls == CrashingAgent.crash_at:
+            raise RuntimeError("simulated crash")
+        return super().decide(payload)
+
+
+class TestResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        os.environ["LLM_BACKEND"] = "mock"
+        self.addCleanup(os.environ.pop, "LLM_BACKEND", None)
+
+    def _run(self, subdir, crash_at=None, resume=False, **overrides):
+        cfg = load_config("config/config.yaml")
+        cfg.project.output_dir = os.path.join(self.tmp.name, subdir)
+        cfg.scenarios.active_scenarios = ["S1", "S3", "S4"]
+        cfg.scenarios.duration_days = 10
+        cfg.logging.run_id = "run"
+        for section, values in overrides.items():
+            for k, v in values.items():
+                setattr(getattr(cfg, section), k, v)
+        CrashingAgent.crash_at = crash_at
+        with mock.patch.object(main, "load_config", return_value=cfg), \
+             mock.patch.object(runner, "MockAgent", CrashingAgent), redirect_stdout(io.StringIO()) as out:
+            main.main(["--resume"] if resume else [])
+        return cfg, out.getvalue()
+
+    def _log(self, cfg):
+        if cfg.logging.format == "parquet":
+            return read_log(os.path.join(cfg.project.output_dir, "experiment_log.parquet", "run=run")).to_csv()
+        with open(os.path.join(cfg.project.output_dir, "experiment_log.csv")) as f:
+            return f.read()
+
+    def _check(self, crash_at, **overrides):
+        ref, _ = self._run("ref", **overrides)
+        cfg, out = self._run("crash", crash_at=crash_at, **overrides)
+        self.assertIn("simulated crash", out)
+        state = load_checkpoint(checkpoint_path(cfg), cfg)
+        self.assertIsNotNone(state)
+        _, out = self._run("crash", resume=True, **overrides)
+        self.assertIn("Resuming run run", out)
+        self.assertEqual(self._log(cfg), self._log(ref))
+        self.assertIsNone(load_checkpoint(checkpoint_path(cfg), cfg))
+        return state
+
+    def test_resume_mid_scenario_matches_uninterrupted_run(self):
+        state = self._check(crash_at=15)
+        # Crashed on the 5th day of the second scenario
+        self.assertEqual((state["scenario_id"], state["step"]), ("S3", 4))
+
+    def test_resume_buffered_log(self):
+        state = self._check(crash_at=23, logging={"mode": "buffered", "flush_rows": 4})
+        self.assertEqual(state["log"]["rows"], 20)
+
+    def test_resume_closed_loop(self):
+        self._check(crash_at=17, scenarios={"process_model": "bioreactor"})
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_resume_parquet_log(self):
+        self._check(crash_at=12, logging={"format": "parquet", "flush_rows": 5})
+
+    def test_resume_requires_same_config(self):
+        self._run("crash", crash_at=5)
+        cfg = load_config("config/config.yaml")
+        cfg.project.output_dir = os.path.join(self.tmp.name, "crash")
+        with self.assertRaises(ValueError):
+            load_checkpoint(checkpoint_path(cfg), cfg)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from core.config import load_config
+from core.context_codec import CompactContextEncoder, LEGEND
+from fakes import FakeClient, payload, ollama_agent
+
+class TestCompactContextEncoder(unittest.TestCase):
+    def test_encode(self):
+        line = CompactContextEncoder().encode(payload(4, temp=32.04, flags=("drift_suspected",), score=0.8))
+        self.assertEqual(line, "c1 d=4 trust=0.80 mode=FULL_AUTONOMY flags=drift_suspected "
+                               "pH=10 T=32 EC=1.5 G=0.5")
+
+    def test_missing_and_no_flags(self):
+        line = CompactContextEncoder().encode(payload(0, ec="MISSING"))
+        self.assertIn("flags=-", line)
+        self.assertIn("EC=NA", line)
+
+    def test_delta_against_previous_day(self):
+        enc = CompactContextEncoder()
+        enc.encode(payload(3, ph=10.1, temp=32.2, ec="MISSING"))
+        line = enc.encode(payload(4, ph=10.14, temp=31.7, ec=1.49))
+        # Deltas at sensor resolution; none for a value missing the day before
+        self.assertTrue(line.endswith("pH=10.14(+0.04) T=31.7(-0.5) EC=1.49 G=0.5(0)"), line)
+
+    def test_reset_on_scenario_change(self):
+        enc = CompactContextEncoder()
+        enc.encode(payload(6, ph=10.2))
+        # Day counter restarts with the next scenario: no deltas against the old one
+        self.assertNotIn("(", enc.encode(payload(0, ph=10.0)))
+        enc.encode(payload(1, ph=10.1))
+        enc.reset()
+        self.assertNotIn("(", enc.encode(payload(2, ph=10.3)))
+
+    def test_schema_version_checked(self):
+        p = payload(0)
+        p.schema_version = "v2"
+        with self.assertRaises(ValueError):
+            CompactContextEncoder().encode(p)
+
+    def test_agent_prompt(self):
+        cfg = load_config("config/config.yaml")
+        cfg.deployment.context_encoding = "compact"
+        client = FakeClient()
+        agent = ollama_agent(cfg, client)
+        days = [payload(0, ph=10.1), payload(1, ph=10.12, flags=("drift_suspected",), score=0.8)]
+        for p in days:
+            agent.decide(p)
+        expected = CompactContextEncoder()
+        for p, (system, user) in zip(days, client.messages):
+            self.assertIn(LEGEND, system["content"])
+            self.assertEqual(user["content"], f"CURRENT STATE: {expected.encode(p)}\nDecide the best action.\n")
+        self.assertIn("pH=10.12(+0.02)", client.messages[1][1]["content"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from core.config import load_config
+from evaluation.detection import DetectionAnalyzer, detection_arrays
+
+class TestDetectionMetrics(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+
+    def test_detection_arrays(self):
+        # onset 2, clear 5, horizon 8
+        fired = np.array([
+            [0, 1, 0, 1, 1, 1, 0, 0],  # FP on day 1, detected day 3, recovers day 6
+            [0, 0, 0, 0, 0, 0, 1, 0],  # never detected inside the window, FP on day 6
+            [0, 0, 1, 1, 1, 1, 1, 1],  # detected at onset, never recovers
+        ], dtype=bool)
+        a = detection_arrays(fired, 2, 5)
+        np.testing.assert_array_equal(a["ttd"], [1, np.nan, 0])
+        np.testing.assert_array_equal(a["ttr"], [1, np.nan, np.nan])
+        np.testing.assert_array_equal(a["fp"], [1, 1, 0])
+        # nominal: before onset, and from the recovery day (clear if undetected, horizon if never)
+        np.testing.assert_array_equal(a["nominal"], [4, 5, 2])
+
+    def test_simulated_report(self):
+        analyzer = DetectionAnalyzer(self.cfg)
+        for sc in ("S1", "S2", "S4"):
+            analyzer.simulate(sc, runs=200, days=10)
+        report = analyzer.report()
+        s2 = report["by_scenario"]["S2"]["detectors"]
+        self.assertEqual(s2["range_violation"]["detection_rate"], 1.0)
+        self.assertEqual(s2["range_violation"]["time_to_detection"]["max"], 0.0)
+        s4 = report["by_scenario"]["S4"]["detectors"]
+        self.assertEqual(s4["stale_data"]["time_to_detection"]["p50"], 1.0)
+        self.assertEqual(s4["stale_data"]["recovery_rate"], 1.0)
+        clean = report["by_fault_type"]["none"]["detectors"]
+        self.assertIsNone(clean["stale_data"]["detection_rate"])
+        self.assertEqual(clean["stale_data"]["false_positive_rate"], 0.0)
+
+    def _log_report(self, days):
+        rows = [{"scenario_id": "S4", "day": d, "mode": "SUGGEST_ONLY" if d == 4 else "FULL_AUTONOMY",
+                 "flags": "stale_data" if d == 4 else ""} for d in days]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "experiment_log.csv")
+            pd.DataFrame(rows).to_csv(path, index=False)
+            analyzer = DetectionAnalyzer(self.cfg)
+            analyzer.add_log(path)
+        return analyzer.report()["by_scenario"]["S4"]
+
+    def test_log_runs(self):
+        d = self._log_report(range(7))["detectors"]
+        self.assertEqual(d["stale_data"]["time_to_detection"]["mean"], 1.0)
+        self.assertEqual(d["degraded_mode"]["time_to_recovery"]["mean"], 0.0)
+        self.assertEqual(d["degraded_mode"]["false_positive_rate"], 0.0)
+
+    def test_log_window_keeps_absolute_days(self):
+        # A trace_days-style window starting at day 2 (S4: onset 3, clear 5)
+        window = self._log_report(range(2, 7))
+        self.assertEqual((window["onset"], window["clear"]), (3, 5))
+        self.assertEqual(window["detectors"], self._log_report(range(7))["detectors"])
+
+if __name__ == '__main__':
+    unittest.main()
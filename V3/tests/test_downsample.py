@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+import pandas as pd
+from evaluation.downsample import lttb, minmax, envelope
+
+class TestDownsample(unittest.TestCase):
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x = np.arange(10_000, dtype=float)
+        y = np.sin(x / 500.0)
+        y[4321] = 50.0  # a single spike must survive the reduction
+        idx = lttb(x, y, 200)
+        self.assertEqual(len(idx), 200)
+        self.assertEqual((idx[0], idx[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertIn(4321, idx)
+
+    def test_lttb_short_series_untouched(self):
+        np.testing.assert_array_equal(lttb(np.arange(5), np.arange(5), 10), np.arange(5))
+        with self.assertRaises(ValueError):
+            lttb(np.arange(5), np.arange(5), 2)
+
+    def test_minmax_preserves_extremes(self):
+        rng = np.random.default_rng(3)
+        lo = rng.normal(size=1001)
+        hi = lo + 1.0
+        centers, bmin, bmax = minmax(np.arange(1001), lo, hi, 10)
+        self.assertEqual(len(centers), 10)
+        self.assertEqual(bmin.min(), lo.min())
+        self.assertEqual(bmax.max(), hi.max())
+
+    def test_envelope_quantiles(self):
+        df = pd.DataFrame({
+            "scenario_id": ["S1"] * 202 + ["S2"] * 3,
+            "day": [0] * 101 + [1] * 101 + [0] * 3,
+            "trust_score": list(np.linspace(0, 1, 101)) * 2 + [0.2, 0.4, 0.9],
+        })
+        env = envelope(df)
+        self.assertEqual(list(env.columns), ["scenario_id", "day", "n", "median", "q05", "q25", "q75", "q95"])
+        s1 = env[(env["scenario_id"] == "S1") & (env["day"] == 0)].iloc[0]
+        self.assertEqual(s1["n"], 101)
+        self.assertAlmostEqual(s1["median"], 0.5)
+        self.assertAlmostEqual(s1["q05"], 0.05)
+        self.assertAlmostEqual(s1["q95"], 0.95)
+        self.assertAlmostEqual(env[env["scenario_id"] == "S2"].iloc[0]["median"], 0.4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from core.config import load_config
+from core.flags import flags_to_mask, mask_to_flags, parse_flags
+from simulation.fuzzer import FaultFuzzer
+from trust_engine.batch import policy_table, MODE_CODES, ACT_UNRESTRICTED
+
+class TestFuzzer(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+        self.cfg.fuzz.batch_size = 64
+
+    def test_batch_engine_matches_host(self):
+        # Every case is replayed through SpirulinaMCP_V3 and compared step by step
+        self.cfg.fuzz.cross_check_every = 1
+        report = FaultFuzzer(self.cfg, seed=7).run(cases=150, days=12)
+        self.assertEqual(report["cross_checked"], 150)
+        self.assertEqual(report["violations"], {k: 0 for k in report["violations"]})
+
+    def test_broken_gate_is_caught_and_shrunk(self):
+        table = policy_table()
+        table[MODE_CODES["SAFE_ONLY"], ACT_UNRESTRICTED] = True
+        self.cfg.fuzz.cross_check_every = 0
+        report = FaultFuzzer(self.cfg, seed=7, table=table).run(cases=500, days=15)
+        self.assertGreater(report["violations"]["unrestricted_outside_full"], 0)
+        case = report["failures"][0]
+        self.assertEqual(case["proposals"][-1], "ACT_UNRESTRICTED")
+        self.assertTrue(all(p == "HOLD" for p in case["proposals"][:-1]))
+        self.assertLessEqual(len(case["faults"]), 2)
+
+    def test_flag_masks(self):
+        mask = flags_to_mask({"stale_data": True, "drift_suspected": True, "range_violation": False})
+        self.assertEqual(mask_to_flags(mask), ["drift_suspected", "stale_data"])
+        self.assertEqual(parse_flags("stale_data|drift_suspected"), mask)
+        self.assertEqual(parse_flags(""), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from core.config import load_config
+from core.types import DailySensorSnapshot
+from simulation.generator import SeededGenerator
+from simulation.faults import FaultCatalog, FaultSpec
+
+class TestSeededGenerator(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+
+    def test_lazy_snapshots(self):
+        sc = SeededGenerator(self.cfg).generate_scenario("S2")
+        self.assertEqual(len(sc), self.cfg.scenarios.duration_days)
+        snap = sc[3]
+        self.assertIsInstance(snap, DailySensorSnapshot)
+        self.assertEqual(snap.day, 3)
+        self.assertEqual(snap.readings["ph"].value, 12.0)
+        self.assertEqual([s.day for s in sc], list(range(len(sc))))
+
+    def test_fault_columns(self):
+        gen = SeededGenerator(self.cfg)
+        s4 = gen.generate_scenario("S4")
+        self.assertTrue(s4[3].readings["ec"].is_missing)
+        self.assertTrue(s4[4].readings["ec"].is_missing)
+        self.assertFalse(s4[5].readings["ec"].is_missing)
+        s6 = gen.generate_scenario("S6")
+        self.assertEqual(s6[4].readings["ph"].timestamp_day, 2)
+
+    def test_reactor_batch(self):
+        batch = SeededGenerator(self.cfg).generate_arrays("S7", days=30, n_reactors=16)
+        self.assertEqual(batch.values.shape, (16, 30, 4))
+        self.assertEqual(batch.n_reactors, 16)
+        np.testing.assert_array_equal(batch.values[:, 2:, 0], 10.2)
+        one = batch.reactor(5)
+        self.assertTrue(np.shares_memory(one.values, batch.values))
+        self.assertEqual(one[10].readings["ph"].value, 10.2)
+
+    def test_stream_matches_eager(self):
+        eager, streamed = SeededGenerator(self.cfg), SeededGenerator(self.cfg)
+        for sc in ["S3", "S8", "S1"]:
+            full = eager.generate_arrays(sc, days=50, n_reactors=2)
+            blocks = list(streamed.stream_arrays(sc, days=50, n_reactors=2, block_days=16))
+            self.assertEqual([len(b) for b in blocks], [16, 16, 16, 2])
+            np.testing.assert_array_equal(np.concatenate([b.values for b in blocks], axis=-2), full.values)
+            np.testing.assert_array_equal(np.concatenate([b.missing for b in blocks], axis=-2), full.missing)
+        # Shared RNG ends in the same state, so the next scenario matches too
+        self.assertEqual(eager.generate_scenario("S2")[6], list(streamed.stream_scenario("S2", block_days=3))[6])
+
+class TestFaultSpec(unittest.TestCase):
+    def test_relative_faults(self):
+        catalog = FaultCatalog.from_dict({"X": [
+            {"type": "spike", "sensor": "temp", "onset": 2, "magnitude": 5.0},
+            {"type": "drift", "sensor": "ph", "onset": 1, "rate": -0.1, "magnitude": 0.25},
+            {"type": "timestamp_skew", "sensor": "ec", "onset": 3, "offset": 1},
+        ]})
+        days = np.arange(6)
+        values = np.ones((6, 4))
+        missing = np.zeros((6, 4), dtype=bool)
+        ts = np.repeat(days[:, None], 4, axis=1)
+        catalog["X"].apply(days, values, missing, ts)
+        np.testing.assert_allclose(values[:, 1], [1, 1, 6, 1, 1, 1])
+        np.testing.assert_allclose(values[:, 0], [1, 0.9, 0.8, 0.75, 0.75, 0.75])
+        np.testing.assert_array_equal(ts[:, 2], [0, 1, 2, 4, 5, 6])
+        self.assertFalse(missing.any())
+
+    def test_validation(self):
+        with self.assertRaises(ValueError):
+            FaultSpec(type="dropout", sensor="do2", onset=1)
+        with self.assertRaises(ValueError):
+            FaultCatalog.from_dict({})["S9"]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+from core.config import load_config
+from clients.llm_agent import LlmAgent
+from evaluation.streaming import StreamingMetrics
+
+# Canned Ollama chat response (durations in nanoseconds)
+RESPONSE = {
+    "model": "llama3.1:8b",
+    "message": {"role": "assistant", "content": "HOLD\nDrift suspected."},
+    "prompt_eval_count": 212,
+    "eval_count": 14,
+    "prompt_eval_duration": 35_500_000,
+    "eval_duration": 140_250_000,
+    "load_duration": 2_000_000,
+}
+
+class TestResponseTelemetry(unittest.TestCase):
+    def setUp(self):
+        os.environ["LLM_BACKEND"] = "mock"
+        self.addCleanup(os.environ.pop, "LLM_BACKEND", None)
+        with redirect_stdout(io.StringIO()):
+            self.agent = LlmAgent(load_config("config/config.yaml"), seed=0)
+
+    def test_canned_response(self):
+        t = self.agent._response_telemetry(RESPONSE, 0.2004567, "sha256:abc")
+        self.assertEqual(t, {
+            "breaker_state": "", "model_digest": "sha256:abc", "latency_ms": 200.457,
+            "prompt_tokens": 212, "completion_tokens": 14, "prompt_eval_ms": 35.5,
+            "eval_ms": 140.25, "load_ms": 2.0, "cache_hit": False,
+        })
+
+    def test_cache_hit_needs_reported_zero(self):
+        cached = dict(RESPONSE, prompt_eval_count=0)
+        self.assertIs(self.agent._response_telemetry(cached, 0.1, "")["cache_hit"], True)
+        # Backends / errors that do not report the field are not cache hits
+        bare = {"message": {"content": "HOLD"}}
+        t = self.agent._response_telemetry(bare, 0.1, "")
+        self.assertIsNone(t["cache_hit"])
+        self.assertIsNone(t["prompt_tokens"])
+        self.assertIsNone(t["prompt_eval_ms"])
+
+        metrics = StreamingMetrics()
+        for response in (RESPONSE, cached, bare, bare):
+            metrics.update("S1", "FULL_AUTONOMY", "HOLD", "HOLD",
+                           telemetry=self.agent._response_telemetry(response, 0.1, ""))
+        self.assertEqual(metrics.compute()["cache_hit_rate"], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
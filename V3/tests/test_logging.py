@@ -0,0 +1,129 @@
+import os
+import time
+import queue
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from core.config import load_config
+from core.logging import ExperimentLogger
+from core.columnar import read_log, HAS_PYARROW
+from core.flags import FLAG_BITS
+from evaluation.metrics import MetricsCalculator
+
+class RacyQueue(queue.Queue):
+    """Queue whose first get() runs `hook` and then times out (producer acts in the writer's gap)."""
+    hook = None
+
+    def get(self, block=True, timeout=None):
+        hook, RacyQueue.hook = RacyQueue.hook, None
+        if hook is not None:
+            hook()
+            raise queue.Empty
+        return super().get(block, timeout)
+
+class TestExperimentLogger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cfg = load_config("config/config.yaml")
+        self.cfg.logging.flush_rows = 7
+
+    def _log(self, logger, i):
+        logger.log_result(scenario_id="S1", day=i, trust_score=1.0, mode="FULL_AUTONOMY", flags="",
+                          proposed_action="HOLD", executed_action="HOLD", status="SUCCESS", override=False)
+
+    def _log_mixed(self, logger, i):
+        # Two scenarios, some flags and unsafe executions
+        unsafe = i % 5 == 0
+        logger.log_result(scenario_id=f"S{1 + i // 20}", day=i % 20, trust_score=0.25 * (i % 4), mode="SAFE_ONLY",
+                          flags="stale_data|drift_suspected" if i % 3 == 0 else "",
+                          proposed_action="ACT_UNRESTRICTED" if unsafe else "HOLD",
+                          executed_action="ACT_UNRESTRICTED" if unsafe else "HOLD",
+                          status="SUCCESS", override=i % 7 == 0)
+
+    def _write(self, mode, rows, subdir, fmt="csv", log=None):
+        cfg = self.cfg.model_copy(deep=True)
+        cfg.logging.mode = mode
+        cfg.logging.format = fmt
+        cfg.logging.run_id = "test"
+        cfg.project.output_dir = os.path.join(self.tmp.name, subdir)
+        with ExperimentLogger(cfg) as logger:
+            for i in range(rows):
+                (log or self._log)(logger, i)
+        if fmt != "csv":
+            return logger.log_path
+        with open(logger.log_path) as f:
+            return f.read()
+
+    def test_buffered_matches_sync(self):
+        self.assertEqual(self._write("buffered", 100, "b"), self._write("sync", 100, "s"))
+
+    def test_interval_flush_and_crash_drain(self):
+        self.cfg.logging.mode = "buffered"
+        self.cfg.logging.flush_interval_s = 0.05
+        self.cfg.project.output_dir = self.tmp.name
+        with self.assertRaises(ZeroDivisionError):
+            with ExperimentLogger(self.cfg) as logger:
+                for i in range(3):
+                    self._log(logger, i)
+                time.sleep(0.3)
+                # Below flush_rows, but the interval has passed
+                with open(logger.log_path) as f:
+                    self.assertEqual(len(f.readlines()), 4)
+                for i in range(3, 10):
+                    self._log(logger, i)
+                1 / 0
+        with open(logger.log_path) as f:
+            self.assertEqual(len(f.readlines()), 11)
+
+    def test_interval_pickup_keeps_row_order(self):
+        self.cfg.logging.mode = "buffered"
+        self.cfg.logging.flush_rows = 3
+        self.cfg.logging.flush_interval_s = 0.05
+        self.cfg.project.output_dir = self.tmp.name
+        logger = ExperimentLogger(self.cfg)
+        done = threading.Event()
+
+        def producer():
+            # Writer timed out; meanwhile a full block is queued and new rows are pending
+            for i in range(5):
+                self._log(logger, i)
+            done.set()
+
+        RacyQueue.hook = producer
+        with mock.patch("core.logging.queue.Queue", RacyQueue), logger:
+            self.assertTrue(done.wait(5))
+        with open(logger.log_path) as f:
+            days = [line.split(",")[1] for line in f.readlines()[1:]]
+        self.assertEqual(days, ["0", "1", "2", "3", "4"])
+
+    def test_read_log_projects_columns(self):
+        self._write("sync", 40, "c", log=self._log_mixed)
+        df = read_log(os.path.join(self.tmp.name, "c", "experiment_log.csv"), ["scenario_id", "flags_mask", "nope"])
+        self.assertEqual(list(df.columns), ["scenario_id", "flags_mask"])
+        self.assertEqual(int(df["flags_mask"][3]), FLAG_BITS["stale_data"] | FLAG_BITS["drift_suspected"])
+        self.assertEqual(int(df["flags_mask"][1]), 0)
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_parquet_matches_csv(self):
+        self._write("sync", 40, "c", log=self._log_mixed)
+        for mode in ("sync", "buffered"):
+            run_dir = self._write(mode, 40, mode, fmt="parquet", log=self._log_mixed)
+            self.assertTrue(os.path.isdir(os.path.join(run_dir, "scenario_id=S2")))
+            csv_metrics = MetricsCalculator(os.path.join(self.tmp.name, "c", "experiment_log.csv")).compute()
+            self.assertEqual(MetricsCalculator(run_dir).compute(), csv_metrics)
+
+            df = read_log(run_dir, ["day", "trust_score", "flags"])
+            self.assertEqual(list(df.columns), ["day", "trust_score", "flags"])
+            self.assertEqual(str(df["trust_score"].dtype), "float32")
+            self.assertEqual(list(df["day"][:3]), [0, 1, 2])
+            self.assertEqual(df["flags"][3], "drift_suspected|stale_data")
+
+    @unittest.skipIf(HAS_PYARROW, "pyarrow installed")
+    def test_parquet_requires_pyarrow(self):
+        with self.assertRaises(ImportError):
+            self._write("sync", 1, "p", fmt="parquet")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from core.config import load_config
+from simulation.montecarlo import MonteCarloRunner, replicate_seeds, scenario_seed
+
+class TestMonteCarlo(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+        self.cfg.montecarlo.batch_size = 3
+
+    def test_replicates_independent_of_run_composition(self):
+        runner = MonteCarloRunner(self.cfg)
+        both = runner.run(["S3", "S8"], 6, workers=1)
+        alone = runner.run(["S8"], 4, workers=1)
+        s8 = both[both.scenario_id == "S8"].head(4).reset_index(drop=True)
+        self.assertTrue(s8.equals(alone))
+
+    def test_replicate_seeds_match_spawn(self):
+        spawned = scenario_seed(42, "S3").spawn(12)[5:]
+        direct = replicate_seeds(42, "S3", 5, 12)
+        self.assertEqual([s.generate_state(4).tolist() for s in direct],
+                         [s.generate_state(4).tolist() for s in spawned])
+
+    def test_summary_intervals(self):
+        runner = MonteCarloRunner(self.cfg)
+        summary = runner.summarize(runner.run(["S2", "S7"], 5, workers=2))
+        self.assertEqual(summary["ALL"]["replicates"], 10)
+        for s in summary.values():
+            pr = s["pass_rate"]
+            self.assertLessEqual(pr["ci_low"], pr["mean"])
+            self.assertLessEqual(pr["mean"], pr["ci_high"])
+        self.assertAlmostEqual(summary["S7"]["override_rate"]["mean"], 5 / 7, places=4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import time
+import threading
+import unittest
+from clients.resilience import CircuitBreaker, BreakerState
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_trips_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_s=60.0)
+        for _ in range(2):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        self.assertFalse(breaker.allow_request())
+        self.assertEqual(breaker.short_circuits, 1)
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_s=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, BreakerState.HALF_OPEN)
+        # Failed probe re-opens immediately
+        breaker.record_failure()
+        self.assertEqual(breaker.state, BreakerState.OPEN)
+        time.sleep(0.02)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_success()
+        self.assertEqual(breaker.state, BreakerState.CLOSED)
+        self.assertEqual(breaker.trips, 2)
+
+    def test_half_open_admits_one_probe(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_s=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        allowed = []
+        threads = [threading.Thread(target=lambda: allowed.append(breaker.allow_request())) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # One probe; everyone else is short-circuited while it is outstanding
+        self.assertEqual(sorted(allowed), [False] * 7 + [True])
+        self.assertEqual(breaker.state, BreakerState.HALF_OPEN)
+        self.assertEqual(breaker.short_circuits, 7)
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success()
+        self.assertTrue(breaker.allow_request())
+        self.assertTrue(breaker.allow_request())
+
+if __name__ == '__main__':
+    unittest.main()
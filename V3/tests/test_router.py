@@ -0,0 +1,78 @@
+import unittest
+from core.config import RoutingConfig, load_config
+from core.types import ActionType, AutonomyMode, TrustAssessment
+from policy.strict_policy import StrictPolicy
+from clients.router import ModelRouter, ROUTE_DEFAULT, ROUTE_NOMINAL, ROUTE_RULE, ROUTE_ESCALATED
+from evaluation.streaming import StreamingMetrics
+from fakes import FakeClient, payload, ollama_agent
+
+class TestModelRouter(unittest.TestCase):
+    def _router(self, **overrides):
+        return ModelRouter(RoutingConfig(enabled=True, **overrides), "big")
+
+    def test_disabled_uses_configured_model(self):
+        router = ModelRouter(RoutingConfig(), "big")
+        r = router.route(1.0, "FULL_AUTONOMY", [])
+        self.assertEqual((r.name, r.model), (ROUTE_DEFAULT, "big"))
+
+    def test_nominal_and_escalated_states(self):
+        router = self._router()
+        cases = [
+            ((0.95, "FULL_AUTONOMY", []), (ROUTE_NOMINAL, "llama3.2:3b")),
+            ((0.8, "FULL_AUTONOMY", []), (ROUTE_NOMINAL, "llama3.2:3b")),  # boundary is inclusive
+            ((0.79, "FULL_AUTONOMY", []), (ROUTE_ESCALATED, "big")),  # low trust
+            ((0.95, "SAFE_ONLY", []), (ROUTE_ESCALATED, "big")),  # non-nominal mode
+            ((0.95, "FULL_AUTONOMY", ["drift_suspected"]), (ROUTE_ESCALATED, "big")),  # any flag
+        ]
+        for args, expected in cases:
+            r = router.route(*args)
+            self.assertEqual((r.name, r.model), expected, args)
+
+    def test_escalate_flags_and_rule_route(self):
+        router = self._router(escalate_flags=["range_violation"], nominal_route="rule")
+        r = router.route(0.9, "FULL_AUTONOMY", ["drift_suspected"])
+        self.assertEqual((r.name, r.model), (ROUTE_RULE, None))
+        self.assertEqual(router.route(0.9, "FULL_AUTONOMY", ["range_violation"]).name, ROUTE_ESCALATED)
+        self.assertEqual(router.rule_decision("FULL_AUTONOMY")["action"], "ACT_UNRESTRICTED")
+        self.assertEqual(router.counts, {ROUTE_RULE: 1, ROUTE_ESCALATED: 1})
+
+    def test_rule_decision_respects_mode(self):
+        policy = StrictPolicy()
+        for mode in AutonomyMode:
+            action = ModelRouter.rule_decision(mode.value)["action"]
+            assessment = TrustAssessment(day=1, trust_score=0.9, autonomy_mode=mode, flags={})
+            self.assertTrue(policy.check_compliance(ActionType(action), assessment), mode)
+        self.assertEqual(ModelRouter.rule_decision("SAFE_ONLY")["action"], "ACT_SAFE")
+
+    def test_rule_route_skips_llm(self):
+        cfg = load_config("config/config.yaml")
+        cfg.deployment.routing.enabled = True
+        cfg.deployment.routing.nominal_route = "rule"
+        cfg.deployment.routing.nominal_modes = ["FULL_AUTONOMY", "SAFE_ONLY"]
+        client = FakeClient(content="ALERT\nRange violation.")
+        agent = ollama_agent(cfg, client)
+        self.assertEqual(agent.decide(payload(score=1.0, mode="FULL_AUTONOMY")).arguments["action"], "ACT_UNRESTRICTED")
+        self.assertEqual((agent.last_call["route"], agent.last_call["prompt_tokens"]), (ROUTE_RULE, 0))
+        self.assertEqual(agent.decide(payload(score=0.9, mode="SAFE_ONLY")).arguments["action"], "ACT_SAFE")
+        self.assertEqual(client.calls, 0)
+        agent.decide(payload(score=0.5, mode="SUGGEST_ONLY", flags=["range_violation"]))
+        self.assertEqual((agent.last_call["route"], agent.last_call["routed_model"]), (ROUTE_ESCALATED, agent.model))
+        self.assertEqual(client.calls, 1)
+        self.assertEqual(agent.client_stats()["route_counts"], {ROUTE_RULE: 2, ROUTE_ESCALATED: 1})
+
+    def test_route_savings(self):
+        metrics = StreamingMetrics()
+        steps = [("escalated", 400.0, 100, 20), ("escalated", 600.0, 140, 20),
+                 ("nominal", 100.0, 40, 10), ("rule", 0.0, 0, 0), ("rule", 0.0, 0, 0)]
+        for route, latency, prompt, completion in steps:
+            metrics.update("S1", "FULL_AUTONOMY", "HOLD", "HOLD", telemetry={
+                "route": route, "latency_ms": latency, "prompt_tokens": prompt, "completion_tokens": completion})
+        stats = metrics.compute()["route_stats"]
+        # Large-model mean: 500 ms, 140 tokens per decision
+        self.assertEqual(stats["escalated"]["latency_saved_ms"], 0.0)
+        self.assertEqual(stats["nominal"], {"steps": 1, "mean_latency_ms": 100.0, "mean_tokens": 50.0,
+                                            "latency_saved_ms": 400.0, "tokens_saved": 90.0})
+        self.assertEqual((stats["rule"]["latency_saved_ms"], stats["rule"]["tokens_saved"]), (1000.0, 280.0))
+
+if __name__ == '__main__':
+    unittest.main()
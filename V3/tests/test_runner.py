@@ -0,0 +1,88 @@
+import os
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import pandas as pd
+import main
+from core.config import load_config
+from core.columnar import HAS_PYARROW, read_log
+from mcp_host.runner import run_parallel
+from mcp_host.server import SpirulinaMCP_V3
+from evaluation.metrics import MetricsCalculator
+from simulation.generator import SeededGenerator
+
+class TestParallelRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        os.environ["LLM_BACKEND"] = "mock"
+        self.addCleanup(os.environ.pop, "LLM_BACKEND", None)
+
+    def _run(self, subdir, workers, scenarios=("S3", "S4", "S1", "S8"), fmt="csv"):
+        cfg = load_config("config/config.yaml")
+        cfg.project.output_dir = os.path.join(self.tmp.name, subdir)
+        cfg.scenarios.active_scenarios = list(scenarios)
+        cfg.scenarios.duration_days = 12
+        cfg.logging.format = fmt
+        cfg.logging.run_id = "run"
+        with redirect_stdout(io.StringIO()):
+            log_path, run_id, metrics = run_parallel(cfg, workers)
+        self.assertFalse(any(d.startswith(".parts") for d in os.listdir(cfg.project.output_dir)))
+        return log_path, metrics
+
+    def test_workers_with_resume_fall_back_to_serial_loop(self):
+        cfg = load_config("config/config.yaml")
+        cfg.project.output_dir = self.tmp.name
+        cfg.scenarios.active_scenarios = ["S1", "S2"]
+        cfg.scenarios.duration_days = 5
+        with mock.patch.object(main, "load_config", return_value=cfg), redirect_stdout(io.StringIO()) as out:
+            main.main(["--workers", "2", "--resume"])
+        self.assertIn("use the serial loop", out.getvalue())
+        self.assertIn("Done.", out.getvalue())
+        self.assertEqual(MetricsCalculator(os.path.join(self.tmp.name, "experiment_log.csv")).compute()["total_steps"], 10)
+
+    def test_workers_do_not_change_results(self):
+        serial_path, serial_metrics = self._run("w1", 1)
+        parallel_path, parallel_metrics = self._run("w3", 3)
+        with open(serial_path) as a, open(parallel_path) as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(parallel_metrics.compute(), serial_metrics.compute())
+        self.assertEqual(parallel_metrics.compute(), MetricsCalculator(parallel_path).compute())
+
+        df = pd.read_csv(parallel_path)
+        # Serial row order: scenarios in active_scenarios order, days ascending
+        self.assertEqual(list(df["scenario_id"].unique()), ["S3", "S4", "S1", "S8"])
+        self.assertEqual(list(df["day"][:12]), list(range(12)))
+
+    def test_scenarios_are_isolated(self):
+        # S4 does not depend on which scenarios ran before it (no leaked engine state or draws)
+        together, _ = self._run("all", 2)
+        alone, _ = self._run("alone", 1, scenarios=("S4",))
+        df = pd.read_csv(together)
+        s4 = df[df["scenario_id"] == "S4"].reset_index(drop=True)
+        pd.testing.assert_frame_equal(s4, pd.read_csv(alone))
+
+    @unittest.skipUnless(HAS_PYARROW, "pyarrow not installed")
+    def test_parquet_merge_keeps_serial_order(self):
+        csv_path, _ = self._run("csv", 1)
+        run_dir, _ = self._run("pq", 3, fmt="parquet")
+        df = read_log(run_dir, ["step", "scenario_id", "day", "executed_action", "flags"])
+        self.assertEqual(list(df["step"]), list(range(48)))
+        ref = pd.read_csv(csv_path, keep_default_na=False)
+        self.assertEqual(list(df["scenario_id"].astype(str)), list(ref["scenario_id"]))
+        self.assertEqual(list(df["flags"]), list(ref["flags"]))
+
+    def test_host_reset_clears_engine_state(self):
+        cfg = load_config("config/config.yaml")
+        host = SpirulinaMCP_V3(cfg)
+        for snap in SeededGenerator(cfg).generate_scenario("S3"):
+            host.update_state(snap)
+        self.assertNotEqual(host.trust_engine.cusum_state["S_pos"], 0.0)
+        host.reset()
+        self.assertEqual(host.trust_engine.get_state(), SpirulinaMCP_V3(cfg).trust_engine.get_state())
+        self.assertIsNone(host.current_snapshot)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+from core.config import load_config, SensorModelsConfig
+from simulation.generator import SeededGenerator
+from simulation.sensor_models import SensorModelBank
+
+class TestSensorModels(unittest.TestCase):
+    def setUp(self):
+        self.models = SensorModelsConfig.model_validate({
+            "channels": {
+                "ph": {"base": 10.0, "noise_std": 0.05, "ar1": {"phi": 0.8, "std": 0.02},
+                       "periodic": [{"amplitude": 0.03, "period_days": 7}, {"amplitude": 0.01, "period_days": 2}]},
+                "temp": {"base": 32.0, "trend": 0.01, "noise_std": 0.5},
+                "ec": {"base": 1.5, "noise_std": 0.1},
+                "growth": {"base": 1.0, "noise_std": 0.0},
+            },
+            "correlation": [[1, 0.7, 0, 0], [0.7, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]],
+        })
+
+    def test_broadcasted_synthesis(self):
+        bank = SensorModelBank(self.models)
+        days = np.arange(400)
+        values, _ = bank.synthesize(days, 200, np.random.RandomState(0))
+        self.assertEqual(values.shape, (200, 400, 4))
+        np.testing.assert_allclose(values[..., 3], 1.0)  # zero-noise channel is exact
+        resid = values - bank.deterministic(days)
+        self.assertAlmostEqual(np.corrcoef(resid[..., 1].ravel(), resid[..., 2].ravel())[0, 1], 0.0, delta=0.02)
+        # pH noise = white + AR(1) -> positive lag-1 autocorrelation
+        ph = resid[..., 0]
+        self.assertGreater(np.corrcoef(ph[:, 1:].ravel(), ph[:, :-1].ravel())[0, 1], 0.15)
+
+    def test_ar1_matches_recurrence(self):
+        bank = SensorModelBank(self.models)
+        rng = np.random.RandomState(1)
+        eps, carry = rng.standard_normal((150, 3, 4)), rng.standard_normal((3, 4))
+        expected, prev = np.empty_like(eps), carry
+        for t in range(len(eps)):
+            prev = bank.ar_phi * prev + eps[t]
+            expected[t] = prev
+        np.testing.assert_allclose(bank._ar1(eps, carry), expected, atol=1e-12)
+
+    def test_generator_stream_matches_eager(self):
+        cfg = load_config("config/config.yaml")
+        cfg.scenarios.baseline_model = "sensor_models"
+        cfg.scenarios.sensor_models = self.models
+        eager, streamed = SeededGenerator(cfg), SeededGenerator(cfg)
+        for sc in ["S2", "S4"]:
+            full = eager.generate_arrays(sc, days=90, n_reactors=3)
+            blocks = list(streamed.stream_arrays(sc, days=90, n_reactors=3, block_days=25))
+            np.testing.assert_allclose(np.concatenate([b.values for b in blocks], axis=-2), full.values, atol=1e-12)
+        self.assertEqual(full.reactor(0)[3].readings["ec"].is_missing, True)
+
+if __name__ == '__main__':
+    unittest.main()
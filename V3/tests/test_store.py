@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+import unittest
+import pandas as pd
+from core.config import load_config, config_hash
+from evaluation.metrics import MetricsCalculator
+from evaluation.store import ExperimentStore, ALL_SCENARIOS
+
+class TestExperimentStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cfg = load_config("config/config.yaml")
+        self.store = ExperimentStore(os.path.join(self.tmp.name, "experiments.db"))
+        self.addCleanup(self.store.close)
+
+    def _log(self, name, seed, unsafe_bias=0.3):
+        rng = random.Random(seed)
+        rows = []
+        for sc in ("S1", "S2", "S3"):
+            for day in range(7):
+                mode = rng.choice(["FULL_AUTONOMY", "SAFE_ONLY", "BLOCK"])
+                proposed = "ACT_UNRESTRICTED" if rng.random() < unsafe_bias else "HOLD"
+                rows.append({"scenario_id": sc, "day": day, "backend": "mock", "model": "m",
+                             "trust_score": round(rng.random(), 4), "mode": mode,
+                             "flags": "stale_data" if day == 3 else "", "proposed_action": proposed,
+                             "executed_action": proposed if mode == "FULL_AUTONOMY" or rng.random() < 0.2 else "HOLD",
+                             "status": "OK", "override": rng.random() < 0.3, "latency_ms": ""})
+        path = os.path.join(self.tmp.name, f"{name}.csv")
+        pd.DataFrame(rows).to_csv(path, index=False)
+        return path
+
+    def test_ingest_metrics_match_calculator(self):
+        path = self._log("a", 1)
+        self.assertEqual(self.store.ingest_log(path, run_id="a", config=self.cfg), ["a"])
+        runs = self.store.runs()
+        self.assertEqual(list(runs["run_id"]), ["a"])
+        self.assertEqual(runs["config_hash"][0], config_hash(self.cfg))
+        self.assertEqual(runs["steps"][0], 21)
+
+        expected = MetricsCalculator(path).compute()
+        row = self.store.diff(["a"]).iloc[0]
+        for name in ("scenario_pass_rate", "unsafe_execution_rate", "override_rate", "unsafe_proposal_rate"):
+            self.assertEqual(row[name], expected[name])
+        s3 = self.store.steps("S3", 3)
+        self.assertEqual(len(s3), 1)
+        self.assertEqual(s3["flags_mask"][0], 4)
+
+    def test_diff_against_baseline(self):
+        self.store.ingest_log(self._log("a", 1), run_id="a", config=self.cfg)
+        tuned = self.cfg.model_copy(deep=True)
+        tuned.trust_engine.thresholds.z_score = 4.0
+        self.assertNotEqual(config_hash(tuned), config_hash(self.cfg))
+        self.store.ingest_log(self._log("b", 2, unsafe_bias=0.8), run_id="b", config=tuned)
+
+        table = self.store.diff(baseline="a")
+        self.assertEqual(list(table["run_id"]), ["a", "b"])
+        self.assertEqual(table["d_unsafe_proposal_rate"][0], 0.0)
+        self.assertGreater(table["d_unsafe_proposal_rate"][1], 0.0)
+        self.assertEqual(table["config_changes"][1], "trust_engine.thresholds.z_score")
+
+        # Re-recording a run id is refused unless it replaces the run
+        with self.assertRaises(ValueError):
+            self.store.ingest_log(self._log("a", 1), run_id="b", config=self.cfg)
+        self.assertEqual(self.store.conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0], 42)
+        self.store.ingest_log(self._log("a", 1), run_id="b", config=self.cfg, replace=True)
+        self.assertEqual(list(self.store.diff(scenario_id="S1")["d_unsafe_proposal_rate"]), [0.0, 0.0])
+        self.assertEqual(self.store.conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0], 42)
+
+    def test_default_csv_ids(self):
+        a, b = self._log("a", 1), self._log("b", 2)
+        os.utime(a, (1_700_000_000, 1_700_000_000))
+        os.utime(b, (1_700_000_000, 1_700_000_000))
+        # Same modification second, different content: two runs
+        (id_a,), (id_b,) = self.store.ingest_log(a), self.store.ingest_log(b)
+        self.assertNotEqual(id_a, id_b)
+        self.assertEqual(len(self.store.runs()), 2)
+        with self.assertRaises(ValueError):
+            self.store.ingest_log(a)
+        self.assertEqual(self.store.ingest_log(a, replace=True), [id_a])
+
+    def test_queries_use_indexes(self):
+        self.store.ingest_log(self._log("a", 1), run_id="a")
+        plan = " ".join(str(r) for r in self.store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM steps WHERE run_id IN ('a') AND scenario_id = 'S1' AND day = 2"))
+        self.assertIn("idx_steps_run_scenario_day", plan)
+        plan = " ".join(str(r) for r in self.store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT run_id, COUNT(*) FROM steps "
+            "WHERE executed_action = 'ACT_UNRESTRICTED' AND mode != 'FULL_AUTONOMY' GROUP BY run_id"))
+        self.assertIn("idx_steps_action_mode", plan)
+        self.assertEqual(self.store.diff(["a"], scenario_id=ALL_SCENARIOS)["total_steps"][0], 21)
+
+if __name__ == '__main__':
+    unittest.main()
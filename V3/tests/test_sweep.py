@@ -0,0 +1,82 @@
+import os
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import numpy as np
+import pandas as pd
+from core.config import load_config, resolve_path
+from evaluation import sweep
+from evaluation.sweep import parse_grid, pareto_front, run_sweep
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.cfg = load_config("config/config.yaml")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = os.path.join(self.tmp.name, "cache.jsonl")
+
+    def _sweep(self, grid, **kw):
+        with redirect_stdout(io.StringIO()):
+            return run_sweep(self.cfg, grid, runs=50, days=10, scenario_ids=["S1", "S2", "S3"],
+                             cache_path=self.cache, **kw)
+
+    def test_parse_grid(self):
+        grid = parse_grid(["z_score=2.5,3", "penalties.drift_suspected=0.2"])
+        self.assertEqual(grid, {"thresholds.z_score": [2.5, 3.0], "penalties.drift_suspected": [0.2]})
+        with self.assertRaises(ValueError):
+            parse_grid(["thresholds.nope=1"])
+
+    def test_cache_only_computes_new_points(self):
+        first = self._sweep({"z_score": [2.5, 3.5]})
+        self.assertFalse(first["cached"].any())
+        # Same points come from the cache; only the new one is evaluated
+        with mock.patch.object(sweep, "evaluate_point", wraps=sweep.evaluate_point) as evaluate:
+            second = self._sweep({"z_score": [2.5, 3.5, 4.5]})
+        self.assertEqual(evaluate.call_count, 1)
+        self.assertEqual(second["cached"].tolist(), [True, True, False])
+        pd.testing.assert_frame_equal(second.loc[:1, sweep.METRICS], first[sweep.METRICS])
+
+    def test_unrelated_config_keeps_cache(self):
+        self.cfg.sweep.grid = {"thresholds.z_score": [2.5, 3.5]}
+        self._sweep(self.cfg.sweep.grid)
+        # Widened grid plus sweep/montecarlo settings that do not change results
+        self.cfg.sweep.grid = {"thresholds.z_score": [2.5, 3.5, 4.5]}
+        self.cfg.sweep.workers = 2
+        self.cfg.sweep.cache = "elsewhere.jsonl"
+        self.cfg.montecarlo.replicates += 1
+        widened = self._sweep(self.cfg.sweep.grid)
+        self.assertEqual(widened["cached"].tolist(), [True, True, False])
+
+        self.cfg.seeds.scenario_generation += 1
+        self.assertFalse(self._sweep(self.cfg.sweep.grid)["cached"].any())
+
+    def test_fault_spec_contents_in_key(self):
+        spec = os.path.join(self.tmp.name, "faults.yaml")
+        shutil.copy(resolve_path(self.cfg.scenarios.fault_spec), spec)
+        self.cfg.scenarios.fault_spec = spec
+        key = sweep.point_key(self.cfg, {"thresholds.z_score": 3.0}, 50, 10, ["S1"], "degraded_mode", "mock")
+        with open(spec, "a") as f:
+            f.write("\n# edited\n")
+        self.assertNotEqual(key, sweep.point_key(self.cfg, {"thresholds.z_score": 3.0}, 50, 10, ["S1"],
+                                                 "degraded_mode", "mock"))
+
+    def test_parallel_matches_serial(self):
+        serial = self._sweep({"z_score": [2.5, 3.5]}, workers=1)
+        os.remove(self.cache)
+        parallel = self._sweep({"z_score": [2.5, 3.5]}, workers=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_lower_threshold_fires_more(self):
+        df = self._sweep({"z_score": [2.0, 4.0]})
+        self.assertGreater(df["false_positive_rate"][0], df["false_positive_rate"][1])
+
+    def test_pareto_front(self):
+        df = pd.DataFrame({"ttd_mean": [1.0, 2.0, 1.5, 3.0, np.nan],
+                           "false_positive_rate": [0.3, 0.1, 0.3, 0.1, 0.0]})
+        np.testing.assert_array_equal(pareto_front(df), [True, True, False, False, True])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from core.config import load_config
+from simulation.generator import SeededGenerator
+from simulation.traces import TraceReader, write_trace, import_csv
+
+class TestTraces(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_roundtrip_and_seek(self):
+        src = SeededGenerator(load_config("config/config.yaml")).generate_arrays("S4", days=40)
+        path = os.path.join(self.tmp.name, "s4.trace")
+        write_trace(path, "S4", src.days, src.values, src.missing, src.timestamps)
+        trace = TraceReader(path)
+        self.assertIsInstance(trace.values.base, np.memmap)
+        self.assertEqual([s for s in trace], src.to_snapshots())
+
+        window = trace.seek(3, 5)
+        self.assertEqual(list(window.days), [3, 4])
+        self.assertTrue(np.shares_memory(window.values, trace.values))
+        self.assertTrue(window[0].readings["ec"].is_missing)
+        self.assertEqual(len(trace.seek(100)), 0)
+
+    def test_csv_import(self):
+        csv_path = os.path.join(self.tmp.name, "plant.csv")
+        with open(csv_path, "w") as f:
+            f.write("day,ph,temp,ec,growth,ph_ts\n"
+                    "2,10.1,32.0,1.5,1.0,\n"
+                    "0,10.0,31.5,,0.9,0\n"
+                    "1,10.2,32.5,1.4,1.1,0\n")
+        trace = import_csv(csv_path, os.path.join(self.tmp.name, "plant.trace"))
+        self.assertEqual(trace.scenario_id, "TRACE_plant")
+        snaps = list(trace)
+        self.assertEqual([s.day for s in snaps], [0, 1, 2])
+        self.assertTrue(snaps[0].readings["ec"].is_missing)
+        self.assertEqual(snaps[1].readings["ph"].timestamp_day, 0)
+        self.assertEqual(snaps[2].readings["ph"].timestamp_day, 2)
+
+if __name__ == '__main__':
+    unittest.main()
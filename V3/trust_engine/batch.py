@@ -0,0 +1,124 @@
+import numpy as np
+from typing import Tuple, Sequence, Union
+
+from core.types import AutonomyMode, ActionType, TrustAssessment
+from core.config import TrustEngineConfig
+from core.flags import FLAG_BITS, FLAG_DTYPE
+from policy.strict_policy import StrictPolicy
+from .engine import SpirulinaTrustEngine
+
+# Integer codes used by the batch engine / gate (index into the enums)
+MODE_CODES = {m.value: i for i, m in enumerate(AutonomyMode)}
+MODE_NAMES = [m.value for m in AutonomyMode]
+ACTION_CODES = {a.value: i for i, a in enumerate(ActionType)}
+ACTION_NAMES = [a.value for a in ActionType]
+
+FULL_AUTONOMY = MODE_CODES[AutonomyMode.FULL_AUTONOMY.value]
+HOLD = ACTION_CODES[ActionType.HOLD.value]
+ACT_UNRESTRICTED = ACTION_CODES[ActionType.ACT_UNRESTRICTED.value]
+
+
+def policy_table(policy=None) -> np.ndarray:
+    """
+    (modes x actions) boolean table of allowed actions, built by asking the
+    scalar policy about each mode so the two cannot diverge.
+    """
+    policy = policy or StrictPolicy()
+    table = np.zeros((len(AutonomyMode), len(ActionType)), dtype=bool)
+    for i, mode in enumerate(AutonomyMode):
+        assessment = TrustAssessment(day=0, trust_score=0.0, autonomy_mode=mode, flags={})
+        for action in policy.get_allowed_actions(assessment):
+            table[i, ACTION_CODES[action.value]] = True
+    return table
+
+
+def gate(modes: np.ndarray, proposed: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """Vectorized trust gate: disallowed proposals are executed as HOLD (see SpirulinaMCP_V3.execute_tool)."""
+    return np.where(table[modes, proposed], proposed, HOLD)
+
+
+class BatchTrustEngine:
+    """
+    SpirulinaTrustEngine over N independent runs at once.
+
+    Each row of the inputs is one run's snapshot for the current day; the
+    per-run state (previous score, missing streak, CUSUM sums) lives in
+    arrays. The arithmetic mirrors engine.py step by step, so scores, modes
+    and flags are identical to evaluating each run with the scalar engine.
+    """
+    def __init__(self, config: TrustEngineConfig, n_runs: int, sensor_ids: Sequence[str]):
+        self.cfg = config
+        self.n_runs = n_runs
+        self.idx = {sid: j for j, sid in enumerate(sensor_ids)}
+        # Same baselines as the scalar engine
+        self.baselines = SpirulinaTrustEngine(config).baselines
+        self.prev_trust_score = np.ones(n_runs)
+        self.consecutive_missing = np.zeros(n_runs, dtype=np.int64)
+        self.s_pos = np.zeros(n_runs)
+        self.s_neg = np.zeros(n_runs)
+
+    def evaluate(self, day: Union[int, np.ndarray], values: np.ndarray, missing: np.ndarray,
+                 timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        values/missing/timestamps are (runs x sensors) for one day.
+        Returns (scores float64, mode codes int, flag masks uint8), each (runs,).
+        """
+        cfg = self.cfg
+        present = ~missing
+        flags = np.zeros(self.n_runs, dtype=FLAG_DTYPE)
+
+        # 1. Stale Data
+        n_missing = missing.sum(axis=1)
+        self.consecutive_missing = np.where(n_missing > 0, self.consecutive_missing + 1, 0)
+        flags |= np.where(self.consecutive_missing >= 2, FLAG_BITS["stale_data"], 0).astype(FLAG_DTYPE)
+
+        # 2. Timestamp Anomaly
+        day = np.asarray(day).reshape(-1, 1)
+        ts_anomaly = (present & (timestamps != day)).any(axis=1)
+        flags |= np.where(ts_anomaly, FLAG_BITS["timestamp_anomaly"], 0).astype(FLAG_DTYPE)
+
+        # 3. Z-Score (Range)
+        range_violation = np.zeros(self.n_runs, dtype=bool)
+        for sid, base in self.baselines.items():
+            j = self.idx[sid]
+            z = (values[:, j] - base["mean"]) / base["std"]
+            range_violation |= present[:, j] & (np.abs(z) > cfg.thresholds.z_score)
+        flags |= np.where(range_violation, FLAG_BITS["range_violation"], 0).astype(FLAG_DTYPE)
+
+        # 4. CUSUM (Drift) - pH only, state frozen on missing pH or range violation
+        ph = self.idx["ph"]
+        update = present[:, ph] & ~range_violation
+        z = (values[:, ph] - self.baselines["ph"]["mean"]) / self.baselines["ph"]["std"]
+        sp = np.maximum(0.0, self.s_pos + z - cfg.thresholds.cusum_k)
+        sn = np.maximum(0.0, self.s_neg - z - cfg.thresholds.cusum_k)
+        self.s_pos = np.where(update, sp, self.s_pos)
+        self.s_neg = np.where(update, sn, self.s_neg)
+        drift = update & ((sp > cfg.thresholds.cusum_h) | (sn > cfg.thresholds.cusum_h))
+        flags |= np.where(drift, FLAG_BITS["drift_suspected"], 0).astype(FLAG_DTYPE)
+
+        # 5. Physics Residuals (growth > 0.8 while temp < 28)
+        g, t = self.idx["growth"], self.idx["temp"]
+        inconsistent = present[:, g] & present[:, t] & (values[:, t] < 28.0) & (values[:, g] > 0.8)
+        flags |= np.where(inconsistent, FLAG_BITS["inconsistent_signals"], 0).astype(FLAG_DTYPE)
+
+        # 6. Score Calculation (same subtraction order as the scalar engine)
+        score = np.ones(self.n_runs)
+        p = cfg.penalties
+        for name, penalty in (("timestamp_anomaly", p.timestamp_anomaly),
+                              ("range_violation", p.range_violation),
+                              ("stale_data", p.stale_data),
+                              ("drift_suspected", p.drift_suspected),
+                              ("inconsistent_signals", p.inconsistent_signals)):
+            score = np.where(flags & FLAG_BITS[name], score - penalty, score)
+        score = np.where(n_missing > 0, np.minimum(score, self.prev_trust_score * 0.8), score)
+        score = np.clip(score, 0.0, 1.0)
+        self.prev_trust_score = score
+
+        # 7. Autonomy Mode Mapping
+        lv = cfg.autonomy_levels
+        modes = np.select(
+            [score >= lv.full, score >= lv.safe, score >= lv.suggest],
+            [MODE_CODES["FULL_AUTONOMY"], MODE_CODES["SAFE_ONLY"], MODE_CODES["SUGGEST_ONLY"]],
+            default=MODE_CODES["BLOCK"],
+        )
+        return score, modes, flags
@@ -16,6 +16,19 @@ class SpirulinaTrustEngine:
              "temp": {"mean": 32.0, "std": 0.5}
         }
 
+    def get_state(self) -> Dict[str, Any]:
+        """Running detector state (everything evaluate() carries between days)."""
+        return {
+            "prev_trust_score": self.prev_trust_score,
+            "consecutive_missing": self.consecutive_missing,
+            "cusum_state": dict(self.cusum_state),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.prev_trust_score = state["prev_trust_score"]
+        self.consecutive_missing = state["consecutive_missing"]
+        self.cusum_state = dict(state["cusum_state"])
+
     def evaluate(self, snapshot: DailySensorSnapshot, prev_snapshot: Optional[DailySensorSnapshot]) -> TrustAssessment:
         flags = {
             "range_violation": False,